@@ -3,30 +3,163 @@
 import json
 import os
 import sys
+import time
 
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import (Flask, Response, g, render_template, request, jsonify, send_file,
+                   send_from_directory, stream_with_context)
+from werkzeug.exceptions import HTTPException
 
 import config
-from services import prompt_service, asset_service, gemini_service
+from services import (prompt_service, asset_service, gemini_service, upload_service,
+                      derivative_service, batch_service, job_service, video_queue,
+                      archive_service)
+from utils import metrics
 from utils.logger import logger
+from models.asset import MEDIA_FILTERS
+from utils.pagination import CursorError, parse_fields
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500MB
+app.config['USE_X_SENDFILE'] = config.USE_X_SENDFILE
 
 # 确保目录存在
 for d in [config.PROJECTS_DIR, config.ASSETS_DIR, config.THUMBNAILS_DIR, config.LOGS_DIR]:
     os.makedirs(d, exist_ok=True)
 
 
+# ── 请求指标 ──────────────────────────────────────────────────
+
+_REQUEST_SECONDS = metrics.histogram(
+    'http_request_duration_seconds', '请求耗时（流式响应计至发送完毕）', ['method', 'endpoint', 'status'])
+_REQUESTS_IN_FLIGHT = metrics.gauge('http_requests_in_flight', '正在处理的请求数', ['endpoint'])
+_REQUEST_BYTES = metrics.histogram(
+    'http_request_size_bytes', '请求体大小', ['endpoint'], buckets=metrics.SIZE_BUCKETS)
+_RESPONSE_BYTES = metrics.histogram(
+    'http_response_size_bytes', '响应体大小（长度未知的流式响应不计）', ['endpoint'],
+    buckets=metrics.SIZE_BUCKETS)
+_ASSET_LIST_SECONDS = metrics.histogram(
+    'asset_list_duration_seconds', '素材列表各阶段耗时', ['stage'])
+
+
+@app.before_request
+def _start_request_metrics():
+    # 以路由模板而非实际路径作标签，避免 ID 等参数撑大指标基数
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.metrics_endpoint = endpoint
+    g.metrics_start = time.perf_counter()
+    _REQUESTS_IN_FLIGHT.inc(endpoint)
+    if request.content_length:
+        _REQUEST_BYTES.observe(request.content_length, endpoint)
+
+
+@app.after_request
+def _finish_request_metrics(response):
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return response
+    endpoint, method, status = g.metrics_endpoint, request.method, str(response.status_code)
+    if response.content_length is not None:
+        _RESPONSE_BYTES.observe(response.content_length, endpoint)
+
+    def done():
+        _REQUEST_SECONDS.observe(time.perf_counter() - start, method, endpoint, status)
+        _REQUESTS_IN_FLIGHT.dec(endpoint)
+
+    # 在响应体发送完毕、服务器关闭响应时才结束计时，流式接口的耗时也完整计入
+    response.call_on_close(done)
+    return response
+
+
+@app.teardown_request
+def _abort_request_metrics(exc):
+    """after_request 未执行（请求处理中途异常退出）时兜底，避免在途计数泄漏"""
+    start = g.pop('metrics_start', None)
+    if start is not None:
+        _REQUEST_SECONDS.observe(time.perf_counter() - start, request.method, g.metrics_endpoint, '500')
+        _REQUESTS_IN_FLIGHT.dec(g.metrics_endpoint)
+
+
+@app.route('/metrics')
+def export_metrics():
+    """Prometheus 文本格式指标（每个 worker 进程各自统计）"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# ── 视频任务调度 ──────────────────────────────────────────────
+
+_video_queue_started = False
+
+
+@app.before_request
+def _start_video_queue():
+    """首个请求时启动视频任务调度，恢复上次未完成的任务
+
+    在实际处理请求的进程中启动，gunicorn / waitress 等 WSGI 服务器下同样生效；
+    debug reloader 父进程、gunicorn --preload 的 master 不处理请求，不会启动。
+    多进程部署时由调度锁选出唯一执行调度的进程。
+    """
+    global _video_queue_started
+    if not _video_queue_started:
+        video_queue.get_queue()
+        _video_queue_started = True
+
+
 # ── 全局异常捕获 ──────────────────────────────────────────────
 
 @app.errorhandler(Exception)
 def handle_exception(e):
     """记录所有未处理的异常到日志"""
-    logger.error(f"未处理的全局异常: {str(e)}", exc_info=True)
+    if isinstance(e, HTTPException):
+        return e  # 404 / 405 等 HTTP 错误按原状态码返回
+    logger.error('未处理的全局异常: %s', e, exc_info=True)
     return jsonify({"error": "服务器内部错误，请检查日志", "details": str(e)}), 500
 
 
+def _page_args() -> dict:
+    """解析列表接口的 limit / cursor / fields 参数"""
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, min(limit, config.PAGE_SIZE_MAX))
+    return {
+        'limit': limit,
+        'cursor': request.args.get('cursor') or None,
+        'fields': parse_fields(request.args.get('fields')),
+    }
+
+
+def _media_args() -> dict:
+    """解析素材列表的媒体信息过滤参数（duration_min=3&ratio=16:9 ...）"""
+    filters = {}
+    for name, (_, op) in MEDIA_FILTERS.items():
+        if name not in request.args:
+            continue
+        if op == 'eq' and name != 'audio_channels':
+            filters[name] = request.args[name]
+        else:
+            value = request.args.get(name, type=float)
+            if value is not None:
+                filters[name] = value
+    return filters
+
+
+@app.errorhandler(CursorError)
+def handle_cursor_error(e):
+    return jsonify({'error': str(e)}), 400
+
+
+@app.errorhandler(archive_service.ArchiveError)
+def handle_archive_error(e):
+    return jsonify({'error': str(e)}), 400
+
+
+@app.errorhandler(upload_service.UploadError)
+def handle_upload_error(e):
+    body = {'error': str(e)}
+    if e.offset is not None:
+        body['offset'] = e.offset
+    return jsonify(body), e.status_code
+
+
 # ── 页面路由 ──────────────────────────────────────────────────
 
 @app.route('/')
@@ -61,9 +194,39 @@ def save_prompt():
 
 @app.route('/api/prompts', methods=['GET'])
 def list_prompts():
-    """获取 Prompt 项目列表"""
-    projects = prompt_service.list_projects()
-    return jsonify({'projects': projects})
+    """获取 Prompt 项目列表（支持 limit / cursor / fields）"""
+    projects, next_cursor = prompt_service.list_projects(**_page_args())
+    return jsonify({'projects': projects, 'next_cursor': next_cursor})
+
+
+@app.route('/api/prompts/archive', methods=['GET'])
+def export_archive():
+    """导出项目归档 (tar)：?ids=a,b,c，连同引用素材与缩略图流式下载"""
+    ids = [i for i in request.args.get('ids', '').split(',') if i]
+    if not ids:
+        return jsonify({'error': '请指定要导出的项目'}), 400
+    chunks = archive_service.export_projects(ids)
+    if chunks is None:
+        return jsonify({'error': '项目不存在'}), 404
+    filename = f'seedance-projects-{time.strftime("%Y%m%d-%H%M%S")}.tar'
+    return Response(stream_with_context(chunks), mimetype='application/x-tar',
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"',
+                             'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/prompts/archive', methods=['POST'])
+def import_archive():
+    """导入项目归档：请求体为 tar 原始字节（可 gzip），或 multipart 的 file 字段"""
+    # 归档可达数十 GB，边读边处理，改用单独的上限（按请求设置需 Flask >= 3.1；设为 None 会回退到全局限制）
+    request.max_content_length = config.ARCHIVE_IMPORT_MAX_BYTES
+    if request.mimetype == 'multipart/form-data':
+        if 'file' not in request.files:
+            return jsonify({'error': '未找到文件'}), 400
+        stream = request.files['file'].stream
+    else:
+        stream = request.stream
+    summary = archive_service.import_archive(stream)
+    return jsonify({**summary, 'message': '导入完成'})
 
 
 @app.route('/api/prompts/<project_id>', methods=['GET'])
@@ -103,6 +266,40 @@ def export_prompt():
     return jsonify({'api_payload': payload})
 
 
+@app.route('/api/prompts/sweep', methods=['POST'])
+def sweep_prompt():
+    """参数扫描：按各维度取值的笛卡尔积生成去重后的 API payload，以 NDJSON 流式返回
+
+    请求体: {project_id | project: {...}, axes: {model: [...], duration: [...], camera: [...]}}
+    """
+    data = request.get_json() or {}
+    if data.get('project_id'):
+        base = prompt_service.load_project(data['project_id'])
+        if base is None:
+            return jsonify({'error': '项目不存在'}), 404
+    elif isinstance(data.get('project'), dict):
+        base = data['project']
+    else:
+        return jsonify({'error': '请提供 project_id 或 project'}), 400
+
+    try:
+        variants = prompt_service.sweep_payloads(base, data.get('axes'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    lines = (json.dumps(item, ensure_ascii=False) + '\n' for item in variants)
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson',
+                    headers={'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/prompts/validate', methods=['POST'])
+def validate_prompt():
+    """检查引用素材与视频参数（时长 / 比例）是否匹配"""
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': '无效的请求数据'}), 400
+    return jsonify({'warnings': prompt_service.check_references(data)})
+
+
 @app.route('/api/templates', methods=['GET'])
 def get_templates():
     """获取模板列表"""
@@ -139,14 +336,67 @@ def upload_asset():
     return jsonify({'asset': asset_data, 'message': '上传成功'})
 
 
+@app.route('/api/assets/uploads', methods=['POST'])
+def init_chunked_upload():
+    """创建分片上传会话 {filename, size}"""
+    data = request.get_json()
+    filename = (data.get('filename') or '').strip() if data else ''
+    size = data.get('size') if data else None
+    if not filename or not isinstance(size, int):
+        return jsonify({'error': '无效的请求数据'}), 400
+    return jsonify(upload_service.init_upload(filename, size))
+
+
+@app.route('/api/assets/uploads/<upload_id>', methods=['GET'])
+def get_chunked_upload(upload_id):
+    """查询分片上传进度（断点续传时获取 offset）"""
+    return jsonify(upload_service.get_upload(upload_id))
+
+
+@app.route('/api/assets/uploads/<upload_id>', methods=['PATCH'])
+def append_chunked_upload(upload_id):
+    """追加分片，请求体为原始字节，Upload-Offset 头为起始偏移"""
+    offset = request.headers.get('Upload-Offset', type=int)
+    if offset is None:
+        return jsonify({'error': '缺少 Upload-Offset'}), 400
+    return jsonify(upload_service.append_chunk(upload_id, offset, request.stream))
+
+
+@app.route('/api/assets/uploads/<upload_id>/complete', methods=['POST'])
+def complete_chunked_upload(upload_id):
+    """完成分片上传，创建素材"""
+    asset_data = upload_service.complete_upload(upload_id)
+    return jsonify({'asset': asset_data, 'message': '上传成功'})
+
+
+@app.route('/api/assets/uploads/<upload_id>', methods=['DELETE'])
+def abort_chunked_upload(upload_id):
+    """取消分片上传"""
+    upload_service.abort_upload(upload_id)
+    return jsonify({'message': '已取消'})
+
+
 @app.route('/api/assets', methods=['GET'])
 def list_assets():
-    """列出素材"""
+    """列出素材（支持 limit / cursor / fields）"""
     query = request.args.get('q', '')
     tag = request.args.get('tag', '')
     asset_type = request.args.get('type', '')
-    assets = asset_service.list_assets(query=query, tag=tag, asset_type=asset_type)
-    return jsonify({'assets': assets})
+    with _ASSET_LIST_SECONDS.time('search'):
+        fragments, next_cursor = asset_service.list_assets_json(
+            query=query, tag=tag, asset_type=asset_type, media=_media_args(), **_page_args()
+        )
+    # 直接拼接各素材缓存的 JSON 片段，避免逐条构造字典再整体序列化
+    with _ASSET_LIST_SECONDS.time('serialize'):
+        body = b'{"assets":[%s],"next_cursor":%s}' % (b','.join(fragments), json.dumps(next_cursor).encode())
+    return Response(body, mimetype='application/json')
+
+
+@app.route('/api/assets/thumbnail-status', methods=['GET'])
+def get_thumbnail_status():
+    """批量查询缩略图生成状态（ids=a,b,c）"""
+    ids = [i for i in request.args.get('ids', '').split(',') if i][:config.PAGE_SIZE_MAX]
+    return jsonify({'thumbnails': asset_service.get_thumbnail_status(ids)})
 
 
 @app.route('/api/assets/<asset_id>', methods=['GET'])
@@ -158,6 +408,19 @@ def get_asset(asset_id):
     return jsonify({'error': '素材不存在'}), 404
 
 
+@app.route('/api/assets/<asset_id>/similar', methods=['GET'])
+def get_similar_assets(asset_id):
+    """查找近似重复的素材（distance 为最大汉明距离，0~64）"""
+    max_distance = request.args.get('distance', type=int)
+    if max_distance is not None and not 0 <= max_distance <= 64:
+        return jsonify({'error': 'distance 取值范围为 0~64'}), 400
+    limit = max(1, min(request.args.get('limit', 20, type=int), config.PAGE_SIZE_MAX))
+    assets = asset_service.find_similar(asset_id, max_distance, limit)
+    if assets is None:
+        return jsonify({'error': '素材不存在'}), 404
+    return jsonify({'assets': assets})
+
+
 @app.route('/api/assets/<asset_id>', methods=['DELETE'])
 def delete_asset(asset_id):
     """删除素材"""
@@ -187,54 +450,207 @@ def get_all_tags():
 
 @app.route('/api/ai/generate-prompt', methods=['POST'])
 def ai_generate_prompt():
-    """AI 生成五要素 Prompt"""
+    """AI 生成五要素 Prompt（fresh=true 时跳过缓存）"""
     data = request.get_json()
     idea = data.get('idea', '').strip() if data else ''
     if not idea:
         return jsonify({'error': '请输入创意描述'}), 400
+    fresh = bool(data.get('fresh')) or request.args.get('fresh', '').lower() == 'true'
 
     try:
-        result = gemini_service.generate_prompt(idea)
+        result = gemini_service.generate_prompt(idea, fresh=fresh)
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': f'AI 生成失败: {str(e)}'}), 500
 
 
+@app.route('/api/ai/generate-prompts', methods=['POST'])
+def ai_generate_prompts():
+    """批量生成五要素 Prompt，结果按完成顺序以 NDJSON 流式返回
+
+    请求体: {ideas: [...], fresh: bool, save: bool, project: {model, ratio, ...}}
+    """
+    data = request.get_json() or {}
+    ideas = data.get('ideas')
+    if not isinstance(ideas, list):
+        return jsonify({'error': 'ideas 必须为字符串数组'}), 400
+    ideas = [i.strip() for i in ideas if isinstance(i, str) and i.strip()]
+    if not ideas:
+        return jsonify({'error': '请输入创意描述'}), 400
+    if len(ideas) > config.AI_BATCH_MAX_IDEAS:
+        return jsonify({'error': f'单次最多 {config.AI_BATCH_MAX_IDEAS} 条创意'}), 400
+    project = data.get('project') if isinstance(data.get('project'), dict) else None
+
+    results = batch_service.generate_prompts(
+        ideas, fresh=bool(data.get('fresh')), save=bool(data.get('save')), project=project
+    )
+    lines = (json.dumps(item, ensure_ascii=False) + '\n' for item in results)
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson',
+                    headers={'X-Accel-Buffering': 'no'})
+
+
 @app.route('/api/ai/generate-image', methods=['POST'])
 def ai_generate_image():
-    """AI 生成素材图片"""
+    """提交 AI 素材图片生成任务，立即返回任务信息，进度见 /api/jobs/<id>"""
     data = request.get_json()
     prompt = data.get('prompt', '').strip() if data else ''
     if not prompt:
         return jsonify({'error': '请输入图片描述'}), 400
 
     aspect_ratio = data.get('aspect_ratio', '16:9')
+    variants = data.get('variants', 1)
+    if not isinstance(variants, int) or not 1 <= variants <= config.IMAGE_JOB_MAX_VARIANTS:
+        return jsonify({'error': f'variants 取值范围为 1~{config.IMAGE_JOB_MAX_VARIANTS}'}), 400
 
-    try:
-        asset = gemini_service.generate_image(prompt, aspect_ratio)
-        return jsonify({'asset': asset, 'message': 'AI 素材生成成功'})
-    except Exception as e:
-        return jsonify({'error': f'AI 图片生成失败: {str(e)}'}), 500
+    job = job_service.submit_image_job(prompt, aspect_ratio, variants)
+    return jsonify({'job': job}), 202
+
+
+# ── Seedance 视频生成 API ─────────────────────────────────────
+
+@app.route('/api/video-tasks', methods=['POST'])
+def create_video_tasks():
+    """将已保存的项目加入视频生成队列 {project_ids: [...], count: 每个项目生成次数}"""
+    data = request.get_json() or {}
+    project_ids = data.get('project_ids')
+    count = data.get('count', 1)
+    if not isinstance(project_ids, list) or not project_ids or not isinstance(count, int) or count < 1:
+        return jsonify({'error': '无效的请求数据'}), 400
+    if not config.SEEDANCE_API_KEY:
+        return jsonify({'error': '未配置 ARK_API_KEY，请在 .env 文件中设置'}), 400
+    if len(project_ids) * count > config.SEEDANCE_MAX_BATCH:
+        return jsonify({'error': f'单次最多提交 {config.SEEDANCE_MAX_BATCH} 个任务'}), 400
+    tasks = video_queue.enqueue_projects(project_ids, count)
+    if tasks is None:
+        return jsonify({'error': '项目不存在'}), 404
+    return jsonify({'tasks': tasks}), 202
+
+
+@app.route('/api/video-tasks', methods=['GET'])
+def list_video_tasks():
+    """列出视频生成任务（支持 status / limit / cursor / fields），附各状态数量"""
+    tasks, next_cursor, counts = video_queue.list_tasks(
+        status=request.args.get('status', ''), **_page_args()
+    )
+    return jsonify({'tasks': tasks, 'next_cursor': next_cursor, 'counts': counts})
+
+
+@app.route('/api/video-tasks/<task_id>', methods=['GET'])
+def get_video_task(task_id):
+    """查询视频生成任务"""
+    task = video_queue.get_task(task_id)
+    if task:
+        return jsonify(task)
+    return jsonify({'error': '任务不存在'}), 404
+
+
+@app.route('/api/video-tasks/<task_id>/cancel', methods=['POST'])
+def cancel_video_task(task_id):
+    """取消视频生成任务"""
+    task = video_queue.get_queue().cancel(task_id)
+    if task:
+        return jsonify(task)
+    return jsonify({'error': '任务不存在'}), 404
+
+
+@app.route('/api/video-tasks/<task_id>/retry', methods=['POST'])
+def retry_video_task(task_id):
+    """重新提交失败或已取消的任务"""
+    task = video_queue.get_queue().retry(task_id)
+    if task:
+        return jsonify(task)
+    return jsonify({'error': '任务不存在'}), 404
+
+
+# ── 后台任务 API ──────────────────────────────────────────────
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """查询后台任务状态（轮询）"""
+    job = job_service.get_manager().get(job_id)
+    if job:
+        return jsonify(job)
+    return jsonify({'error': '任务不存在'}), 404
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """以 Server-Sent Events 推送任务进度，任务结束后关闭连接"""
+    manager = job_service.get_manager()
+    job = manager.get(job_id)
+    if not job:
+        return jsonify({'error': '任务不存在'}), 404
+
+    def events(job):
+        version = -1
+        while job is not None:
+            if job['version'] == version:
+                yield ': keep-alive\n\n'
+            else:
+                version = job['version']
+                yield f'event: progress\ndata: {json.dumps(job, ensure_ascii=False)}\n\n'
+                if job['status'] in job_service.Job.FINISHED:
+                    return
+            job = manager.wait(job_id, version, timeout=config.SSE_HEARTBEAT)
+
+    return Response(stream_with_context(events(job)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 # ── 静态文件服务 ──────────────────────────────────────────────
 
+def _is_content_addressed(filename: str) -> bool:
+    """文件名是否以内容哈希（40 位十六进制）开头"""
+    stem = filename.split('_', 1)[0].split('.', 1)[0]
+    return len(stem) == 40 and all(c in '0123456789abcdef' for c in stem)
+
+
+def _apply_cache_policy(response, filename: str):
+    """内容寻址的文件永不变化，标记为 immutable 长期缓存；
+    旧版按素材 ID 命名的文件缓存较短时间，到期后凭 ETag 重新验证。"""
+    immutable = _is_content_addressed(filename)
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = (
+        config.STATIC_IMMUTABLE_MAX_AGE if immutable else config.STATIC_MAX_AGE
+    )
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+
+# 以下文件响应均带强 ETag，由 Werkzeug 处理 If-None-Match → 304 与 Range → 206；
+# 文件体通过 wsgi.file_wrapper（或 X-Sendfile）发送，不经 Python 逐块读取。
+
 @app.route('/data/thumbnails/<filename>')
 def serve_thumbnail(filename):
-    """提供缩略图访问"""
-    return send_from_directory(config.THUMBNAILS_DIR, filename)
+    """提供缩略图访问；带 w 参数时按需返回对应宽度的 AVIF / WebP / JPEG 衍生图"""
+    width = request.args.get('w', type=int)
+    if width:
+        derivative = derivative_service.get_derivative(
+            filename, width, request.headers.get('Accept', '')
+        )
+        if derivative:
+            path, mimetype = derivative
+            response = send_file(path, mimetype=mimetype, conditional=True,
+                                 etag=os.path.basename(path))
+            response.vary.add('Accept')
+            return _apply_cache_policy(response, filename)
+    response = send_from_directory(config.THUMBNAILS_DIR, filename, etag=filename)
+    return _apply_cache_policy(response, filename)
 
 
 @app.route('/data/assets/<filename>')
 def serve_asset(filename):
-    """提供素材文件访问"""
-    return send_from_directory(config.ASSETS_DIR, filename)
+    """提供素材文件访问（视频预览拖动时浏览器按 Range 分段请求）"""
+    response = send_from_directory(config.ASSETS_DIR, filename, etag=filename)
+    return _apply_cache_policy(response, filename)
 
 
 # ── 入口 ──────────────────────────────────────────────────────
 
 if __name__ == '__main__':
     logger.info('🎬 Seedance 视频制作工具启动中...')
-    logger.info(f'📁 项目根目录: {config.BASE_DIR}')
-    logger.info(f'🌐 访问地址: http://{config.HOST}:{config.PORT}')
+    logger.info('📁 项目根目录: %s', config.BASE_DIR)
+    logger.info('🌐 访问地址: http://%s:%s', config.HOST, config.PORT)
     app.run(host=config.HOST, port=config.PORT, debug=config.DEBUG)
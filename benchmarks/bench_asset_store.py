@@ -0,0 +1,80 @@
+"""素材仓库基准测试 — 大量素材时的内存占用、加载、检索与列表序列化耗时（离线）
+
+用法:
+    python benchmarks/bench_asset_store.py --assets 100000
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import use_temp_data_dir  # noqa: E402
+from benchmarks.datasets import build_asset_db  # noqa: E402
+
+import config  # noqa: E402
+
+
+def _timeit(fn, repeat: int) -> float:
+    """返回最快一次的耗时（毫秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--assets', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    use_temp_data_dir()
+    from models.asset import AssetStore
+    from services import asset_service
+
+    build_asset_db(config.ASSET_DB_FILE, args.assets)
+
+    gc.collect()
+    tracemalloc.start()
+    t = time.perf_counter()
+    store = AssetStore(config.ASSET_DB_FILE)
+    load_time = time.perf_counter() - t
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    asset_service._store = store
+
+    print(f'素材数: {len(store.assets)}')
+    print(f'加载耗时: {load_time:.2f}s，常驻内存: {memory / 1024 / 1024:.1f} MB '
+          f'（约 {memory / len(store.assets):.0f} 字节/条）')
+
+    cases = {
+        '全量列表': {},
+        '分页 limit=50': {'limit': 50},
+        '按类型 image': {'asset_type': 'image'},
+        '按标签分页 limit=100': {'tag': '风景', 'limit': 100},
+        '关键词 "汉服"': {'query': '汉服'},
+    }
+    for label, kwargs in cases.items():
+        page = []
+
+        def run():
+            fragments, next_cursor = asset_service.list_assets_json(**kwargs)
+            b'{"assets":[%s],"next_cursor":%s}' % (b','.join(fragments), json.dumps(next_cursor).encode())
+            page[:] = [(fragments, next_cursor)]
+
+        elapsed = _timeit(run, args.repeat)
+        fragments, _ = page[0]
+        print(f'{label:<20} {len(fragments):>7} 条  检索 + 序列化 {elapsed:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
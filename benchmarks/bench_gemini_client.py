@@ -0,0 +1,93 @@
+"""Gemini 客户端基准测试 — 每次新建客户端 vs 共享连接池客户端（离线）
+
+用法:
+    python benchmarks/bench_gemini_client.py --requests 200 --threads 8
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google import genai  # noqa: E402
+
+import config  # noqa: E402
+from benchmarks.common import use_temp_data_dir  # noqa: E402
+from benchmarks.fake_gemini import FakeGeminiTransport  # noqa: E402
+
+
+def _fresh_client_factory(args):
+    """旧实现：每次调用新建 genai.Client（及其连接），无法复用连接"""
+    def factory():
+        return genai.Client(
+            api_key=config.GEMINI_API_KEY,
+            http_options={'client_args': {
+                'transport': FakeGeminiTransport(args.latency, args.connect_latency)
+            }},
+        )
+    return factory
+
+
+def _run(name: str, args, get_client) -> dict:
+    from services import gemini_service
+    gemini_service.get_client = get_client
+    timings = []
+
+    def one(i):
+        # fresh=True 跳过 Prompt 缓存，每次都真正发起请求
+        start = time.perf_counter()
+        gemini_service.generate_prompt(f'雨夜街头的红衣女子 #{i}', fresh=True)
+        timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(one, range(args.requests)))
+    total = time.perf_counter() - start
+
+    timings.sort()
+    return {
+        'mode': name,
+        'total_s': round(total, 3),
+        'rps': round(args.requests / total, 1),
+        'mean_ms': round(statistics.mean(timings) * 1000, 1),
+        'p50_ms': round(timings[len(timings) // 2] * 1000, 1),
+        'p95_ms': round(timings[int(len(timings) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.05, help='单次响应延迟（秒）')
+    parser.add_argument('--connect-latency', type=float, default=0.15, help='建连延迟（秒）')
+    args = parser.parse_args()
+
+    # 缓存等数据写入临时目录，不污染 data/
+    work_dir = use_temp_data_dir()
+    config.GEMINI_API_KEY = config.GEMINI_API_KEY or 'fake-key'
+    from services import gemini_client
+
+    try:
+        baseline = _run('per-request', args, _fresh_client_factory(args))
+
+        transport = FakeGeminiTransport(args.latency, args.connect_latency)
+        gemini_client.set_transport(transport)
+        pooled = _run('pooled', args, gemini_client.get_client)
+        pooled['connects'] = transport.connects
+        gemini_client.shutdown()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for row in (baseline, pooled):
+        print('  '.join(f'{k}={v}' for k, v in row.items()))
+    print(f"加速比: {baseline['total_s'] / pooled['total_s']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
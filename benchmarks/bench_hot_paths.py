@@ -0,0 +1,296 @@
+"""热点路径基准测试 — 素材检索 / 列表、项目列表、缩略图、Payload 序列化（离线，Gemini 使用假传输层）
+
+用法:
+    python benchmarks/bench_hot_paths.py                              # 1k / 10k / 100k 全部用例
+    python benchmarks/bench_hot_paths.py --sizes 1000 --only asset_   # 只跑部分用例
+    python benchmarks/bench_hot_paths.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_hot_paths.py --baseline benchmarks/baseline.json
+
+结果以 JSON 写入 benchmarks/results/；指定 --baseline 时按最快耗时对比，有退化则退出码为 1。
+基线与机器相关，不随仓库提交：先在作为对照的提交上用 --save-baseline 生成，
+再在同一台机器上对改动后的代码用 --baseline 对比。
+benchmarks/baseline.example.json 为一份示例（单核 Linux 虚拟机），仅供参考格式与量级。
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import datasets, harness  # noqa: E402
+from benchmarks.common import ROOT, use_temp_data_dir  # noqa: E402
+from benchmarks.harness import Skip, case  # noqa: E402
+
+import config  # noqa: E402
+
+BENCH_DIR = os.path.join(ROOT, 'benchmarks')
+PAYLOAD_PROMPTS = 10_000
+
+_work_dir = ''
+_fixtures: dict = {}  # 当前规模的数据（切换规模时释放，避免多份 100k 数据同时驻留内存）
+
+
+def _fixture(kind: str, size: int, build):
+    if _fixtures.get('size') != size:
+        for value in _fixtures.values():
+            if hasattr(value, 'close'):
+                value.close()
+        _fixtures.clear()
+        _fixtures['size'] = size
+    if kind not in _fixtures:
+        _fixtures[kind] = build()
+    return _fixtures[kind]
+
+
+def _media_file(name: str, build) -> str:
+    path = os.path.join(_work_dir, 'media', name)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if build(path) is False:
+            raise Skip('未安装 ffmpeg')
+    return path
+
+
+# ── 素材库 ────────────────────────────────────────────────────
+
+def _asset_db(size: int) -> str:
+    def build():
+        path = os.path.join(_work_dir, f'assets_{size}.db')
+        datasets.build_asset_db(path, size)
+        return path
+    return _fixture('asset_db', size, build)
+
+
+def _asset_store(size: int):
+    from models.asset import AssetStore
+    from services import asset_service
+    store = _fixture('asset_store', size, lambda: AssetStore(_asset_db(size)))
+    asset_service._store = store
+    return store
+
+
+@case('asset_store.load', sizes=True, repeat=3)
+def _(size):
+    from models.asset import AssetStore
+    path = _asset_db(size)
+
+    def load():
+        AssetStore(path).close()
+    return load
+
+
+@case('asset_search.keyword', sizes=True)
+def _(size):
+    store = _asset_store(size)
+    return lambda: store.search(query='汉服')
+
+
+@case('asset_search.tag', sizes=True)
+def _(size):
+    store = _asset_store(size)
+    return lambda: store.search(tag='风景')
+
+
+@case('asset_search.type', sizes=True)
+def _(size):
+    store = _asset_store(size)
+    return lambda: store.search(asset_type='video')
+
+
+@case('asset_list_json.page50', sizes=True)
+def _(size):
+    from services import asset_service
+    _asset_store(size)
+    return lambda: asset_service.list_assets_json(limit=50)
+
+
+@case('asset_list_json.full', sizes=True)
+def _(size):
+    from services import asset_service
+    _asset_store(size)
+
+    def run():
+        fragments, next_cursor = asset_service.list_assets_json()
+        b'{"assets":[%s],"next_cursor":%s}' % (b','.join(fragments), json.dumps(next_cursor).encode())
+    return run
+
+
+@case('asset_list_json.media_filter', sizes=True)
+def _(size):
+    from services import asset_service
+    _asset_store(size)
+    return lambda: asset_service.list_assets_json(limit=50, media={'duration_min': 60, 'ratio': '16:9'})
+
+
+# ── 项目 ──────────────────────────────────────────────────────
+
+def _project_dir(size: int) -> str:
+    def build():
+        path = os.path.join(_work_dir, f'projects_{size}')
+        datasets.write_projects(path, size)
+        return path
+    return _fixture('project_dir', size, build)
+
+
+def _project_index(size: int):
+    from models.project_index import ProjectIndex
+    from services import prompt_service
+
+    def build():
+        index = ProjectIndex(os.path.join(_work_dir, f'project_index_{size}.db'), _project_dir(size))
+        index.summaries()  # 首次扫描建立索引
+        return index
+    index = _fixture('project_index', size, build)
+    prompt_service._index = index
+    return index
+
+
+@case('project_list.page50', sizes=True)
+def _(size):
+    from services import prompt_service
+    _project_index(size)
+    return lambda: prompt_service.list_projects(limit=50)
+
+
+@case('project_list.full', sizes=True)
+def _(size):
+    from services import prompt_service
+    _project_index(size)
+    return lambda: prompt_service.list_projects()
+
+
+@case('project_index.cold_scan', sizes=True, repeat=1)
+def _(size):
+    from models.project_index import ProjectIndex
+    directory = _project_dir(size)
+    counter = itertools.count()
+
+    def scan():
+        db_path = os.path.join(_work_dir, f'cold_index_{next(counter)}.db')
+        ProjectIndex(db_path, directory).summaries()
+    return scan
+
+
+@case('prompt.to_api_payload')
+def _():
+    from models.prompt import SeedancePrompt
+    prompts = [SeedancePrompt.from_dict(d) for d in datasets.project_dicts(PAYLOAD_PROMPTS)]
+
+    def run():
+        for prompt in prompts:
+            json.dumps(prompt.to_api_payload(), ensure_ascii=False)
+    return run
+
+
+# ── 缩略图 / 媒体 ─────────────────────────────────────────────
+
+def _thumbnail_case(source: str, asset_type: str, peaks: dict | None = None):
+    from services import asset_service
+    return lambda: asset_service.generate_thumbnail(source, 'bench', asset_type, peaks)
+
+
+@case('thumbnail.image_png_1080p')
+def _():
+    return _thumbnail_case(_media_file('1080p.png', lambda p: datasets.make_image(p, (1920, 1080))), 'image')
+
+
+@case('thumbnail.image_jpeg_4k')
+def _():
+    return _thumbnail_case(
+        _media_file('4k.jpg', lambda p: datasets.make_image(p, (3840, 2160), 'JPEG')), 'image')
+
+
+@case('thumbnail.video_720p')
+def _():
+    return _thumbnail_case(_media_file('720p.mp4', lambda p: datasets.make_video(p, 5)), 'video')
+
+
+@case('thumbnail.audio_waveform')
+def _():
+    """由合成 PCM 计算包络（不依赖 ffmpeg），只计时波形图渲染"""
+    import wave
+
+    import numpy as np
+
+    from services import waveform
+    source = _media_file('60s.wav', lambda p: datasets.make_wav(p, 60))
+    with wave.open(source) as w:
+        samples = np.frombuffer(w.readframes(w.getnframes()), dtype='<i2')
+    envelope = waveform._Envelope(config.WAVEFORM_COLUMNS, samples.size // config.WAVEFORM_COLUMNS)
+    envelope.feed(samples)
+    return _thumbnail_case(source, 'audio', envelope.finish())
+
+
+@case('waveform.extract_60s')
+def _():
+    from services import waveform
+    if not shutil.which('ffmpeg'):
+        raise Skip('未安装 ffmpeg')
+    source = _media_file('60s.wav', lambda p: datasets.make_wav(p, 60))
+    return lambda: waveform.extract(source, 60)
+
+
+@case('phash.image_1080p')
+def _():
+    from services import perceptual_hash
+    source = _media_file('1080p.png', lambda p: datasets.make_image(p, (1920, 1080)))
+    return lambda: perceptual_hash.compute(source, 'image')
+
+
+# ── Gemini（假传输层，只计客户端开销） ─────────────────────────
+
+@case('gemini.generate_prompt')
+def _():
+    from services import gemini_service
+    return lambda: gemini_service.generate_prompt('雨夜街头的红衣女子', fresh=True)
+
+
+def main():
+    global _work_dir
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000', help='素材 / 项目数据规模，逗号分隔')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', default='', help='只运行名称包含该字符串的用例')
+    parser.add_argument('--output', help='结果 JSON 路径，默认 benchmarks/results/<时间>.json')
+    parser.add_argument('--baseline', metavar='PATH', help='与该基线 JSON 对比')
+    parser.add_argument('--save-baseline', metavar='PATH', help='结果同时写入该路径作为基线')
+    parser.add_argument('--threshold', type=float, default=0.25, help='判定退化的相对变慢比例')
+    parser.add_argument('--min-delta', type=float, default=1.0, help='判定退化的最小绝对差值（毫秒）')
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+
+    # 离线运行：数据写入临时目录，Gemini 只走假传输层
+    _work_dir = use_temp_data_dir()
+    config.GEMINI_API_KEY = config.GEMINI_API_KEY or 'offline-benchmark'
+    from benchmarks.fake_gemini import FakeGeminiTransport
+    from services import gemini_client
+    gemini_client.set_transport(FakeGeminiTransport(latency=0, connect_latency=0))
+    logging.getLogger('SeedanceStudio').setLevel(logging.WARNING)
+
+    try:
+        report = harness.run(sizes, args.repeat, args.only)
+    finally:
+        shutil.rmtree(_work_dir, ignore_errors=True)
+
+    output = args.output or os.path.join(BENCH_DIR, 'results', f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    harness.save(report, output)
+    print(f'\n结果已写入 {output}')
+    if args.save_baseline:
+        harness.save(report, args.save_baseline)
+        print(f'基线已写入 {args.save_baseline}')
+    if args.baseline:
+        regressions = harness.compare(report, args.baseline, args.threshold, args.min_delta)
+        if regressions:
+            print(f'\n{len(regressions)} 个用例性能退化: {", ".join(regressions)}')
+            sys.exit(1)
+        print('\n未发现性能退化')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Seedance 任务队列压测 — 对本地 stub 服务批量提交，统计吞吐与故障处理（离线）
+
+用法:
+    python benchmarks/bench_video_queue.py --tasks 200 --gen-time 2 --fail-rate 0.05 --error-rate 0.1
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import use_temp_data_dir  # noqa: E402
+
+import config  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=50)
+    parser.add_argument('--models', type=int, default=2, help='任务平均分配到几个模型')
+    parser.add_argument('--concurrency', type=int, default=4, help='每个模型的并发上限')
+    parser.add_argument('--gen-time', type=float, default=1.0)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--max-running', type=int, default=6, help='stub 端并发上限（超出返回 429）')
+    parser.add_argument('--video-size', type=int, default=512 * 1024)
+    parser.add_argument('--timeout', type=float, default=600)
+    args = parser.parse_args()
+
+    use_temp_data_dir()
+    config.THUMBNAIL_WORKERS = 0
+    config.SEEDANCE_CONCURRENCY = args.concurrency
+    config.SEEDANCE_TICK = 0.1
+    config.SEEDANCE_POLL_MIN = 0.2
+    config.SEEDANCE_POLL_MAX = 2.0
+    config.SEEDANCE_BACKOFF_BASE = 0.2
+    config.SEEDANCE_BACKOFF_MAX = 2.0
+    config.SEEDANCE_MAX_RETRIES = 8
+
+    from benchmarks.stub_seedance import serve
+    from services import video_queue
+
+    server = serve(gen_time=args.gen_time, fail_rate=args.fail_rate, error_rate=args.error_rate,
+                   max_running=args.max_running, video_size=args.video_size)
+    config.SEEDANCE_API_BASE = f'http://127.0.0.1:{server.server_port}/api/v3'
+    config.SEEDANCE_API_KEY = 'stub'
+
+    queue = video_queue.get_queue()
+    items = []
+    for i in range(args.tasks):
+        model = f'stub-model-{i % args.models}'
+        payload = {'model': model, 'content': [{'type': 'text', 'text': f'压测任务 {i}'}]}
+        items.append((f'bench #{i}', '', payload))
+
+    start = time.perf_counter()
+    queue.enqueue(items)
+    deadline = start + args.timeout
+    while time.perf_counter() < deadline:
+        counts = Counter(t.status for t in queue.store.all())
+        done = sum(counts[s] for s in ('succeeded', 'failed', 'cancelled'))
+        print(f'\r{time.perf_counter() - start:6.1f}s  ' + '  '.join(
+            f'{k}={v}' for k, v in sorted(counts.items())), end='', flush=True)
+        if done == args.tasks:
+            break
+        time.sleep(0.5)
+    elapsed = time.perf_counter() - start
+    print()
+
+    tasks = queue.store.all()
+    counts = Counter(t.status for t in tasks)
+    stats = server.RequestHandlerClass.state.stats
+    print(f'耗时 {elapsed:.1f}s，吞吐 {counts["succeeded"] / elapsed * 60:.1f} 个/分钟')
+    print(f'结果: {dict(counts)}')
+    print(f'重试次数合计: {sum(t.attempts for t in tasks)}')
+    print(f'stub 统计: {stats}，平均每任务轮询 {stats["polls"] / max(1, args.tasks):.1f} 次')
+    ideal = args.tasks / (args.models * min(args.concurrency, args.max_running / args.models))
+    print(f'理论下限约 {ideal * args.gen_time:.1f}s（仅计生成时间）')
+
+    video_queue.shutdown()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
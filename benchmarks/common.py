@@ -0,0 +1,28 @@
+"""基准测试公共工具"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+
+
+def use_temp_data_dir(temp_dir: str | None = None) -> str:
+    """将 config 中所有 data/ 下的路径改到临时目录，避免污染真实数据
+
+    必须在导入 services / utils.logger 之前调用，日志也随之写入临时目录。
+    指定 temp_dir 时使用该目录（多个进程共享同一份数据），否则新建。
+    """
+    temp_dir = temp_dir or tempfile.mkdtemp(prefix='seedance-bench-')
+    data_dir = config.DATA_DIR
+    for name in dir(config):
+        value = getattr(config, name)
+        if name.isupper() and isinstance(value, str) and value.startswith(data_dir):
+            setattr(config, name, temp_dir + value[len(data_dir):])
+    for d in (config.PROJECTS_DIR, config.ASSETS_DIR, config.THUMBNAILS_DIR):
+        os.makedirs(d, exist_ok=True)
+    return temp_dir
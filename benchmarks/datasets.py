@@ -0,0 +1,147 @@
+"""基准测试合成数据 — 素材库、项目文件、图片 / 视频 / 音频（固定随机种子，可复现）"""
+
+import json
+import math
+import os
+import random
+import shutil
+import sqlite3
+import struct
+import subprocess
+import wave
+
+TAGS = ['人物', '风景', '城市', '夜景', '产品', '动物', '美食', '运动', '科幻', '古风', 'AI生成', 'Seedance']
+WORDS = ['红色', '汉服', '女子', '街道', '黄昏', '镜头', '海边', '森林', '雪山', '霓虹', '猫', '赛博朋克']
+RATIOS = ['16:9', '9:16', '1:1', '4:3', '21:9']
+
+
+# ── 素材库 ────────────────────────────────────────────────────
+
+def asset_rows(count: int, seed: int = 42):
+    """生成 (id, created_at, data JSON) 行，与 AssetStore 的 assets 表结构一致"""
+    rng = random.Random(seed)
+    start = 1_700_000_000 - count
+    for i in range(count):
+        asset_type = rng.choice(('image', 'image', 'video', 'audio'))
+        content_hash = f'{rng.getrandbits(160):040x}'
+        ext = {'image': 'png', 'video': 'mp4', 'audio': 'mp3'}[asset_type]
+        media = {}
+        if asset_type != 'audio':
+            media = {'width': 1920, 'height': 1080, 'ratio': rng.choice(RATIOS)}
+        if asset_type != 'image':
+            media['duration'] = round(rng.uniform(1, 120), 2)
+        data = {
+            'id': f'{i:08x}',
+            'name': ''.join(rng.sample(WORDS, 3)),
+            'original_name': f'file_{i}.{ext}',
+            'type': asset_type,
+            'path': f'{content_hash}.{ext}',
+            'content_hash': content_hash,
+            'thumbnail_path': f'{content_hash}_thumb.jpg',
+            'thumbnail_status': 'ready',
+            'tags': rng.sample(TAGS, rng.randint(0, 3)),
+            'description': '',
+            'created_at': start + i,
+            'file_size': rng.randint(10_000, 50_000_000),
+            'media': media,
+            'waveform': {},
+            'phash': [f'{rng.getrandbits(64):016x}'] if asset_type == 'image' else [],
+        }
+        yield data['id'], data['created_at'], json.dumps(data, ensure_ascii=False)
+
+
+def build_asset_db(path: str, count: int, seed: int = 42):
+    """写入含 count 条素材的 SQLite 素材库（表结构与 AssetStore 一致，由其首次打开时补齐索引）"""
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE assets (id TEXT PRIMARY KEY, created_at REAL NOT NULL, data TEXT NOT NULL)')
+    conn.executemany('INSERT INTO assets VALUES (?, ?, ?)', asset_rows(count, seed))
+    conn.commit()
+    conn.close()
+
+
+# ── 项目 ──────────────────────────────────────────────────────
+
+def project_dicts(count: int, seed: int = 7):
+    """生成项目数据（SeedancePrompt.to_dict 格式，含 0~4 个素材引用）"""
+    rng = random.Random(seed)
+    start = 1_700_000_000 - count
+    for i in range(count):
+        refs = [
+            {'id': f'{rng.randrange(count):08x}', 'type': 'image', 'role': 'reference_image',
+             'path': f'/data/assets/{rng.getrandbits(160):040x}.png'}
+            for _ in range(rng.randint(0, 4))
+        ]
+        yield {
+            'id': f'p{i:07x}',
+            'name': f"{''.join(rng.sample(WORDS, 2))} #{i}",
+            'created_at': start + i,
+            'updated_at': start + i + rng.random() * 3600,
+            'subject': ''.join(rng.choices(WORDS, k=8)),
+            'scene': ''.join(rng.choices(WORDS, k=8)),
+            'action': ''.join(rng.choices(WORDS, k=8)),
+            'camera': ''.join(rng.choices(WORDS, k=6)),
+            'atmosphere': ''.join(rng.choices(WORDS, k=6)),
+            'task_type': rng.choice(('text2video', 'image2video')),
+            'model': 'doubao-seedance-2-0-260128',
+            'resolution': rng.choice(('480p', '720p', '1080p')),
+            'duration': rng.randint(4, 12),
+            'ratio': rng.choice(RATIOS),
+            'ref_assets': refs,
+        }
+
+
+def write_projects(directory: str, count: int, seed: int = 7):
+    """在 directory 下写入 count 个项目文件（已存在同数量时复用）"""
+    if os.path.isdir(directory) and len(os.listdir(directory)) == count:
+        return
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    for data in project_dicts(count, seed):
+        with open(os.path.join(directory, f"{data['id']}.json"), 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+
+# ── 媒体文件 ──────────────────────────────────────────────────
+
+def make_image(path: str, size: tuple[int, int], fmt: str = 'PNG', seed: int = 1):
+    """渐变底图叠加随机色块，避免纯色图被编码器特殊优化"""
+    from PIL import Image, ImageDraw
+    rng = random.Random(seed)
+    width, height = size
+    img = Image.linear_gradient('L').resize(size).convert('RGB')
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.rectangle((x, y, x + rng.randrange(width // 4), y + rng.randrange(height // 4)),
+                       fill=tuple(rng.randrange(256) for _ in range(3)))
+    img.save(path, fmt)
+
+
+def make_wav(path: str, seconds: float, sample_rate: int = 44100):
+    """生成单声道 16bit 正弦扫频 WAV"""
+    frames = int(seconds * sample_rate)
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        chunk = sample_rate
+        for start in range(0, frames, chunk):
+            n = min(chunk, frames - start)
+            w.writeframes(struct.pack(f'<{n}h', *(
+                int(12000 * math.sin(2 * math.pi * (220 + (start + i) / frames * 660) * (start + i) / sample_rate))
+                for i in range(n)
+            )))
+
+
+def make_video(path: str, seconds: float, size: tuple[int, int] = (1280, 720)) -> bool:
+    """用 ffmpeg 测试源生成 H.264 视频，未安装 ffmpeg 时返回 False"""
+    if not shutil.which('ffmpeg'):
+        return False
+    subprocess.run(
+        ['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', f'testsrc2=size={size[0]}x{size[1]}:rate=24',
+         '-t', str(seconds), '-pix_fmt', 'yuv420p', '-y', path],
+        check=True, timeout=120,
+    )
+    return True
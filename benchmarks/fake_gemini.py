@@ -0,0 +1,108 @@
+"""离线 Gemini 假传输层 — 模拟建连与响应延迟，供基准测试 / 压测使用
+
+用法:
+    from services import gemini_client
+    gemini_client.set_transport(FakeGeminiTransport(latency=0.05))
+    gemini_client.set_transport(FakeGeminiTransport(latency=2.0, jitter=0.5, error_rate=0.02, throttle_rate=0.05))
+"""
+
+import base64
+import io
+import json
+import random
+import threading
+import time
+
+import httpx
+
+# 五要素 Prompt 的固定返回内容
+FAKE_PROMPT = {
+    'subject': '一位身穿红色风衣的年轻女性，短发，神情坚定',
+    'scene': '雨夜的霓虹街道，地面积水倒映出五彩灯光',
+    'action': '她撑伞缓步前行，停下后回头望向镜头',
+    'camera': '低角度跟拍，随后缓慢推近至面部特写',
+    'atmosphere': '赛博朋克色调，蓝紫冷光，电影级颗粒质感',
+}
+
+
+def _fake_png() -> bytes:
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new('RGB', (64, 36), color='#5b4b9a').save(buf, 'PNG')
+    return buf.getvalue()
+
+
+class FakeGeminiTransport(httpx.BaseTransport):
+    """模拟 Gemini generateContent 接口
+
+    以空闲连接计数模拟 keep-alive：没有空闲连接时需先支付 connect_latency
+    （TCP + TLS 握手），请求结束后连接归还为空闲。因此复用同一传输层的
+    客户端只在并发数首次上升时建连，而每次新建客户端都要重新握手。
+
+    Args:
+        latency: 平均响应延迟（秒）
+        connect_latency: 新建连接的握手延迟（秒）
+        jitter: 延迟浮动比例，实际延迟在 latency × (1 ± jitter) 之间均匀分布
+        error_rate: 返回 500 INTERNAL 的概率
+        throttle_rate: 返回 429 RESOURCE_EXHAUSTED 的概率
+        seed: 随机种子（延迟浮动与故障注入可复现）
+    """
+
+    def __init__(self, latency: float = 0.05, connect_latency: float = 0.15, jitter: float = 0.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0, seed: int | None = None):
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.requests = 0
+        self.connects = 0
+        self.errors = 0
+        self._idle = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._png = None
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self.requests += 1
+            reuse = self._idle > 0
+            if reuse:
+                self._idle -= 1
+            else:
+                self.connects += 1
+            roll = self._rng.random()
+            latency = self.latency * (1 + self._rng.uniform(-self.jitter, self.jitter))
+        if not reuse:
+            time.sleep(self.connect_latency)
+        time.sleep(latency)
+        try:
+            if roll < self.throttle_rate:
+                return self._error(request, 429, 'RESOURCE_EXHAUSTED', 'Resource has been exhausted')
+            if roll < self.throttle_rate + self.error_rate:
+                return self._error(request, 500, 'INTERNAL', 'Internal error encountered')
+            return httpx.Response(200, json=self._body(request), request=request)
+        finally:
+            with self._lock:
+                self._idle += 1
+
+    def _error(self, request: httpx.Request, code: int, status: str, message: str) -> httpx.Response:
+        with self._lock:
+            self.errors += 1
+        return httpx.Response(code, json={'error': {'code': code, 'message': message, 'status': status}},
+                              request=request)
+
+    def _body(self, request: httpx.Request) -> dict:
+        if 'image' in request.url.path:
+            if self._png is None:
+                self._png = _fake_png()
+            part = {'inlineData': {'mimeType': 'image/png',
+                                   'data': base64.b64encode(self._png).decode()}}
+        else:
+            part = {'text': json.dumps(FAKE_PROMPT, ensure_ascii=False)}
+        return {'candidates': [{'content': {'role': 'model', 'parts': [part]},
+                                'finishReason': 'STOP'}]}
+
+    def close(self):
+        with self._lock:
+            self._idle = 0
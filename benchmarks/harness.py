@@ -0,0 +1,132 @@
+"""基准测试框架 — 用例注册、计时、JSON 结果输出与基线对比
+
+用例以装饰器注册，函数负责准备数据（不计时）并返回待计时的无参函数:
+
+    @case('asset_search.keyword', sizes=True)
+    def _(size):
+        store = ...
+        return lambda: store.search(query='汉服')
+
+准备阶段抛出 Skip 时该用例记为跳过（如未安装 ffmpeg）。
+"""
+
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+
+from benchmarks.common import ROOT
+
+
+class Skip(Exception):
+    """当前环境无法运行该用例"""
+
+
+_cases: list[tuple[str, Callable, bool, int | None]] = []
+
+
+def case(name: str, sizes: bool = False, repeat: int | None = None):
+    """注册用例；sizes=True 时按每个数据规模各运行一次，repeat 覆盖默认重复次数（耗时长的用例）"""
+    def decorator(fn):
+        _cases.append((name, fn, sizes, repeat))
+        return fn
+    return decorator
+
+
+def measure(fn: Callable, repeat: int, warmup: int = 1) -> dict:
+    """预热后重复执行，返回耗时统计（毫秒）；计时期间关闭 GC 以减少抖动"""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        gc.enable()
+    return {
+        'runs': repeat,
+        'min_ms': round(min(timings), 4),
+        'median_ms': round(statistics.median(timings), 4),
+        'mean_ms': round(statistics.fmean(timings), 4),
+        'stdev_ms': round(statistics.stdev(timings), 4) if repeat > 1 else 0.0,
+    }
+
+
+def run(sizes: list[int], repeat: int, only: str = '', log=print) -> dict:
+    """运行全部（或名称包含 only 的）用例，返回结果字典"""
+    # 先跑与规模无关的用例，再按规模从小到大依次运行，同一规模的数据只需准备一次
+    plan = [(name, fn, None, r) for name, fn, sized, r in _cases if not sized]
+    plan += [(name, fn, size, r) for size in sizes for name, fn, sized, r in _cases if sized]
+    results, skipped = {}, {}
+    for name, fn, size, case_repeat in plan:
+        key = f'{name}/{size}' if size is not None else name
+        if only and only not in key:
+            continue
+        try:
+            target = fn() if size is None else fn(size)
+        except Skip as e:
+            skipped[key] = str(e)
+            log(f'{key:<44} 跳过: {e}')
+            continue
+        stats = measure(target, case_repeat or repeat, warmup=0 if case_repeat == 1 else 1)
+        results[key] = stats
+        log(f"{key:<44} 中位数 {stats['median_ms']:>10.3f} ms   最快 {stats['min_ms']:>10.3f} ms")
+    return {'meta': _environment(sizes, repeat), 'results': results, 'skipped': skipped}
+
+
+def _environment(sizes: list[int], repeat: int) -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'sizes': sizes,
+        'repeat': repeat,
+    }
+
+
+def save(report: dict, path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def compare(report: dict, baseline_path: str, threshold: float, min_delta_ms: float,
+            log=print) -> list[str]:
+    """按最快一次的耗时与基线对比，返回退化的用例名
+
+    最快值受机器后台负载的影响远小于中位数 / 均值。慢于基线超过 threshold（比例）且绝对差值超过 min_delta_ms 才视为退化，
+    避免亚毫秒级用例的计时抖动被误报。
+    """
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    regressions = []
+    log(f"\n{'用例':<44} {'基线 ms':>10} {'本次 ms':>10} {'变化':>8}")
+    for key, stats in report['results'].items():
+        base = baseline.get(key)
+        if base is None:
+            log(f"{key:<44} {'-':>10} {stats['min_ms']:>10.3f}   （新增）")
+            continue
+        before, after = base['min_ms'], stats['min_ms']
+        change = (after - before) / before if before else 0.0
+        regressed = change > threshold and after - before > min_delta_ms
+        mark = '  ← 退化' if regressed else ''
+        log(f'{key:<44} {before:>10.3f} {after:>10.3f} {change:>+8.1%}{mark}')
+        if regressed:
+            regressions.append(key)
+    return regressions
@@ -0,0 +1,44 @@
+"""压测用 WSGI 入口 — 数据目录与 Gemini 假传输层由环境变量配置，供开发服务器 / gunicorn 等加载
+
+环境变量:
+    LOAD_DATA_DIR               数据目录（多个 worker 共享，必填）
+    FAKE_GEMINI_LATENCY         Gemini 平均响应延迟（秒），默认 1.0
+    FAKE_GEMINI_JITTER          延迟浮动比例，默认 0.3
+    FAKE_GEMINI_ERROR_RATE      返回 500 的概率，默认 0
+    FAKE_GEMINI_THROTTLE_RATE   返回 429 的概率，默认 0
+
+用法:
+    gunicorn -w 2 --threads 8 benchmarks.load_app:app
+    python -m benchmarks.load_app --port 5001      # Flask 开发服务器（多线程，关闭调试与重载）
+"""
+
+import argparse
+import os
+
+from benchmarks.common import use_temp_data_dir
+
+import config
+
+use_temp_data_dir(os.environ['LOAD_DATA_DIR'])
+config.GEMINI_API_KEY = config.GEMINI_API_KEY or 'offline-load-test'
+
+from benchmarks.fake_gemini import FakeGeminiTransport  # noqa: E402
+from services import gemini_client  # noqa: E402
+
+gemini_client.set_transport(FakeGeminiTransport(
+    latency=float(os.getenv('FAKE_GEMINI_LATENCY', 1.0)),
+    connect_latency=0.15,
+    jitter=float(os.getenv('FAKE_GEMINI_JITTER', 0.3)),
+    error_rate=float(os.getenv('FAKE_GEMINI_ERROR_RATE', 0)),
+    throttle_rate=float(os.getenv('FAKE_GEMINI_THROTTLE_RATE', 0)),
+))
+
+from app import app  # noqa: E402
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5001)
+    args = parser.parse_args()
+    app.run(host=args.host, port=args.port, debug=False, threaded=True)
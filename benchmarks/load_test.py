@@ -0,0 +1,392 @@
+"""HTTP 压测 — 按真实操作比例回放编辑器流量，对比开发服务器与生产 WSGI 服务器（离线，Gemini 使用假传输层）
+
+每个并发用户是一个闭环：随机选一个操作 → 发请求 → 思考时间（指数分布）→ 下一个操作。
+并发用户数逐级增加，每级统计各接口吞吐、延迟分位数与错误率；
+交互接口（AI 调用除外）p99 不超过 --slo 且错误率不超过 1% 的最高并发数即为单机容量。
+
+用法:
+    python benchmarks/load_test.py --servers dev,gunicorn --users 1,4,16,32 --duration 20
+    python benchmarks/load_test.py --servers gunicorn --workers 4 --threads 8 --gemini-error-rate 0.05
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --users 8     # 压测已在运行的服务
+
+gunicorn / waitress 需另行安装（pip install gunicorn），未安装时跳过。
+压测客户端与服务端在同一台机器上运行时会互相争用 CPU，结论应在独立的压测机上复核。
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import itertools
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import harness  # noqa: E402
+from benchmarks.common import ROOT  # noqa: E402
+from benchmarks.datasets import WORDS, project_dicts  # noqa: E402
+
+IDEAS = [f'{a}{b}的{c}' for a, b, c in itertools.islice(itertools.permutations(WORDS, 3), 40)]
+SEED_PROJECTS = 50
+SEED_IMAGES = 20
+UPLOAD_POOL = 64
+
+
+# ── 流量组成 ──────────────────────────────────────────────────
+
+class Scenario:
+    """压测共享数据：预置的项目 / 素材 / 缩略图与上传用图片"""
+
+    def __init__(self, projects: list[dict], thumbnails: list[str], uploads: list[bytes]):
+        self.projects = projects
+        self.thumbnails = thumbnails
+        self.uploads = uploads
+
+
+# (操作名, 权重, 是否为 AI 调用)；权重大致对应编辑器中的操作频率
+MIX = [
+    ('prompts.list', 8, False),
+    ('prompts.get', 8, False),
+    ('prompts.save', 6, False),
+    ('prompts.build', 10, False),
+    ('prompts.export', 4, False),
+    ('assets.list', 8, False),
+    ('assets.search', 12, False),
+    ('assets.upload', 2, False),
+    ('thumbnails.get', 16, False),
+    ('thumbnails.resized', 6, False),
+    ('ai.prompt', 2, True),
+    ('ai.prompt_cached', 2, True),
+    ('ai.image', 1, True),
+]
+AI_ACTIONS = {name for name, _, ai in MIX if ai}
+
+
+def _request(action: str, rng: random.Random, scenario: Scenario) -> tuple[str, str, dict]:
+    """返回 (方法, 路径, httpx 请求参数)"""
+    if action == 'prompts.list':
+        return 'GET', '/api/prompts', {'params': {'limit': 20}}
+    if action == 'prompts.get':
+        return 'GET', f"/api/prompts/{rng.choice(scenario.projects)['id']}", {}
+    if action == 'prompts.save':
+        project = dict(rng.choice(scenario.projects), action=''.join(rng.choices(WORDS, k=8)))
+        return 'POST', '/api/prompts', {'json': project}
+    if action == 'prompts.build':
+        return 'POST', '/api/prompts/build', {'json': rng.choice(scenario.projects)}
+    if action == 'prompts.export':
+        return 'POST', '/api/prompts/export', {'json': rng.choice(scenario.projects)}
+    if action == 'assets.list':
+        return 'GET', '/api/assets', {'params': {'limit': 50}}
+    if action == 'assets.search':
+        return 'GET', '/api/assets', {'params': {'q': rng.choice(WORDS), 'limit': 50}}
+    if action == 'assets.upload':
+        data = rng.choice(scenario.uploads)
+        return 'POST', '/api/assets/upload', {'files': {'file': (f'load_{rng.getrandbits(32):08x}.png', data)}}
+    if action == 'thumbnails.get':
+        return 'GET', f'/data/thumbnails/{rng.choice(scenario.thumbnails)}', {}
+    if action == 'thumbnails.resized':
+        return 'GET', f'/data/thumbnails/{rng.choice(scenario.thumbnails)}', {
+            'params': {'w': rng.choice((64, 128, 256))}, 'headers': {'Accept': 'image/webp,*/*'}}
+    if action == 'ai.prompt':
+        return 'POST', '/api/ai/generate-prompt', {'json': {'idea': rng.choice(IDEAS), 'fresh': True}}
+    if action == 'ai.prompt_cached':
+        return 'POST', '/api/ai/generate-prompt', {'json': {'idea': rng.choice(IDEAS[:5])}}
+    if action == 'ai.image':
+        return 'POST', '/api/ai/generate-image', {'json': {'prompt': rng.choice(IDEAS), 'aspect_ratio': '16:9'}}
+    raise ValueError(action)
+
+
+def _png(rng: random.Random, size=(320, 180)) -> bytes:
+    from PIL import Image
+    img = Image.frombytes('RGB', size, rng.randbytes(size[0] * size[1] * 3))
+    buf = io.BytesIO()
+    img.save(buf, 'PNG')
+    return buf.getvalue()
+
+
+def seed(base_url: str) -> Scenario:
+    """写入压测所需的项目与素材，等待缩略图生成完成"""
+    rng = random.Random(0)
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        projects = []
+        for data in project_dicts(SEED_PROJECTS):
+            data['ref_assets'] = []
+            response = client.post('/api/prompts', json=data)
+            response.raise_for_status()
+            projects.append(dict(data, id=response.json()['id']))
+
+        asset_ids = []
+        for i in range(SEED_IMAGES):
+            name = f"{''.join(rng.sample(WORDS, 3))}_{i}.png"
+            response = client.post('/api/assets/upload', files={'file': (name, _png(rng, (1280, 720)))})
+            response.raise_for_status()
+            asset_ids.append(response.json()['asset']['id'])
+
+        deadline = time.monotonic() + 60
+        while True:
+            status = client.get('/api/assets/thumbnail-status', params={'ids': ','.join(asset_ids)}).json()
+            pending = [i for i, s in status['thumbnails'].items() if s['thumbnail_status'] == 'pending']
+            if not pending or time.monotonic() > deadline:
+                break
+            time.sleep(0.2)
+        thumbnails = [s['thumbnail_path'] for s in status['thumbnails'].values()
+                      if s['thumbnail_status'] == 'ready']
+    return Scenario(projects, thumbnails, [_png(rng) for _ in range(UPLOAD_POOL)])
+
+
+# ── 负载生成 ──────────────────────────────────────────────────
+
+def _user(base_url: str, scenario: Scenario, think: float, stop: threading.Event,
+          samples: list, user_id: int, timeout: float):
+    rng = random.Random(user_id)
+    names = [name for name, _, _ in MIX]
+    weights = [weight for _, weight, _ in MIX]
+    with httpx.Client(base_url=base_url, timeout=timeout) as client:
+        # 错开各用户的首个请求，避免同时起跑
+        stop.wait(rng.uniform(0, think))
+        while not stop.is_set():
+            action = rng.choices(names, weights)[0]
+            method, path, kwargs = _request(action, rng, scenario)
+            start = time.perf_counter()
+            try:
+                response = client.request(method, path, **kwargs)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            samples.append((action, status, time.perf_counter() - start, time.monotonic()))
+            stop.wait(rng.expovariate(1 / think) if think > 0 else 0)
+
+
+def run_level(base_url: str, scenario: Scenario, users: int, duration: float, think: float,
+              warmup: float, timeout: float) -> dict:
+    """以 users 个并发用户运行 duration 秒（不计前 warmup 秒），返回统计"""
+    samples: list = []
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=_user, args=(base_url, scenario, think, stop, samples, i, timeout), daemon=True)
+        for i in range(users)
+    ]
+    begin = time.monotonic()
+    for t in threads:
+        t.start()
+    time.sleep(warmup + duration)
+    stop.set()
+    for t in threads:
+        t.join(timeout + 5)
+    # 只统计在测量窗口内完成的请求
+    window_start, window_end = begin + warmup, begin + warmup + duration
+    measured = [s for s in samples if window_start <= s[3] <= window_end]
+    return _summarize(measured, users, duration)
+
+
+def _percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))]
+
+
+def _stats(rows: list[tuple], duration: float) -> dict:
+    latencies = sorted(r[2] * 1000 for r in rows)
+    errors = sum(1 for r in rows if not 200 <= r[1] < 400)
+    return {
+        'requests': len(rows),
+        'throughput_rps': round(len(rows) / duration, 2),
+        'error_rate': round(errors / len(rows), 4) if rows else 0.0,
+        'p50_ms': round(_percentile(latencies, 50), 2),
+        'p95_ms': round(_percentile(latencies, 95), 2),
+        'p99_ms': round(_percentile(latencies, 99), 2),
+        'max_ms': round(latencies[-1], 2) if latencies else 0.0,
+    }
+
+
+def _summarize(samples: list[tuple], users: int, duration: float) -> dict:
+    by_action = defaultdict(list)
+    for row in samples:
+        by_action[row[0]].append(row)
+    interactive = [row for row in samples if row[0] not in AI_ACTIONS]
+    return {
+        'users': users,
+        'overall': _stats(samples, duration),
+        'interactive': _stats(interactive, duration),
+        'endpoints': {action: _stats(rows, duration) for action, rows in sorted(by_action.items())},
+    }
+
+
+# ── 服务进程 ──────────────────────────────────────────────────
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _server_command(server: str, port: int, args) -> list[str] | None:
+    """返回启动命令；所需服务器未安装时返回 None"""
+    bind = f'127.0.0.1:{port}'
+    if server == 'dev':
+        return [sys.executable, '-m', 'benchmarks.load_app', '--port', str(port)]
+    if server == 'gunicorn':
+        if importlib.util.find_spec('gunicorn') is None:
+            return None
+        return [sys.executable, '-m', 'gunicorn', '-w', str(args.workers), '--threads', str(args.threads),
+                '-b', bind, '--timeout', '120', 'benchmarks.load_app:app']
+    if server == 'waitress':
+        if importlib.util.find_spec('waitress') is None:
+            return None
+        return [sys.executable, '-m', 'waitress', f'--listen={bind}', f'--threads={args.threads}',
+                'benchmarks.load_app:app']
+    raise ValueError(f'未知的服务器类型: {server}')
+
+
+class ServerProcess:
+    """在临时数据目录中启动被测服务，退出时停止进程并清理数据"""
+
+    def __init__(self, server: str, args):
+        self.server = server
+        self.port = _free_port()
+        self.command = _server_command(server, self.port, args)
+        self.base_url = f'http://127.0.0.1:{self.port}'
+        self.data_dir = tempfile.mkdtemp(prefix='seedance-load-')
+        self.env = dict(
+            os.environ,
+            LOAD_DATA_DIR=self.data_dir,
+            LOG_LEVEL='WARNING',
+            FAKE_GEMINI_LATENCY=str(args.gemini_latency),
+            FAKE_GEMINI_JITTER=str(args.gemini_jitter),
+            FAKE_GEMINI_ERROR_RATE=str(args.gemini_error_rate),
+            FAKE_GEMINI_THROTTLE_RATE=str(args.gemini_throttle_rate),
+        )
+        self.proc = None
+
+    def __enter__(self):
+        self._log = open(os.path.join(self.data_dir, 'server.log'), 'wb')
+        self.proc = subprocess.Popen(self.command, cwd=ROOT, env=self.env,
+                                     stdout=self._log, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f'{self.server} 启动失败，日志: {self._log.name}')
+            try:
+                if httpx.get(f'{self.base_url}/api/templates', timeout=1).status_code == 200:
+                    return self
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f'{self.server} 启动超时，日志: {self._log.name}')
+
+    def __exit__(self, exc_type, *exc):
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(15)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+        self._log.close()
+        if exc_type is None:
+            shutil.rmtree(self.data_dir, ignore_errors=True)
+
+
+# ── 报告 ──────────────────────────────────────────────────────
+
+def _print_level(server: str, result: dict):
+    o, i = result['overall'], result['interactive']
+    print(f"\n[{server}] 并发 {result['users']}: {o['throughput_rps']} req/s, 错误率 {o['error_rate']:.2%}, "
+          f"交互接口 p50/p95/p99 = {i['p50_ms']}/{i['p95_ms']}/{i['p99_ms']} ms")
+    print(f"  {'接口':<20} {'请求':>7} {'req/s':>8} {'错误率':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for action, s in result['endpoints'].items():
+        print(f"  {action:<20} {s['requests']:>7} {s['throughput_rps']:>8} {s['error_rate']:>8.2%} "
+              f"{s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9}")
+
+
+def capacity(levels: list[dict], slo_ms: float) -> int:
+    """交互接口 p99 与错误率均达标的最高并发用户数（0 表示最低一级即未达标）"""
+    best = 0
+    for result in levels:
+        i = result['interactive']
+        if i['p99_ms'] > slo_ms or i['error_rate'] > 0.01:
+            break
+        best = result['users']
+    return best
+
+
+def _print_comparison(report: dict, slo_ms: float):
+    print(f"\n{'服务器':<10} {'并发':>5} {'req/s':>8} {'错误率':>8} {'交互 p50':>10} {'交互 p99':>10} {'AI p99':>10}")
+    for server, levels in report['servers'].items():
+        for result in levels:
+            o, i = result['overall'], result['interactive']
+            ai_p99 = max((s['p99_ms'] for a, s in result['endpoints'].items() if a in AI_ACTIONS), default=0)
+            print(f"{server:<10} {result['users']:>5} {o['throughput_rps']:>8} {o['error_rate']:>8.2%} "
+                  f"{i['p50_ms']:>10} {i['p99_ms']:>10} {ai_p99:>10}")
+    for server, levels in report['servers'].items():
+        print(f'{server}: 交互接口 p99 ≤ {slo_ms:g} ms 的最高并发用户数 = {capacity(levels, slo_ms)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', default='dev,gunicorn', help='dev / gunicorn / waitress，逗号分隔')
+    parser.add_argument('--url', help='压测已在运行的服务（不启动服务进程，也不注入假 Gemini）')
+    parser.add_argument('--users', default='1,4,16,32', help='逐级并发用户数，逗号分隔')
+    parser.add_argument('--duration', type=float, default=20, help='每级测量时长（秒）')
+    parser.add_argument('--warmup', type=float, default=3, help='每级开始后不计入统计的时长（秒）')
+    parser.add_argument('--think', type=float, default=0.5, help='用户两次操作间的平均思考时间（秒）')
+    parser.add_argument('--timeout', type=float, default=30, help='单个请求超时（秒）')
+    parser.add_argument('--slo', type=float, default=500, help='交互接口 p99 目标（毫秒）')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker 进程数')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn / waitress 每进程线程数')
+    parser.add_argument('--gemini-latency', type=float, default=1.0)
+    parser.add_argument('--gemini-jitter', type=float, default=0.3)
+    parser.add_argument('--gemini-error-rate', type=float, default=0.0)
+    parser.add_argument('--gemini-throttle-rate', type=float, default=0.0)
+    parser.add_argument('--output', help='结果 JSON 路径，默认 benchmarks/results/load-<时间>.json')
+    args = parser.parse_args()
+    levels = [int(u) for u in args.users.split(',') if u]
+
+    targets = [('external', None)] if args.url else [(s.strip(), s.strip()) for s in args.servers.split(',')]
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'args': vars(args),
+            'mix': {name: weight for name, weight, _ in MIX},
+        },
+        'servers': {},
+        'skipped': {},
+    }
+    for label, server in targets:
+        if server is not None and _server_command(server, 0, args) is None:
+            report['skipped'][label] = '未安装'
+            print(f'[{label}] 未安装，跳过')
+            continue
+        with ServerProcess(server, args) if server else contextlib.nullcontext() as process:
+            base_url = process.base_url if process else args.url.rstrip('/')
+            print(f'[{label}] 准备数据: {base_url}')
+            scenario = seed(base_url)
+            results = []
+            for users in levels:
+                result = run_level(base_url, scenario, users, args.duration, args.think,
+                                   args.warmup, args.timeout)
+                _print_level(label, result)
+                results.append(result)
+            report['servers'][label] = results
+
+    _print_comparison(report, args.slo)
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results',
+                                         f"load-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    harness.save(report, output)
+    print(f'\n结果已写入 {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""本地 Seedance stub 服务 — 模拟任务创建 / 查询 / 取消与视频下载，可注入延迟与故障
+
+独立运行:
+    python benchmarks/stub_seedance.py --port 8765 --gen-time 20 --fail-rate 0.05
+    SEEDANCE_API_BASE=http://127.0.0.1:8765/api/v3 python app.py
+
+进程内使用:
+    server = serve(port=0, gen_time=1.0)
+    base_url = f'http://127.0.0.1:{server.server_port}/api/v3'
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TASKS_PATH = '/api/v3/contents/generations/tasks'
+
+
+class StubState:
+    """stub 服务状态与故障注入参数
+
+    Args:
+        gen_time: 单个视频的平均生成时间（秒），实际在 0.5~1.5 倍之间浮动
+        queue_time: 进入 running 前的排队时间（秒）
+        fail_rate: 远端生成失败（status=failed）的概率
+        error_rate: 任意 API 请求直接返回 500 的概率
+        max_running: 同时未完成的任务上限，超出时创建请求返回 429
+        video_size: 下载的视频字节数
+    """
+
+    def __init__(self, gen_time: float = 5.0, queue_time: float = 0.5, fail_rate: float = 0.0,
+                 error_rate: float = 0.0, max_running: int = 10, video_size: int = 2 * 1024 * 1024):
+        self.gen_time = gen_time
+        self.queue_time = queue_time
+        self.fail_rate = fail_rate
+        self.error_rate = error_rate
+        self.max_running = max_running
+        self.video_size = video_size
+        self.tasks: dict[str, dict] = {}
+        self.stats = {'created': 0, 'polls': 0, 'downloads': 0, 'errors': 0, 'throttled': 0}
+        self.lock = threading.Lock()
+
+    def status_of(self, task: dict, now: float) -> str:
+        if task['cancelled']:
+            return 'cancelled'
+        if now < task['start_at']:
+            return 'queued'
+        if now < task['ready_at']:
+            return 'running'
+        return 'failed' if task['fail'] else 'succeeded'
+
+
+def _video_bytes(task_id: str, size: int):
+    """按任务 ID 生成确定的伪视频数据（不同任务内容不同），分块产出"""
+    block = hashlib.sha256(task_id.encode()).digest() * 2048  # 64KB
+    sent = 0
+    while sent < size:
+        chunk = block[:min(len(block), size - sent)]
+        sent += len(chunk)
+        yield chunk
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state: StubState  # 由 serve() 绑定
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status: int, data: dict):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, message: str):
+        self._json(status, {'error': {'code': str(status), 'message': message}})
+
+    def _inject_error(self) -> bool:
+        if random.random() < self.state.error_rate:
+            with self.state.lock:
+                self.state.stats['errors'] += 1
+            self._error(500, 'injected internal error')
+            return True
+        return False
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        if self.path != TASKS_PATH:
+            return self._error(404, 'not found')
+        if self._inject_error():
+            return
+        state = self.state
+        now = time.time()
+        with state.lock:
+            unfinished = sum(1 for t in state.tasks.values()
+                             if state.status_of(t, now) in ('queued', 'running'))
+            if unfinished >= state.max_running:
+                state.stats['throttled'] += 1
+                return self._error(429, 'too many running tasks')
+            task_id = f'cgt-{uuid.uuid4().hex[:16]}'
+            start_at = now + state.queue_time
+            state.tasks[task_id] = {
+                'id': task_id,
+                'model': payload.get('model', ''),
+                'start_at': start_at,
+                'ready_at': start_at + state.gen_time * random.uniform(0.5, 1.5),
+                'fail': random.random() < state.fail_rate,
+                'cancelled': False,
+            }
+            state.stats['created'] += 1
+        self._json(200, {'id': task_id})
+
+    def do_GET(self):
+        state = self.state
+        match = re.fullmatch(r'/videos/([\w-]+)\.mp4', self.path)
+        if match:
+            return self._serve_video(match.group(1))
+        match = re.fullmatch(TASKS_PATH + r'/([\w-]+)', self.path)
+        if not match:
+            return self._error(404, 'not found')
+        if self._inject_error():
+            return
+        with state.lock:
+            state.stats['polls'] += 1
+            task = state.tasks.get(match.group(1))
+            if task is None:
+                return self._error(404, 'task not found')
+            status = state.status_of(task, time.time())
+        data = {'id': task['id'], 'model': task['model'], 'status': status}
+        if status == 'succeeded':
+            host = self.headers.get('Host')
+            data['content'] = {'video_url': f"http://{host}/videos/{task['id']}.mp4"}
+        elif status == 'failed':
+            data['error'] = {'code': 'InternalError', 'message': 'injected generation failure'}
+        self._json(200, data)
+
+    def do_DELETE(self):
+        match = re.fullmatch(TASKS_PATH + r'/([\w-]+)', self.path)
+        with self.state.lock:
+            task = self.state.tasks.get(match.group(1)) if match else None
+            if task is None:
+                return self._error(404, 'task not found')
+            task['cancelled'] = True
+        self._json(200, {})
+
+    def _serve_video(self, task_id: str):
+        with self.state.lock:
+            if task_id not in self.state.tasks:
+                return self._error(404, 'video not found')
+            self.state.stats['downloads'] += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(self.state.video_size))
+        self.end_headers()
+        for chunk in _video_bytes(task_id, self.state.video_size):
+            self.wfile.write(chunk)
+
+
+def serve(host: str = '127.0.0.1', port: int = 0, **options) -> ThreadingHTTPServer:
+    """在后台线程启动 stub 服务，port=0 时自动分配端口"""
+    handler = type('BoundStubHandler', (StubHandler,), {'state': StubState(**options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地 Seedance stub 服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--gen-time', type=float, default=5.0)
+    parser.add_argument('--queue-time', type=float, default=0.5)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--max-running', type=int, default=10)
+    parser.add_argument('--video-size', type=int, default=2 * 1024 * 1024)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, gen_time=args.gen_time, queue_time=args.queue_time,
+                   fail_rate=args.fail_rate, error_rate=args.error_rate,
+                   max_running=args.max_running, video_size=args.video_size)
+    print(f'Seedance stub 已启动: http://{args.host}:{server.server_port}/api/v3')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
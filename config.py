@@ -13,6 +13,25 @@ load_dotenv(os.path.join(BASE_DIR, '.env'))
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
 GEMINI_PROMPT_MODEL = 'gemini-2.5-flash'
 GEMINI_IMAGE_MODEL = 'gemini-2.0-flash-preview-image-generation'
+# 共享客户端：请求超时（秒）、连接池大小、空闲连接保活时间（秒）
+GEMINI_TIMEOUT = float(os.getenv('GEMINI_TIMEOUT', 120))
+GEMINI_MAX_CONNECTIONS = int(os.getenv('GEMINI_MAX_CONNECTIONS', 10))
+GEMINI_KEEPALIVE_EXPIRY = 60
+# 客户端限流：每分钟最多请求数，0 表示不限制
+GEMINI_RATE_LIMIT = int(os.getenv('GEMINI_RATE_LIMIT', 60))
+
+# 批量 AI 生成：单批上限、并发数、429 重试次数与退避时间（秒）
+AI_BATCH_MAX_IDEAS = 100
+AI_BATCH_CONCURRENCY = int(os.getenv('AI_BATCH_CONCURRENCY', 4))
+AI_BATCH_MAX_RETRIES = 5
+AI_BATCH_BACKOFF_BASE = 1.0
+AI_BATCH_BACKOFF_MAX = 60.0
+
+# 后台任务（AI 图片生成）：线程数、单次最多变体数、结束后保留时间（秒）、SSE 心跳间隔（秒）
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 4))
+IMAGE_JOB_MAX_VARIANTS = 4
+JOB_TTL = 3600
+SSE_HEARTBEAT = 15
 
 # 数据目录
 DATA_DIR = os.path.join(BASE_DIR, 'data')
@@ -22,19 +41,104 @@ THUMBNAILS_DIR = os.path.join(DATA_DIR, 'thumbnails')
 LOGS_DIR = os.path.join(DATA_DIR, 'logs')
 LOG_FILE = os.path.join(LOGS_DIR, 'app.log')
 
+# 日志：级别、格式（text / json）、后台写出队列容量（满时丢弃 INFO 及以下）
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+LOG_QUEUE_SIZE = 10000
+# 按模块抽样高频日志，格式 "模块=N,模块=N"（该模块 INFO 及以下每 N 条保留 1 条）
+LOG_SAMPLE_EVERY = {
+    module.strip(): int(n)
+    for module, _, n in (item.partition('=') for item in os.getenv('LOG_SAMPLE_EVERY', '').split(','))
+    if module.strip() and n.strip().isdigit()
+}
+
+# 素材库存储 (SQLite)；旧版 JSON 文件会在首次启动时自动迁移
+ASSET_DB_FILE = os.path.join(DATA_DIR, 'asset_store.db')
+LEGACY_ASSET_STORE_FILE = os.path.join(DATA_DIR, 'asset_store.json')
+# 素材入库 / 删除的跨进程锁文件（多 worker 部署时保证查重与引用计数一致）
+ASSET_LOCK_FILE = os.path.join(DATA_DIR, 'asset_store.lock')
+
+# 项目摘要索引
+PROJECT_INDEX_FILE = os.path.join(DATA_DIR, 'project_index.db')
+
 # Flask 配置
 HOST = '0.0.0.0'
 PORT = 5000
 DEBUG = True
 
+# 静态文件缓存：内容寻址的素材/缩略图标记为 immutable，其余凭 ETag 重新验证
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+STATIC_MAX_AGE = 24 * 3600
+# 部署在 nginx / Apache 后时开启，由前端服务器直接发送文件（X-Sendfile）
+USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+
 # 允许上传的文件类型
 ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp', 'bmp', 'gif'}
 ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'mov', 'avi', 'mkv', 'webm'}
 ALLOWED_AUDIO_EXTENSIONS = {'mp3', 'wav', 'aac', 'ogg', 'flac'}
 ALLOWED_EXTENSIONS = ALLOWED_IMAGE_EXTENSIONS | ALLOWED_VIDEO_EXTENSIONS | ALLOWED_AUDIO_EXTENSIONS
 
+# 分片上传：会话与 .part 文件放在素材目录下，完成时直接改名，无需复制
+UPLOADS_DIR = os.path.join(ASSETS_DIR, '.uploads')
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB，前端按此大小切片
+UPLOAD_SESSION_TTL = 7 * 24 * 3600  # 未完成会话保留 7 天
+
+# 项目归档导入的请求体上限（边读边处理，不受全局 MAX_CONTENT_LENGTH 限制）
+ARCHIVE_IMPORT_MAX_BYTES = int(os.getenv('ARCHIVE_IMPORT_MAX_BYTES', 64 * 1024 ** 3))  # 64GB
+
+# 列表接口分页上限
+PAGE_SIZE_MAX = 500
+
 # 缩略图配置
 THUMBNAIL_SIZE = (256, 256)
+# 衍生图（多尺寸 / WebP / AVIF）按需渲染，宽度取整到以下档位，磁盘缓存按 LRU 淘汰
+THUMBNAIL_DERIVATIVE_WIDTHS = (128, 256, 384, 512, 768, 1024)
+THUMBNAIL_CACHE_DIR = os.path.join(DATA_DIR, 'thumbnail_cache')
+THUMBNAIL_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 512MB
+# 缩略图后台进程池大小，0 表示在请求线程内同步生成
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', os.cpu_count() or 1))
+
+# 媒体信息探测 (ffprobe)，结果按内容哈希缓存
+PROBE_CACHE_FILE = os.path.join(DATA_DIR, 'probe_cache.db')
+FFPROBE_TIMEOUT = 15  # 秒
+
+# AI Prompt 响应缓存：相同创意 / 模型 / 系统提示词 / 温度直接返回缓存结果
+PROMPT_CACHE_FILE = os.path.join(DATA_DIR, 'prompt_cache.db')
+PROMPT_CACHE_MAX_ENTRIES = 2000
+PROMPT_CACHE_TTL = 7 * 24 * 3600  # 秒
+
+# 后台任务状态持久化到 SQLite，多 worker 部署时任意进程都能查询；等待其他进程的任务时按此间隔（秒）重新读取
+JOB_DB_FILE = os.path.join(DATA_DIR, 'jobs.db')
+JOB_SYNC_INTERVAL = 0.5
+
+# 音频波形：存储的包络列数（同时用于绘制缩略图）与解码超时
+WAVEFORM_COLUMNS = 128
+WAVEFORM_TIMEOUT = 60  # 秒
+
+# 感知哈希：视频均匀抽取的帧数，相似素材默认的最大汉明距离（64 位中）
+PHASH_VIDEO_SAMPLES = 4
+SIMILAR_MAX_DISTANCE = 10
+
+# Seedance 视频生成接口（火山方舟），可指向本地 stub 服务离线测试
+SEEDANCE_API_BASE = os.getenv('SEEDANCE_API_BASE', 'https://ark.cn-beijing.volces.com/api/v3')
+SEEDANCE_API_KEY = os.getenv('ARK_API_KEY', '')
+SEEDANCE_REQUEST_TIMEOUT = 60  # 秒
+VIDEO_TASK_DB_FILE = os.path.join(DATA_DIR, 'video_tasks.db')
+# 每个模型同时进行的任务数（默认值 + 按模型覆盖）
+SEEDANCE_CONCURRENCY = int(os.getenv('SEEDANCE_CONCURRENCY', 2))
+SEEDANCE_MODEL_CONCURRENCY = {}
+SEEDANCE_WORKERS = 8      # 提交 / 轮询 / 下载线程数
+SEEDANCE_TICK = 1.0       # 调度扫描间隔（秒）
+SEEDANCE_POLL_MIN = 5.0   # 轮询间隔下限 / 上限（秒）
+SEEDANCE_POLL_MAX = 60.0
+SEEDANCE_MAX_RETRIES = 5
+SEEDANCE_BACKOFF_BASE = 5.0
+SEEDANCE_BACKOFF_MAX = 300.0
+SEEDANCE_MAX_BATCH = 500  # 单次最多加入的任务数
+# 多 worker 部署时只有持有该锁的进程执行调度，其余进程每隔 LEADER_RETRY 秒尝试接管
+VIDEO_QUEUE_LOCK_FILE = os.path.join(DATA_DIR, 'video_queue.lock')
+SEEDANCE_LEADER_RETRY = 10.0
+SWEEP_MAX_VARIANTS = 100000  # 参数扫描的组合数上限（去重前）
 
 # Seedance 模型配置
 SEEDANCE_MODELS = [
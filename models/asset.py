@@ -2,12 +2,32 @@
 
 import json
 import os
+import sqlite3
+import sys
+import threading
 import time
 import uuid
 
+from models.change_log import ChangeLog
+from models.phash_index import PerceptualIndex
+from models.search_index import AssetIndex
+from utils.logger import logger
+from utils.pagination import paginate
+
 
 class Asset:
-    """素材资源模型"""
+    """素材资源模型
+
+    使用 __slots__ 省去每个实例的 __dict__；入库索引时调用 compact() 驻留重复字符串。
+    _json 缓存与数据库行一致的 JSON 片段（UTF-8 字节，中文约为 str 的一半内存），
+    列表接口直接拼接，不再逐条 to_dict() + 序列化。
+    """
+
+    __slots__ = (
+        'id', 'name', 'original_name', 'type', 'path', 'content_hash',
+        'thumbnail_path', 'thumbnail_status', 'tags', 'description', 'created_at',
+        'file_size', 'media', 'waveform', 'phash', '_json',
+    )
 
     TYPE_IMAGE = 'image'
     TYPE_VIDEO = 'video'
@@ -17,17 +37,28 @@ class Asset:
     VIDEO_EXTENSIONS = {'mp4', 'mov', 'avi', 'mkv', 'webm'}
     AUDIO_EXTENSIONS = {'mp3', 'wav', 'aac', 'ogg', 'flac'}
 
+    # 缩略图状态
+    THUMB_PENDING = 'pending'
+    THUMB_READY = 'ready'
+    THUMB_FAILED = 'failed'
+
     def __init__(self):
         self.id = str(uuid.uuid4())[:8]
         self.name = ''
         self.original_name = ''
         self.type = self.TYPE_IMAGE
         self.path = ''
+        self.content_hash = ''  # 内容哈希，相同内容的素材共享同一份文件
         self.thumbnail_path = ''
+        self.thumbnail_status = self.THUMB_READY
         self.tags = []
         self.description = ''
         self.created_at = time.time()
         self.file_size = 0  # bytes
+        self.media = {}  # ffprobe 探测结果: duration / width / height / fps / codec ...
+        self.waveform = {}  # 音频波形包络: {columns, min, max, rms}
+        self.phash = []  # 感知哈希 (dHash, 16 位十六进制)，视频为多个关键帧
+        self._json = None  # 序列化缓存，由 AssetStore 在读写数据库时设置
 
     @staticmethod
     def detect_type(filename: str) -> str:
@@ -41,20 +72,54 @@ class Asset:
             return Asset.TYPE_AUDIO
         return Asset.TYPE_IMAGE  # 默认
 
-    def to_dict(self) -> dict:
+    FIELDS = (
+        'id', 'name', 'original_name', 'type', 'path', 'content_hash',
+        'thumbnail_path', 'thumbnail_status', 'tags', 'description', 'created_at',
+        'file_size', 'media', 'waveform', 'phash',
+    )
+
+    def to_dict(self, fields: list[str] | None = None) -> dict:
+        """序列化为字典，fields 指定时只输出这些字段"""
+        if fields:
+            return {f: getattr(self, f) for f in fields if f in self.FIELDS}
         return {
             'id': self.id,
             'name': self.name,
             'original_name': self.original_name,
             'type': self.type,
             'path': self.path,
+            'content_hash': self.content_hash,
             'thumbnail_path': self.thumbnail_path,
+            'thumbnail_status': self.thumbnail_status,
             'tags': self.tags,
             'description': self.description,
             'created_at': self.created_at,
             'file_size': self.file_size,
+            'media': self.media,
+            'waveform': self.waveform,
+            'phash': self.phash,
         }
 
+    def to_json(self) -> bytes:
+        """完整字段的 UTF-8 JSON 片段（有缓存时直接返回）"""
+        if self._json is None:
+            self._json = json.dumps(self.to_dict(), ensure_ascii=False).encode()
+        return self._json
+
+    def compact(self):
+        """驻留类型、状态、标签等高度重复的字符串，列表字段转为元组
+
+        十万级素材时相同的标签 / 类型只保留一份字符串对象。
+        """
+        intern = sys.intern
+        self.type = intern(self.type)
+        self.thumbnail_status = intern(self.thumbnail_status)
+        self.tags = tuple(intern(t) for t in self.tags)
+        self.phash = tuple(self.phash)
+        if self.media:
+            self.media = {intern(k): intern(v) if isinstance(v, str) else v
+                          for k, v in self.media.items()}
+
     @classmethod
     def from_dict(cls, data: dict) -> 'Asset':
         asset = cls()
@@ -63,74 +128,314 @@ class Asset:
         asset.original_name = data.get('original_name', '')
         asset.type = data.get('type', cls.TYPE_IMAGE)
         asset.path = data.get('path', '')
+        asset.content_hash = data.get('content_hash', '')
         asset.thumbnail_path = data.get('thumbnail_path', '')
+        asset.thumbnail_status = data.get('thumbnail_status', cls.THUMB_READY)
         asset.tags = data.get('tags', [])
         asset.description = data.get('description', '')
         asset.created_at = data.get('created_at', time.time())
         asset.file_size = data.get('file_size', 0)
+        asset.media = data.get('media', {})
+        asset.waveform = data.get('waveform', {})
+        asset.phash = data.get('phash', [])
         return asset
 
 
+_FIELD_SET = frozenset(Asset.FIELDS)
+
+
+# 媒体过滤条件: 参数名 → (media 字段, 比较方式)
+MEDIA_FILTERS = {
+    'duration_min': ('duration', 'min'),
+    'duration_max': ('duration', 'max'),
+    'width_min': ('width', 'min'),
+    'height_min': ('height', 'min'),
+    'fps_min': ('fps', 'min'),
+    'ratio': ('ratio', 'eq'),
+    'video_codec': ('video_codec', 'eq'),
+    'audio_codec': ('audio_codec', 'eq'),
+    'audio_channels': ('audio_channels', 'eq'),
+}
+
+
+def match_media(media: dict, filters: dict) -> bool:
+    """素材媒体信息是否满足全部过滤条件（缺少该字段视为不满足）"""
+    for name, expected in filters.items():
+        key, op = MEDIA_FILTERS[name]
+        value = media.get(key)
+        if value is None:
+            return False
+        if op == 'min' and value < expected:
+            return False
+        if op == 'max' and value > expected:
+            return False
+        if op == 'eq' and value != expected:
+            return False
+    return True
+
+
 class AssetStore:
-    """素材仓库 — JSON 文件存储"""
+    """素材仓库 — SQLite 存储 + 内存哈希索引
 
-    def __init__(self, store_path: str):
-        self.store_path = store_path
-        self.assets: list[Asset] = []
+    每条素材独立成行（id 为主键），增删改只写入单行，复杂度 O(log N)；
+    内存中维护 id → Asset 的字典索引，查询为 O(1)；
+    检索走增量维护的倒排索引 (AssetIndex)，相似图查询走感知哈希索引 (PerceptualIndex)。
+    首次启动时自动迁移旧版 asset_store.json。
+
+    多进程部署（gunicorn 多 worker）时各进程各有一份内存索引：写入时在同一事务中
+    记录变更日志 (ChangeLog)，读取前检查 data_version，只重新加载其他进程改过的行。
+    """
+
+    def __init__(self, db_path: str, legacy_json_path: str | None = None):
+        self.db_path = db_path
+        self.legacy_json_path = legacy_json_path
+        self._index: dict[str, Asset] = {}
+        self._search_index = AssetIndex()
+        self._phash_index = PerceptualIndex()
+        self._by_hash: dict[str, tuple[str, ...]] = {}  # 引用数通常为 1，元组比集合省内存
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS assets ('
+            ' id TEXT PRIMARY KEY,'
+            ' created_at REAL NOT NULL,'
+            ' data TEXT NOT NULL)'
+        )
+        self._conn.commit()
+        self._changes = ChangeLog(self._conn, 'assets')
+        self._migrate_legacy()
         self._load()
 
-    def _load(self):
-        if os.path.exists(self.store_path):
-            with open(self.store_path, 'r', encoding='utf-8') as f:
+    @property
+    def assets(self) -> list[Asset]:
+        """按创建顺序返回全部素材"""
+        with self._lock:
+            self._sync()
+            return list(self._index.values())
+
+    def _migrate_legacy(self):
+        """将旧版 JSON 仓库一次性导入 SQLite，导入后重命名为 .migrated"""
+        path = self.legacy_json_path
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                self.assets = [Asset.from_dict(a) for a in data.get('assets', [])]
-        else:
-            self.assets = []
-
-    def _save(self):
-        os.makedirs(os.path.dirname(self.store_path), exist_ok=True)
-        with open(self.store_path, 'w', encoding='utf-8') as f:
-            json.dump(
-                {'assets': [a.to_dict() for a in self.assets]},
-                f, ensure_ascii=False, indent=2
-            )
+            assets = [Asset.from_dict(a) for a in data.get('assets', [])]
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO assets (id, created_at, data) VALUES (?, ?, ?)',
+                    [self._row(a) for a in assets]
+                )
+            os.replace(path, path + '.migrated')
+        except FileNotFoundError:
+            return  # 多个 worker 同时启动时已由其他进程迁移（INSERT OR IGNORE 保证重复导入无害）
+        logger.info('已迁移旧版素材库: %d 条 (%s)', len(assets), path)
+
+    def _load(self):
+        self._changes.reset()
+        rows = self._conn.execute(
+            'SELECT data FROM assets ORDER BY created_at, rowid'
+        ).fetchall()
+        self._index = {}
+        self._search_index = AssetIndex()
+        self._phash_index = PerceptualIndex()
+        self._by_hash = {}
+        for (data,) in rows:
+            self._link(self._parse(data))
+
+    @staticmethod
+    def _parse(data: str) -> Asset:
+        fields = json.loads(data)
+        asset = Asset.from_dict(fields)
+        # 字段齐全的行可直接作为 JSON 缓存；旧版本写入的行缺字段，留待首次序列化时生成
+        if fields.keys() == _FIELD_SET:
+            asset._json = data.encode()
+        return asset
+
+    def _sync(self):
+        """应用其他进程提交的修改（调用方需持有 _lock）"""
+        changed = self._changes.poll()
+        if changed is None:
+            logger.info('素材库变更日志已截断，重新加载全部素材')
+            self._load()
+            return
+        for asset_id in changed:
+            row = self._conn.execute('SELECT data FROM assets WHERE id = ?', (asset_id,)).fetchone()
+            if row is not None:
+                self._link(self._parse(row[0]))
+            elif asset_id in self._index:
+                self._unlink(self._index[asset_id])
+
+    def _link(self, asset: Asset):
+        """将素材加入内存索引"""
+        asset.compact()
+        old = self._index.get(asset.id)
+        if old is not None:
+            self._unlink(old)
+        self._index[asset.id] = asset
+        self._search_index.add(asset)
+        self._phash_index.add(asset.id, asset.phash)
+        if asset.content_hash:
+            self._by_hash[asset.content_hash] = self._by_hash.get(asset.content_hash, ()) + (asset.id,)
+
+    def _unlink(self, asset: Asset):
+        """将素材移出内存索引"""
+        self._index.pop(asset.id, None)
+        self._search_index.remove(asset.id)
+        self._phash_index.remove(asset.id)
+        ids = self._by_hash.get(asset.content_hash)
+        if ids is not None:
+            ids = tuple(i for i in ids if i != asset.id)
+            if ids:
+                self._by_hash[asset.content_hash] = ids
+            else:
+                del self._by_hash[asset.content_hash]
+
+    @staticmethod
+    def _row(asset: Asset) -> tuple:
+        """数据库行 (id, created_at, data)，同时刷新素材的 JSON 缓存"""
+        data = json.dumps(asset.to_dict(), ensure_ascii=False)
+        asset._json = data.encode()
+        return asset.id, asset.created_at, data
 
     def add(self, asset: Asset):
-        self.assets.append(asset)
-        self._save()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO assets (id, created_at, data) VALUES (?, ?, ?)',
+                self._row(asset)
+            )
+            self._changes.record(asset.id)
+            self._link(asset)
+
+    def update_fields(self, asset_id: str, **fields) -> Asset | None:
+        """只修改指定字段，返回修改后的素材（不存在时返回 None）
+
+        在写事务（BEGIN IMMEDIATE）内重新读取该行再写回，修改不同字段的并发写入
+        （如更新标签与后台处理结果，可能来自不同进程）不会以旧值相互覆盖；
+        索引中的旧对象不被修改，由新对象整体替换。
+        """
+        unknown = fields.keys() - _FIELD_SET
+        if unknown:
+            raise ValueError(f'未知的素材字段: {", ".join(sorted(unknown))}')
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute('SELECT data FROM assets WHERE id = ?', (asset_id,)).fetchone()
+                if row is None:
+                    self._conn.rollback()
+                    return None
+                asset = self._parse(row[0])
+                for name, value in fields.items():
+                    setattr(asset, name, value)
+                _, created_at, data = self._row(asset)
+                self._conn.execute(
+                    'UPDATE assets SET created_at = ?, data = ? WHERE id = ?',
+                    (created_at, data, asset_id)
+                )
+                self._changes.record(asset_id)
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._link(asset)
+            return asset
 
     def remove(self, asset_id: str) -> bool:
-        before = len(self.assets)
-        self.assets = [a for a in self.assets if a.id != asset_id]
-        if len(self.assets) < before:
-            self._save()
+        with self._lock, self._conn:
+            asset = self._index.get(asset_id)
+            if asset is None:
+                return False
+            self._unlink(asset)
+            self._conn.execute('DELETE FROM assets WHERE id = ?', (asset_id,))
+            self._changes.record(asset_id)
             return True
-        return False
 
     def get(self, asset_id: str) -> Asset | None:
-        for a in self.assets:
-            if a.id == asset_id:
-                return a
-        return None
+        with self._lock:
+            self._sync()
+            return self._index.get(asset_id)
+
+    def find_by_hash(self, content_hash: str) -> list[Asset]:
+        """查找引用同一内容的全部素材（即该文件的引用计数）"""
+        with self._lock:
+            self._sync()
+            return [self._index[i] for i in self._by_hash.get(content_hash, ())]
 
     def list_all(self) -> list[dict]:
         return [a.to_dict() for a in self.assets]
 
     def search(self, query: str = '', tag: str = '', asset_type: str = '') -> list[dict]:
-        results = self.assets
-        if query:
-            q = query.lower()
-            results = [a for a in results if q in a.name.lower() or q in a.description.lower()]
-        if tag:
-            results = [a for a in results if tag in a.tags]
-        if asset_type:
-            results = [a for a in results if a.type == asset_type]
-        return [a.to_dict() for a in results]
+        """检索素材，有 query 时按相关度排序"""
+        with self._lock:
+            self._sync()
+            ids = self._search_index.search(query=query, tag=tag, asset_type=asset_type)
+            return [self._index[i].to_dict() for i in ids]
+
+    def search_page(self, query: str = '', tag: str = '', asset_type: str = '',
+                    limit: int | None = None, cursor: str | None = None,
+                    fields: list[str] | None = None,
+                    media: dict | None = None) -> tuple[list[dict], str | None]:
+        """分页检索，返回 (当前页, 下一页游标)
+
+        media 为媒体信息过滤条件，如 {'duration_min': 3, 'ratio': '16:9'}，
+        直接使用入库时探测的结果，不重新读取文件。
+        """
+        with self._lock:
+            ids, next_cursor = self._page_ids(query, tag, asset_type, limit, cursor, media)
+            return [self._index[i].to_dict(fields) for i in ids], next_cursor
+
+    def search_page_json(self, query: str = '', tag: str = '', asset_type: str = '',
+                         limit: int | None = None, cursor: str | None = None,
+                         fields: list[str] | None = None,
+                         media: dict | None = None) -> tuple[list[bytes], str | None]:
+        """同 search_page，但返回每条素材的 JSON 片段；未指定 fields 时直接使用缓存"""
+        with self._lock:
+            ids, next_cursor = self._page_ids(query, tag, asset_type, limit, cursor, media)
+            if fields:
+                return [json.dumps(self._index[i].to_dict(fields), ensure_ascii=False).encode()
+                        for i in ids], next_cursor
+            return [self._index[i].to_json() for i in ids], next_cursor
+
+    def _page_ids(self, query: str, tag: str, asset_type: str, limit: int | None,
+                  cursor: str | None, media: dict | None) -> tuple[list[str], str | None]:
+        self._sync()
+        keyed = self._search_index.search_keys(query=query, tag=tag, asset_type=asset_type)
+        if media:
+            index = self._index
+            keyed = [(k, i) for k, i in keyed if match_media(index[i].media, media)]
+        return paginate(keyed, limit=limit, cursor=cursor, key_types=(float, float, str))
+
+    def similar(self, asset_id: str, max_distance: int,
+                limit: int | None = None) -> list[tuple[Asset, int]] | None:
+        """查找感知哈希相近的素材，按 (距离, 创建时间) 排序
+
+        Returns:
+            [(素材, 汉明距离)]，素材不存在时返回 None
+        """
+        with self._lock:
+            self._sync()
+            asset = self._index.get(asset_id)
+            if asset is None:
+                return None
+            matches = self._phash_index.query(asset.phash, max_distance, exclude=asset_id)
+            ranked = sorted(
+                ((self._index[i], d) for i, d in matches.items()),
+                key=lambda item: (item[1], item[0].created_at)
+            )
+            return ranked[:limit] if limit else ranked
+
+    def all_tags(self) -> list[str]:
+        with self._lock:
+            self._sync()
+            return self._search_index.tags()
 
     def update_tags(self, asset_id: str, tags: list[str]) -> bool:
-        asset = self.get(asset_id)
-        if asset:
-            asset.tags = tags
-            self._save()
-            return True
-        return False
+        return self.update_fields(asset_id, tags=list(tags)) is not None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,63 @@
+"""SQLite 变更日志 — 多个进程共享同一数据库时，让各自的内存索引只增量同步变化的行"""
+
+import sqlite3
+
+
+class ChangeLog:
+    """记录被修改的主键，供其他进程增量同步
+
+    写入方在同一事务中调用 record()；读取方调用 poll()：
+    先比较 PRAGMA data_version（只有其他连接提交后才会变化，开销可忽略），
+    未变化时直接返回空列表，变化时才读取 seq 大于上次位置的变更。
+    日志只保留最近 keep 条，落后太多的进程 poll() 返回 None，需整表重新加载。
+    """
+
+    def __init__(self, conn: sqlite3.Connection, table: str, keep: int = 10000):
+        self._conn = conn
+        self._table = f'{table}_changes'
+        self.keep = keep
+        conn.execute(
+            f'CREATE TABLE IF NOT EXISTS {self._table} ('
+            ' seq INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' key TEXT NOT NULL)'
+        )
+        conn.commit()
+        self.reset()
+
+    def _data_version(self) -> int:
+        return self._conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def _max_seq(self) -> int:
+        return self._conn.execute(f'SELECT COALESCE(MAX(seq), 0) FROM {self._table}').fetchone()[0]
+
+    def reset(self):
+        """全量加载之前调用：此后提交的变更都会由 poll() 返回（可能与加载结果重复，重放无害）"""
+        self._version = self._data_version()
+        self._seq = self._max_seq()
+
+    def record(self, *keys: str):
+        """记录变更（须在写入数据的同一事务中调用）"""
+        if not keys:
+            return
+        self._conn.executemany(f'INSERT INTO {self._table} (key) VALUES (?)', [(k,) for k in keys])
+        seq = self._conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+        if seq % 1000 < len(keys):  # 约每 1000 条截断一次
+            self._conn.execute(f'DELETE FROM {self._table} WHERE seq <= ?', (seq - self.keep,))
+
+    def poll(self) -> list[str] | None:
+        """返回其他进程修改过的主键（可能包含本进程自己的修改），日志已被截断时返回 None"""
+        version = self._data_version()
+        if version == self._version:
+            return []
+        self._version = version
+        rows = self._conn.execute(
+            f'SELECT seq, key FROM {self._table} WHERE seq > ? ORDER BY seq', (self._seq,)
+        ).fetchall()
+        if not rows:
+            return []
+        # seq 在写锁内分配、按提交顺序递增，出现缺口说明中间的记录已被截断
+        truncated = rows[0][0] > self._seq + 1
+        self._seq = rows[-1][0]
+        if truncated:
+            return None
+        return list(dict.fromkeys(key for _, key in rows))
@@ -0,0 +1,127 @@
+"""感知哈希索引 — 紧凑 uint64 数组 + 向量化汉明距离查询"""
+
+# 全 0 / 全 1 的 dHash 来自纯色或单调渐变的画面（含旧版本对平坦图片算出的哈希），
+# 不携带内容信息，彼此距离为 0，不参与索引与查询
+_DEGENERATE = frozenset({'0' * 16, 'f' * 16})
+
+
+class PerceptualIndex:
+    """感知哈希索引
+
+    全部哈希存放在一个连续的 uint64 数组中（每个素材可有多个，如视频的多个关键帧），
+    查询时对整个数组做一次 XOR + popcount，十万级素材也只需毫秒级。
+    删除只打墓碑标记，墓碑过半时再压缩数组。
+    """
+
+    # 数组初始容量
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self):
+        import numpy as np
+        self.np = np
+        self._hashes = np.zeros(self.INITIAL_CAPACITY, dtype=np.uint64)
+        self._alive = np.zeros(self.INITIAL_CAPACITY, dtype=bool)
+        self._owners: list[str | None] = []  # 行号 → 素材 ID
+        self._rows: dict[str, list[int]] = {}  # 素材 ID → 行号
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, asset_id: str, hashes: list[str]):
+        """加入（或刷新）一个素材的哈希（16 位十六进制字符串）"""
+        self.remove(asset_id)
+        hashes = [h for h in hashes if h not in _DEGENERATE]
+        if not hashes:
+            return
+        np = self.np
+        start = len(self._owners)
+        end = start + len(hashes)
+        if end > len(self._hashes):
+            self._grow(end)
+        self._hashes[start:end] = np.array([int(h, 16) for h in hashes], dtype=np.uint64)
+        self._alive[start:end] = True
+        self._owners.extend([asset_id] * len(hashes))
+        self._rows[asset_id] = list(range(start, end))
+
+    def remove(self, asset_id: str):
+        rows = self._rows.pop(asset_id, None)
+        if not rows:
+            return
+        self._alive[rows] = False
+        for row in rows:
+            self._owners[row] = None
+        self._dead += len(rows)
+        if self._dead > self.INITIAL_CAPACITY and self._dead * 2 > len(self._owners):
+            self._compact()
+
+    def _grow(self, needed: int):
+        np = self.np
+        capacity = max(needed, len(self._hashes) * 2)
+        hashes = np.zeros(capacity, dtype=np.uint64)
+        alive = np.zeros(capacity, dtype=bool)
+        hashes[:len(self._hashes)] = self._hashes
+        alive[:len(self._alive)] = self._alive
+        self._hashes, self._alive = hashes, alive
+
+    def _compact(self):
+        """丢弃墓碑行并重建行号映射"""
+        size = len(self._owners)
+        keep = self.np.flatnonzero(self._alive[:size])
+        count = len(keep)
+        self._hashes[:count] = self._hashes[keep]
+        self._alive[:count] = True
+        self._alive[count:] = False
+        self._owners = [self._owners[row] for row in keep]
+        self._rows = {}
+        for row, asset_id in enumerate(self._owners):
+            self._rows.setdefault(asset_id, []).append(row)
+        self._dead = 0
+
+    def _popcount(self, values):
+        np = self.np
+        if hasattr(np, 'bitwise_count'):  # NumPy >= 2.0
+            return np.bitwise_count(values)
+        return _byte_popcounts(np)[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+    def query(self, hashes: list[str], max_distance: int,
+              exclude: str | None = None) -> dict[str, int]:
+        """查找汉明距离不超过 max_distance 的素材
+
+        多哈希素材取所有哈希对之间的最小距离。
+
+        Returns:
+            {素材 ID: 距离}
+        """
+        np = self.np
+        size = len(self._owners)
+        hashes = [h for h in hashes if h not in _DEGENERATE]
+        if not hashes or not size:
+            return {}
+        stored = self._hashes[:size]
+        best = np.full(size, 65, dtype=np.int64)
+        for value in hashes:
+            distance = self._popcount(stored ^ np.uint64(int(value, 16)))
+            np.minimum(best, distance, out=best)
+        best[~self._alive[:size]] = 65
+
+        result = {}
+        for row in np.flatnonzero(best <= max_distance):
+            asset_id = self._owners[row]
+            if asset_id == exclude:
+                continue
+            distance = int(best[row])
+            if distance < result.get(asset_id, 65):
+                result[asset_id] = distance
+        return result
+
+
+_popcount_table = None
+
+
+def _byte_popcounts(np):
+    """0~255 每个字节的置位数查找表（NumPy < 2.0 时使用）"""
+    global _popcount_table
+    if _popcount_table is None:
+        _popcount_table = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+    return _popcount_table
@@ -0,0 +1,103 @@
+"""项目摘要索引 — 避免列表时逐个解析项目文件"""
+
+import json
+import os
+import sqlite3
+import threading
+
+from models.prompt import SeedancePrompt
+from utils.logger import logger
+
+
+class ProjectIndex:
+    """项目摘要索引 — SQLite 持久化
+
+    以项目文件名为键，缓存 (mtime, size, 摘要)。列表时只对目录做一次
+    scandir 并比对 mtime / size，仅重新解析被外部修改或新增的文件；
+    save / delete 时增量更新单行。解析失败的文件同样记录，直到文件再次变化。
+    """
+
+    def __init__(self, db_path: str, projects_dir: str):
+        self.db_path = db_path
+        self.projects_dir = projects_dir
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS projects ('
+            ' filename TEXT PRIMARY KEY,'
+            ' mtime INTEGER NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' summary TEXT)'
+        )
+        self._conn.commit()
+        # filename → (mtime, size, 摘要或 None)
+        self._entries: dict[str, tuple] = {}
+        self._load()
+
+    def _load(self):
+        rows = self._conn.execute('SELECT filename, mtime, size, summary FROM projects').fetchall()
+        self._entries = {
+            filename: (mtime, size, json.loads(summary) if summary else None)
+            for filename, mtime, size, summary in rows
+        }
+
+    def _refresh_entry(self, filename: str, stat: os.stat_result) -> tuple:
+        """重新解析单个项目文件并写入索引"""
+        filepath = os.path.join(self.projects_dir, filename)
+        try:
+            summary = SeedancePrompt.load(filepath).to_summary()
+        except Exception as e:
+            logger.warning('项目文件解析失败，已跳过: %s (%s)', filename, e)
+            summary = None
+        entry = (stat.st_mtime_ns, stat.st_size, summary)
+        self._conn.execute(
+            'INSERT OR REPLACE INTO projects (filename, mtime, size, summary) VALUES (?, ?, ?, ?)',
+            (filename, entry[0], entry[1],
+             json.dumps(summary, ensure_ascii=False) if summary else None)
+        )
+        self._entries[filename] = entry
+        return entry
+
+    def update(self, filename: str):
+        """项目文件写入后调用，刷新对应条目"""
+        with self._lock, self._conn:
+            filepath = os.path.join(self.projects_dir, filename)
+            self._refresh_entry(filename, os.stat(filepath))
+
+    def remove(self, filename: str):
+        """项目文件删除后调用"""
+        with self._lock, self._conn:
+            if self._entries.pop(filename, None) is not None:
+                self._conn.execute('DELETE FROM projects WHERE filename = ?', (filename,))
+
+    def summaries(self) -> list[dict]:
+        """返回全部项目摘要，顺带校验并修复与磁盘不一致的条目"""
+        with self._lock, self._conn:
+            if not os.path.isdir(self.projects_dir):
+                return []
+
+            seen = set()
+            summaries = []
+            with os.scandir(self.projects_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith('.json') or not entry.is_file():
+                        continue
+                    seen.add(entry.name)
+                    stat = entry.stat()
+                    cached = self._entries.get(entry.name)
+                    if cached is None or cached[0] != stat.st_mtime_ns or cached[1] != stat.st_size:
+                        cached = self._refresh_entry(entry.name, stat)
+                    if cached[2]:
+                        summaries.append(cached[2])
+
+            stale = [filename for filename in self._entries if filename not in seen]
+            for filename in stale:
+                del self._entries[filename]
+            if stale:
+                self._conn.executemany(
+                    'DELETE FROM projects WHERE filename = ?', [(f,) for f in stale]
+                )
+            return summaries
@@ -4,6 +4,8 @@ import json
 import time
 import uuid
 
+from utils.storage import atomic_write
+
 
 class PromptElement:
     """单个提示词要素"""
@@ -116,6 +118,16 @@ class SeedancePrompt:
             'prompt_text': self.build_prompt_text(),
         }
 
+    def to_summary(self) -> dict:
+        """项目列表使用的摘要信息"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'task_type': self.task_type,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+        }
+
     def to_api_payload(self) -> dict:
         """导出为 Seedance API 兼容的 JSON 格式"""
         payload = {
@@ -161,9 +173,8 @@ class SeedancePrompt:
         return prompt
 
     def save(self, filepath: str):
-        """保存到 JSON 文件"""
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        """保存到 JSON 文件（临时文件 + rename，其他进程不会读到半截内容）"""
+        atomic_write(filepath, json.dumps(self.to_dict(), ensure_ascii=False, indent=2))
 
     @classmethod
     def load(cls, filepath: str) -> 'SeedancePrompt':
@@ -0,0 +1,205 @@
+"""素材倒排索引 — 名称/描述/标签的字符 n-gram 全文检索"""
+
+from array import array
+from bisect import bisect_left
+
+
+class AssetIndex:
+    """素材倒排索引
+
+    - 文本字段（名称、描述、标签）按字符 unigram + bigram 建立倒排表，
+      中文无需分词即可检索；
+    - 标签、类型分别维护精确匹配的倒排表；
+    - 新增 / 删除 / 改标签时只更新该素材对应的倒排项。
+
+    查询时先取各 gram 倒排表的交集（从最短的开始）得到候选集，
+    再做一次子串校验排除 bigram 误报，最后按命中字段打分排序。
+
+    每条素材分配一个行号（删除后复用），文档字段按列存放，创建时间为紧凑的 float 数组；
+    倒排表为升序的 uint32 行号数组（每项 4 字节），而非 id 字符串集合。
+    """
+
+    # 命中字段权重
+    SCORE_NAME_EXACT = 8
+    SCORE_NAME_PREFIX = 5
+    SCORE_NAME = 3
+    SCORE_TAG = 2
+    SCORE_DESCRIPTION = 1
+
+    def __init__(self):
+        self._grams: dict[str, array] = {}
+        self._tags: dict[str, array] = {}
+        self._types: dict[str, array] = {}
+        # 文档列：id、小写名称、小写描述、标签、类型、创建时间，用于删除、校验与排序
+        self._rows: dict[str, int] = {}
+        self._ids: list[str] = []
+        self._names: list[str] = []
+        self._descriptions: list[str] = []
+        self._doc_tags: list[tuple] = []
+        self._doc_types: list[str] = []
+        self._created = array('d')
+        self._free: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @staticmethod
+    def _grams_of(text: str) -> set[str]:
+        """字符 unigram + bigram（空白不参与组合）"""
+        grams = set()
+        for word in text.split():
+            grams.update(word)
+            grams.update(word[i:i + 2] for i in range(len(word) - 1))
+        return grams
+
+    @staticmethod
+    def _query_grams(term: str) -> set[str]:
+        if len(term) == 1:
+            return {term}
+        return {term[i:i + 2] for i in range(len(term) - 1)}
+
+    def add(self, asset):
+        """加入（或刷新）一条素材的索引"""
+        if asset.id in self._rows:
+            self.remove(asset.id)
+        name = _lower(asset.name)
+        description = _lower(asset.description)
+        tags = tuple(asset.tags)
+        if self._free:
+            row = self._free.pop()
+            self._ids[row] = asset.id
+            self._names[row] = name
+            self._descriptions[row] = description
+            self._doc_tags[row] = tags
+            self._doc_types[row] = asset.type
+            self._created[row] = asset.created_at
+        else:
+            row = len(self._names)
+            self._ids.append(asset.id)
+            self._names.append(name)
+            self._descriptions.append(description)
+            self._doc_tags.append(tags)
+            self._doc_types.append(asset.type)
+            self._created.append(asset.created_at)
+        self._rows[asset.id] = row
+
+        text = ' '.join((name, description, *(t.lower() for t in tags)))
+        for gram in self._grams_of(text):
+            self._insert(self._grams, gram, row)
+        for tag in tags:
+            self._insert(self._tags, tag, row)
+        self._insert(self._types, asset.type, row)
+
+    def remove(self, asset_id: str):
+        row = self._rows.pop(asset_id, None)
+        if row is None:
+            return
+        name, description = self._names[row], self._descriptions[row]
+        tags, asset_type = self._doc_tags[row], self._doc_types[row]
+        self._ids[row] = self._names[row] = self._descriptions[row] = self._doc_types[row] = ''
+        self._doc_tags[row] = ()
+        self._free.append(row)
+        text = ' '.join((name, description, *(t.lower() for t in tags)))
+        for gram in self._grams_of(text):
+            self._discard(self._grams, gram, row)
+        for tag in tags:
+            self._discard(self._tags, tag, row)
+        self._discard(self._types, asset_type, row)
+
+    @staticmethod
+    def _insert(postings: dict[str, array], key: str, row: int):
+        rows = postings.get(key)
+        if rows is None:
+            postings[key] = array('I', (row,))
+        elif rows[-1] < row:
+            rows.append(row)  # 新行号总是最大，绝大多数情况直接追加
+        else:
+            rows.insert(bisect_left(rows, row), row)
+
+    @staticmethod
+    def _discard(postings: dict[str, array], key: str, row: int):
+        rows = postings.get(key)
+        if rows is None:
+            return
+        i = bisect_left(rows, row)
+        if i < len(rows) and rows[i] == row:
+            del rows[i]
+            if not rows:
+                del postings[key]
+
+    def tags(self) -> list[str]:
+        """所有已使用的标签"""
+        return sorted(self._tags)
+
+    def search(self, query: str = '', tag: str = '', asset_type: str = '') -> list[str]:
+        """检索素材 id，query / tag / type 三个条件 AND 组合
+
+        query 按空白拆分为多个词，每个词都必须命中名称、描述或标签之一。
+        有 query 时按相关度降序，否则按创建时间顺序返回。
+        """
+        return [asset_id for _, asset_id in sorted(self.search_keys(query, tag, asset_type))]
+
+    def search_keys(self, query: str = '', tag: str = '', asset_type: str = ''):
+        """检索并返回未排序的 (排序键, id)
+
+        排序键为 (-相关度, created_at, id)，全局唯一且跨重启稳定，可直接用作分页游标。
+        """
+        terms = [t for t in query.lower().split() if t]
+
+        postings = []
+        empty = array('I')
+        if tag:
+            postings.append(self._tags.get(tag, empty))
+        if asset_type:
+            postings.append(self._types.get(asset_type, empty))
+        for term in terms:
+            for gram in self._query_grams(term):
+                postings.append(self._grams.get(gram, empty))
+
+        if postings:
+            postings.sort(key=len)
+            candidates = postings[0]
+            for rows in postings[1:]:
+                if not candidates:
+                    break
+                candidates = set(candidates).intersection(rows)
+        else:
+            candidates = self._rows.values()
+
+        ids, created = self._ids, self._created
+        if not terms:
+            return [((0, created[r], ids[r]), ids[r]) for r in candidates]
+
+        keyed = []
+        for row in candidates:
+            score = self._score(row, terms)
+            if score:
+                keyed.append(((-score, created[row], ids[row]), ids[row]))
+        return keyed
+
+    def _score(self, row: int, terms: list[str]) -> int:
+        """所有词都命中时返回总分，否则返回 0"""
+        name, description, tags = self._names[row], self._descriptions[row], self._doc_tags[row]
+        total = 0
+        for term in terms:
+            score = 0
+            if term == name:
+                score += self.SCORE_NAME_EXACT
+            elif name.startswith(term):
+                score += self.SCORE_NAME_PREFIX
+            elif term in name:
+                score += self.SCORE_NAME
+            if any(term in t.lower() for t in tags):
+                score += self.SCORE_TAG
+            if term in description:
+                score += self.SCORE_DESCRIPTION
+            if not score:
+                return 0
+            total += score
+        return total
+
+
+def _lower(text: str) -> str:
+    """转小写；本身已是小写（如中文）时复用原字符串，不再额外保存一份"""
+    lowered = text.lower()
+    return text if lowered == text else lowered
@@ -0,0 +1,186 @@
+"""Seedance 视频生成任务模型与持久化队列"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from models.change_log import ChangeLog
+
+
+class VideoTask:
+    """一次 Seedance 视频生成
+
+    状态流转:
+        queued → submitting → running → downloading → succeeded
+    任一阶段不可恢复的错误 → failed；用户取消 → cancelled
+    """
+
+    QUEUED = 'queued'            # 本地排队，等待提交
+    SUBMITTING = 'submitting'    # 正在创建远端任务
+    RUNNING = 'running'          # 远端生成中，定期轮询
+    DOWNLOADING = 'downloading'  # 生成完成，正在下载视频入库
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    ACTIVE = {SUBMITTING, RUNNING, DOWNLOADING}  # 占用模型并发名额
+    FINISHED = {SUCCEEDED, FAILED, CANCELLED}
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:12]
+        self.project_id = ''
+        self.name = ''
+        self.model = ''
+        self.payload = {}
+        self.status = self.QUEUED
+        self.remote_id = ''
+        self.remote_status = ''
+        self.video_url = ''
+        self.asset_id = ''
+        self.attempts = 0       # 已失败的尝试次数（提交 / 下载）
+        self.poll_interval = 0  # 当前轮询间隔（秒），自适应增长
+        self.next_check_at = 0.0
+        self.error = ''
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'project_id': self.project_id,
+            'name': self.name,
+            'model': self.model,
+            'payload': self.payload,
+            'status': self.status,
+            'remote_id': self.remote_id,
+            'remote_status': self.remote_status,
+            'video_url': self.video_url,
+            'asset_id': self.asset_id,
+            'attempts': self.attempts,
+            'poll_interval': self.poll_interval,
+            'next_check_at': self.next_check_at,
+            'error': self.error,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'VideoTask':
+        task = cls()
+        for key, value in data.items():
+            if hasattr(task, key):
+                setattr(task, key, value)
+        return task
+
+    def copy(self) -> 'VideoTask':
+        """修改前先复制，保存成功之前不影响仓库中的对象"""
+        return VideoTask.from_dict(self.to_dict())
+
+
+class VideoTaskStore:
+    """任务队列仓库 (SQLite)
+
+    每次状态变化立即落盘，进程重启后从库中恢复未完成的任务。
+    内存中保留 id → VideoTask 索引供调度线程与 API 读取；多进程部署时读取前
+    经变更日志同步其他进程的修改。索引中的对象只读，修改时先 copy() 再 save()。
+    """
+
+    def __init__(self, db_path: str):
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS video_tasks ('
+            ' id TEXT PRIMARY KEY,'
+            ' status TEXT NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' data TEXT NOT NULL)'
+        )
+        self._conn.commit()
+        self._changes = ChangeLog(self._conn, 'video_tasks')
+        self._index: dict[str, VideoTask] = {}
+        self._load()
+
+    def _load(self):
+        self._changes.reset()
+        rows = self._conn.execute('SELECT data FROM video_tasks ORDER BY created_at').fetchall()
+        self._index = {}
+        for (data,) in rows:
+            task = VideoTask.from_dict(json.loads(data))
+            self._index[task.id] = task
+
+    def sync(self):
+        """载入其他进程提交的修改"""
+        with self._lock:
+            changed = self._changes.poll()
+            if changed is None:
+                self._load()
+                return
+            for task_id in changed:
+                self._reload(task_id)
+
+    def _reload(self, task_id: str):
+        row = self._conn.execute('SELECT data FROM video_tasks WHERE id = ?', (task_id,)).fetchone()
+        if row is None:
+            self._index.pop(task_id, None)
+        else:
+            self._index[task_id] = VideoTask.from_dict(json.loads(row[0]))
+
+    def save(self, task: VideoTask, expect: str | None = None) -> bool:
+        """新增或更新一条任务
+
+        指定 expect 时为条件更新：仅当库中状态仍为 expect 时写入，否则说明任务已被
+        其他线程 / 进程修改（如已取消），放弃写入并返回 False，避免过期的状态覆盖新状态。
+        """
+        task.updated_at = time.time()
+        data = json.dumps(task.to_dict(), ensure_ascii=False)
+        with self._lock, self._conn:
+            if expect is None:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO video_tasks (id, status, created_at, data) VALUES (?, ?, ?, ?)',
+                    (task.id, task.status, task.created_at, data)
+                )
+            elif self._conn.execute(
+                'UPDATE video_tasks SET status = ?, data = ? WHERE id = ? AND status = ?',
+                (task.status, data, task.id, expect)
+            ).rowcount == 0:
+                self._reload(task.id)
+                return False
+            self._changes.record(task.id)
+            self._index[task.id] = task
+        return True
+
+    def add_many(self, tasks: list[VideoTask]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT INTO video_tasks (id, status, created_at, data) VALUES (?, ?, ?, ?)',
+                [(t.id, t.status, t.created_at, json.dumps(t.to_dict(), ensure_ascii=False))
+                 for t in tasks]
+            )
+            self._changes.record(*(t.id for t in tasks))
+            for task in tasks:
+                self._index[task.id] = task
+
+    def get(self, task_id: str) -> VideoTask | None:
+        self.sync()
+        return self._index.get(task_id)
+
+    def all(self) -> list[VideoTask]:
+        with self._lock:
+            self.sync()
+            return list(self._index.values())
+
+    def by_status(self, *statuses: str) -> list[VideoTask]:
+        """按创建顺序返回处于指定状态的任务"""
+        with self._lock:
+            self.sync()
+            return [t for t in self._index.values() if t.status in statuses]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,318 @@
+"""项目归档 — 选定项目连同引用素材、缩略图打包为 tar 流式导出 / 导入
+
+归档结构（顺序固定，导入端据此单遍处理）:
+    manifest.json                  项目数据与素材记录
+    thumbnails/{hash}_thumb.jpg    缩略图，位于对应素材文件之前
+    assets/{path}                  素材文件，同一内容只写一次
+
+导出时逐块生成 tar 头、文件内容与补齐字节，不在内存或临时文件中拼装归档；
+导入时以流模式 (r|*) 逐个成员读取，素材边写入边计算哈希，内存占用与归档大小无关。
+"""
+
+import json
+import os
+import re
+import tarfile
+import time
+import uuid
+from collections.abc import Iterator
+
+from models.asset import Asset
+import config
+from services import asset_service, prompt_service
+from utils.logger import logger
+
+ARCHIVE_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+_THUMBNAIL_NAME = re.compile(r'[0-9a-f]+_thumb\.jpg')
+
+
+class ArchiveError(Exception):
+    """归档格式错误"""
+
+
+# ── 导出 ──────────────────────────────────────────────────
+
+def export_projects(project_ids: list[str]) -> Iterator[bytes] | None:
+    """导出项目归档，返回 tar 数据块迭代器；任一项目不存在时返回 None"""
+    projects = []
+    for project_id in project_ids:
+        data = prompt_service.load_project(project_id)
+        if data is None:
+            return None
+        projects.append(data)
+
+    store = asset_service.get_store()
+    assets = {}
+    for data in projects:
+        for ref in data.get('ref_assets', []):
+            asset = store.get(ref.get('id', ''))
+            if asset is None:
+                logger.warning('导出时跳过不存在的引用素材: %s (项目 %s)', ref.get('id'), data['id'])
+            else:
+                assets[asset.id] = asset
+    return _iter_archive(projects, list(assets.values()))
+
+
+def _iter_archive(projects: list[dict], assets: list[Asset]) -> Iterator[bytes]:
+    manifest = {
+        'version': ARCHIVE_VERSION,
+        'exported_at': time.time(),
+        'projects': projects,
+        'assets': [a.to_dict() for a in assets],
+    }
+    written = 0
+    for chunk in _bytes_member(MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False).encode()):
+        written += len(chunk)
+        yield chunk
+
+    exported = set()
+    for asset in assets:
+        if asset.path in exported:
+            continue
+        source = os.path.join(config.ASSETS_DIR, asset.path)
+        if not os.path.exists(source):
+            logger.warning('导出时素材文件缺失: %s', asset.path)
+            continue
+        exported.add(asset.path)
+
+        members = []
+        # 旧数据的缩略图以素材 ID 命名，导入端无法对应到内容，交由导入后重新生成
+        if asset.content_hash and asset.thumbnail_status == Asset.THUMB_READY:
+            thumb = os.path.join(config.THUMBNAILS_DIR, asset.thumbnail_path)
+            if os.path.exists(thumb):
+                members.append((f'thumbnails/{asset.thumbnail_path}', thumb))
+        members.append((f'assets/{asset.path}', source))
+        for name, path in members:
+            for chunk in _file_member(name, path):
+                written += len(chunk)
+                yield chunk
+
+    # 归档结尾：两个全零块，并补齐到整记录
+    end = 2 * tarfile.BLOCKSIZE
+    end += -(written + end) % tarfile.RECORDSIZE
+    yield tarfile.NUL * end
+    logger.info('项目归档已导出: %d 个项目, %d 个素材文件, %d 字节',
+                len(projects), len(exported), written + end)
+
+
+def _header(name: str, size: int, mtime: float) -> bytes:
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = int(mtime)
+    info.mode = 0o644
+    return info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape')
+
+
+def _padding(size: int) -> bytes:
+    return tarfile.NUL * (-size % tarfile.BLOCKSIZE)
+
+
+def _bytes_member(name: str, data: bytes) -> Iterator[bytes]:
+    yield _header(name, len(data), time.time())
+    yield data
+    yield _padding(len(data))
+
+
+def _file_member(name: str, path: str) -> Iterator[bytes]:
+    """逐块产出一个文件成员（素材文件按内容寻址、不会被原地修改，大小以开始时为准）"""
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        yield _header(name, stat.st_size, stat.st_mtime)
+        remaining = stat.st_size
+        while remaining:
+            chunk = f.read(min(asset_service.HASH_CHUNK_SIZE, remaining))
+            if not chunk:
+                raise ArchiveError(f'导出过程中文件被截断: {name}')
+            remaining -= len(chunk)
+            yield chunk
+    yield _padding(stat.st_size)
+
+
+# ── 导入 ──────────────────────────────────────────────────
+
+def import_archive(stream) -> dict:
+    """从二进制流导入项目归档（支持 gzip 等压缩）
+
+    素材按内容去重：库中已有相同内容时不落盘，新记录直接引用已有文件；
+    与本地 ID 冲突且内容不同的素材分配新 ID，项目中的引用同步改写。
+    同 ID 的项目视为同一项目，覆盖本地版本。
+
+    Returns:
+        {'projects', 'assets', 'reused', 'missing', 'errors'} 导入统计
+    """
+    try:
+        tar = tarfile.open(fileobj=stream, mode='r|*')
+    except tarfile.TarError as e:
+        raise ArchiveError(f'无法读取归档: {e}')
+
+    summary = {'projects': 0, 'assets': 0, 'reused': 0, 'missing': 0, 'errors': []}
+    manifest = None
+    id_map = {}   # 归档素材 ID → 本地素材 ID
+    pending = {}  # 素材文件路径 → 等待该文件的素材记录
+    expected = set()  # 需要从归档读取文件的内容哈希
+    staged = {}   # 内容哈希 → 暂存的缩略图，对应素材文件校验通过后才落盘
+    try:
+        for member in tar:
+            if member.name == MANIFEST_NAME:
+                manifest = _read_manifest(tar, member)
+                pending = _plan_assets(manifest['assets'], id_map, summary)
+                expected = {record.get('content_hash') for records in pending.values()
+                            for record in records}
+            elif manifest is None:
+                raise ArchiveError(f'归档首个成员应为 {MANIFEST_NAME}')
+            elif not member.isfile():
+                continue
+            elif member.name.startswith('thumbnails/'):
+                _stage_thumbnail(tar, member, expected, staged)
+            elif member.name.startswith('assets/'):
+                records = pending.pop(member.name[len('assets/'):], None)
+                if records:
+                    _import_blob(tar, member, records, id_map, summary, staged)
+    except tarfile.TarError as e:
+        raise ArchiveError(f'归档数据损坏: {e}')
+    finally:
+        tar.close()
+        for temp in staged.values():
+            os.remove(temp)
+    if manifest is None:
+        raise ArchiveError(f'归档缺少 {MANIFEST_NAME}')
+
+    # 归档中缺少文件的记录：本地已有相同内容时仍可建立，否则放弃
+    for records in pending.values():
+        for record in records:
+            content_hash = record.get('content_hash', '')
+            if not content_hash or not _register(record, None, content_hash,
+                                                 record.get('file_size', 0), id_map, summary):
+                summary['missing'] += 1
+
+    for data in manifest['projects']:
+        for ref in data.get('ref_assets', []):
+            if ref.get('id') in id_map:
+                ref['id'] = id_map[ref['id']]
+        prompt_service.save_project(data)
+        summary['projects'] += 1
+
+    logger.info('项目归档已导入: %d 个项目, 新增素材 %d, 复用 %d, 缺失 %d', summary['projects'],
+                summary['assets'], summary['reused'], summary['missing'])
+    return summary
+
+
+def _read_manifest(tar: tarfile.TarFile, member: tarfile.TarInfo) -> dict:
+    try:
+        manifest = json.load(tar.extractfile(member))
+    except ValueError as e:
+        raise ArchiveError(f'manifest 解析失败: {e}')
+    if not isinstance(manifest, dict) or manifest.get('version') != ARCHIVE_VERSION:
+        raise ArchiveError('不支持的归档版本')
+    if not isinstance(manifest.get('projects'), list) or not isinstance(manifest.get('assets'), list):
+        raise ArchiveError('manifest 格式错误')
+    return manifest
+
+
+def _plan_assets(records: list[dict], id_map: dict, summary: dict) -> dict[str, list[dict]]:
+    """处理本地已有的素材，返回仍需从归档读取文件的记录（按文件路径分组）"""
+    store = asset_service.get_store()
+    pending = {}
+    for record in records:
+        content_hash = record.get('content_hash', '')
+        local = store.get(record.get('id', ''))
+        if local is not None and content_hash and local.content_hash == content_hash:
+            id_map[local.id] = local.id
+            summary['reused'] += 1
+        elif content_hash and store.find_by_hash(content_hash):
+            _register(record, None, content_hash, record.get('file_size', 0), id_map, summary)
+        else:
+            pending.setdefault(record.get('path', ''), []).append(record)
+    return pending
+
+
+def _register(record: dict, temp_path: str | None, content_hash: str, size: int,
+              id_map: dict, summary: dict) -> dict | None:
+    store = asset_service.get_store()
+    asset_id = record.get('id', '')
+    if store.get(asset_id) is not None:
+        asset_id = ''
+    asset = asset_service.register_blob(
+        temp_path, content_hash, size, record.get('original_name') or record.get('path', ''),
+        name=record.get('name', ''), tags=record.get('tags'),
+        description=record.get('description', ''), asset_id=asset_id,
+    )
+    if asset is not None:
+        id_map[record.get('id', '')] = asset['id']
+        summary['assets'] += 1
+    return asset
+
+
+def _import_blob(tar: tarfile.TarFile, member: tarfile.TarInfo, records: list[dict],
+                 id_map: dict, summary: dict, staged: dict[str, str]):
+    f = tar.extractfile(member)
+    temp_path, content_hash, size = asset_service.write_temp_blob(
+        iter(lambda: f.read(asset_service.HASH_CHUNK_SIZE), b'')
+    )
+    expected = records[0].get('content_hash', '')
+    if expected and content_hash != expected:
+        os.remove(temp_path)
+        summary['missing'] += len(records)
+        summary['errors'].append(f'{member.name}: 内容哈希不一致')
+        logger.error('归档素材哈希不一致，已跳过: %s', member.name)
+        return
+    _install_thumbnail(staged, content_hash)
+    _register(records[0], temp_path, content_hash, size, id_map, summary)
+    for record in records[1:]:
+        _register(record, None, content_hash, size, id_map, summary)
+
+
+def _stage_thumbnail(tar: tarfile.TarFile, member: tarfile.TarInfo,
+                     expected: set[str], staged: dict[str, str]):
+    """暂存缩略图（位于对应素材文件之前），只接受本归档待导入素材的、可正常解码的 JPEG
+
+    素材文件哈希校验通过后才由 _install_thumbnail 落盘，作为后台重新生成前的占位。
+    """
+    filename = member.name[len('thumbnails/'):]
+    if not _THUMBNAIL_NAME.fullmatch(filename):
+        return
+    content_hash = filename[:-len('_thumb.jpg')]
+    if content_hash not in expected or content_hash in staged:
+        return
+    if os.path.exists(os.path.join(config.THUMBNAILS_DIR, filename)):
+        return
+    os.makedirs(config.THUMBNAILS_DIR, exist_ok=True)
+    temp = os.path.join(config.THUMBNAILS_DIR, f'{filename}.{uuid.uuid4().hex[:8]}.part')
+    f = tar.extractfile(member)
+    try:
+        with open(temp, 'wb') as out:
+            for chunk in iter(lambda: f.read(asset_service.HASH_CHUNK_SIZE), b''):
+                out.write(chunk)
+    except BaseException:
+        os.remove(temp)
+        raise
+    if not _is_jpeg(temp):
+        os.remove(temp)
+        logger.warning('归档缩略图无法解码，已跳过: %s', member.name)
+        return
+    staged[content_hash] = temp
+
+
+def _install_thumbnail(staged: dict[str, str], content_hash: str):
+    temp = staged.pop(content_hash, None)
+    if temp is None:
+        return
+    dest = os.path.join(config.THUMBNAILS_DIR, asset_service.thumbnail_filename_for(content_hash))
+    if os.path.exists(dest):
+        os.remove(temp)
+    else:
+        os.replace(temp, dest)
+
+
+def _is_jpeg(path: str) -> bool:
+    from PIL import Image
+    try:
+        with Image.open(path) as img:
+            if img.format != 'JPEG':
+                return False
+            img.verify()
+    except Exception:
+        return False
+    return True
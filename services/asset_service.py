@@ -1,25 +1,44 @@
 """素材管理服务 — 导入、缩略图、分类"""
 
+import hashlib
 import os
 import shutil
 import subprocess
 import sys
+import threading
+import time
+import uuid
 
 from models.asset import Asset, AssetStore
 import config
+from services import media_probe, perceptual_hash, thumbnail_queue, waveform
+from utils import metrics
 from utils.logger import logger
+from utils.storage import FileLock
 
 # 素材仓库单例
 _store: AssetStore | None = None
+_store_lock = threading.Lock()
+
+# 流式读取 / 哈希计算的块大小
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 保证“查重 + 落盘 + 入库”与“删除 + 引用计数”原子执行；文件锁同时覆盖同进程线程与其他 worker
+_ingest_lock = FileLock(config.ASSET_LOCK_FILE)
+
+# 后台处理在进程池中执行，各阶段耗时随结果返回，由主进程回调记录
+_MEDIA_STAGE_SECONDS = metrics.histogram(
+    'media_task_duration_seconds', '素材后台处理各阶段耗时（ffprobe / ffmpeg / PIL）', ['stage'])
+_MEDIA_TASKS = metrics.counter('media_tasks_total', '素材后台处理任务数（按结果）', ['outcome'])
 
 
 def get_store() -> AssetStore:
     """获取素材仓库实例"""
     global _store
-    if _store is None:
-        store_path = os.path.join(config.DATA_DIR, 'asset_store.json')
-        _store = AssetStore(store_path)
-    return _store
+    with _store_lock:
+        if _store is None:
+            _store = AssetStore(config.ASSET_DB_FILE, config.LEGACY_ASSET_STORE_FILE)
+        return _store
 
 
 def import_asset(file_storage, original_filename: str) -> dict:
@@ -32,48 +51,264 @@ def import_asset(file_storage, original_filename: str) -> dict:
     Returns:
         素材信息字典
     """
+    stream = file_storage.stream
+    return import_stream(iter(lambda: stream.read(HASH_CHUNK_SIZE), b''), original_filename)
+
+
+def import_bytes(data: bytes, original_filename: str, **meta) -> dict:
+    """导入内存中的文件内容（如 AI 生成的图片）"""
+    return import_stream([data], original_filename, **meta)
+
+
+def import_stream(chunks, original_filename: str, name: str = '',
+                  tags: list[str] | None = None, description: str = '') -> dict:
+    """流式导入素材：边写入边计算内容哈希，相同内容只保存一份
+
+    Args:
+        chunks: 可迭代的 bytes 数据块
+        original_filename: 原始文件名
+        name: 素材名称，默认取文件名
+        tags: 初始标签
+        description: 描述
+
+    Returns:
+        素材信息字典
+    """
+    logger.info('正在导入素材: %s (类型: %s)', original_filename, Asset.detect_type(original_filename))
+    temp_path, content_hash, size = write_temp_blob(chunks)
+    return register_blob(temp_path, content_hash, size, original_filename,
+                         name=name, tags=tags, description=description)
+
+
+def write_temp_blob(chunks) -> tuple[str, str, int]:
+    """将数据块写入素材目录下的临时文件，同时计算哈希
+
+    Returns:
+        (临时文件路径, 内容哈希, 字节数)
+    """
+    os.makedirs(config.ASSETS_DIR, exist_ok=True)
+    temp_path = os.path.join(config.ASSETS_DIR, f'.incoming-{uuid.uuid4().hex}.part')
+    hasher = new_content_hasher()
+    size = 0
+    try:
+        with open(temp_path, 'wb') as f:
+            for chunk in chunks:
+                hasher.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return temp_path, hasher.hexdigest(), size
+
+
+def new_content_hasher():
+    """内容哈希算法（BLAKE2b-160）"""
+    return hashlib.blake2b(digest_size=20)
+
+
+def register_blob(temp_path: str | None, content_hash: str, size: int, original_filename: str,
+                  name: str = '', tags: list[str] | None = None, description: str = '',
+                  asset_id: str = '') -> dict | None:
+    """为已写入磁盘并算好哈希的文件创建素材记录
+
+    内容已存在时删除临时文件，新记录直接复用已有文件与缩略图；
+    否则将临时文件改名为 {hash}.{ext}（同一文件系统内 rename，无需复制）并提交缩略图任务。
+
+    Args:
+        temp_path: 临时文件路径；为 None 表示调用方已确认内容在库中，内容不存在时返回 None
+        asset_id: 指定素材 ID（如归档导入时沿用原 ID），默认随机生成
+    """
     store = get_store()
 
-    # 创建素材对象
     asset = Asset()
+    if asset_id:
+        asset.id = asset_id
     asset.original_name = original_filename
-    asset.name = os.path.splitext(original_filename)[0]
+    asset.name = name or os.path.splitext(original_filename)[0]
     asset.type = Asset.detect_type(original_filename)
+    asset.tags = list(tags or [])
+    asset.description = description
+    asset.content_hash = content_hash
+    asset.file_size = size
+
+    with _ingest_lock:
+        existing = store.find_by_hash(content_hash)
+        if existing:
+            if temp_path:
+                os.remove(temp_path)
+            source = existing[0]
+            asset.path = source.path
+            asset.thumbnail_path = source.thumbnail_path
+            asset.thumbnail_status = source.thumbnail_status
+            asset.media = dict(source.media)
+            asset.waveform = source.waveform
+            asset.phash = list(source.phash)
+            store.add(asset)
+            logger.info('内容已存在，复用文件: %s (引用数 %d)', asset.path, len(existing) + 1)
+            return asset.to_dict()
+        if temp_path is None:
+            return None
+
+        ext = original_filename.rsplit('.', 1)[-1].lower() if '.' in original_filename else 'bin'
+        asset.path = f'{content_hash}.{ext}'
+        saved_path = os.path.join(config.ASSETS_DIR, asset.path)
+        os.replace(temp_path, saved_path)
+
+        asset.thumbnail_path = thumbnail_filename_for(content_hash)
+
+        # 先以 pending 状态入库，缩略图与媒体探测交给后台进程池
+        asset.thumbnail_status = Asset.THUMB_PENDING
+        cached_media = media_probe.get_cache().get(content_hash)
+        if cached_media is not None:
+            asset.media = cached_media
+        store.add(asset)
+    result = asset.to_dict()
+
+    thumbnail_queue.submit(
+        process_asset, saved_path, content_hash, asset.type, cached_media is None,
+        (cached_media or {}).get('duration'),
+        callback=lambda future: _on_process_done(content_hash, future),
+    )
+
+    return result
+
+
+def process_asset(source_path: str, content_hash: str, asset_type: str, probe: bool,
+                  duration: float | None = None) -> dict:
+    """后台任务（在进程池中执行）：生成缩略图，按需探测媒体信息，
+    音频另计算波形，图片 / 视频另计算感知哈希
 
-    # 保存文件
-    ext = original_filename.rsplit('.', 1)[-1].lower() if '.' in original_filename else 'bin'
-    saved_filename = f'{asset.id}.{ext}'
-    saved_path = os.path.join(config.ASSETS_DIR, saved_filename)
-    logger.info(f"正在导入素材: {original_filename} (类型: {asset.type})")
-    os.makedirs(config.ASSETS_DIR, exist_ok=True)
-    file_storage.save(saved_path)
+    Returns:
+        {'thumbnail_path': 缩略图文件名, 'media': 探测结果或 None,
+         'waveform': 波形包络或 None, 'phash': 感知哈希列表,
+         'timings': {阶段: 耗时秒数}}
+    """
+    timings = {}
+    clock = time.perf_counter()
+
+    def lap(stage: str):
+        nonlocal clock
+        now = time.perf_counter()
+        timings[stage] = now - clock
+        clock = now
+
+    media = None
+    if probe:
+        media = media_probe.safe_probe(source_path, asset_type)
+        lap('probe')
+    duration = (media or {}).get('duration', duration)
+    peaks = None
+    if asset_type == Asset.TYPE_AUDIO:
+        peaks = _extract_waveform(source_path, duration)
+        lap('waveform')
+    thumbnail_path = generate_thumbnail(source_path, content_hash, asset_type, peaks)
+    lap(f'thumbnail_{asset_type}')
+    phash = _compute_phash(source_path, asset_type, duration)
+    lap('phash')
+    return {'thumbnail_path': thumbnail_path, 'media': media, 'waveform': peaks, 'phash': phash,
+            'timings': timings}
+
+
+def _extract_waveform(source_path: str, duration: float | None) -> dict | None:
+    """计算音频波形包络，失败（未安装 ffmpeg / NumPy、文件损坏）时返回 None"""
+    try:
+        return waveform.extract(source_path, duration)
+    except FileNotFoundError:
+        logger.warning('未找到 ffmpeg，跳过音频波形计算')
+    except Exception as e:
+        logger.error('音频波形计算失败 (%s): %s', os.path.basename(source_path), e)
+    return None
 
-    asset.path = saved_filename
-    asset.file_size = os.path.getsize(saved_path)
 
-    # 生成缩略图
-    thumbnail_filename = generate_thumbnail(saved_path, asset.id, asset.type)
-    asset.thumbnail_path = thumbnail_filename
+def _compute_phash(source_path: str, asset_type: str, duration: float | None) -> list[str]:
+    """计算感知哈希，失败时返回空列表（该素材不参与相似检索）"""
+    try:
+        return perceptual_hash.compute(source_path, asset_type, duration)
+    except FileNotFoundError:
+        logger.warning('未找到 ffmpeg，跳过视频感知哈希')
+    except Exception as e:
+        logger.error('感知哈希计算失败 (%s): %s', os.path.basename(source_path), e)
+    return []
 
-    # 存入仓库
-    store.add(asset)
 
-    return asset.to_dict()
+def _on_process_done(content_hash: str, future):
+    """后台任务完成回调，更新引用该内容的全部素材的缩略图状态与媒体信息"""
+    store = get_store()
+    try:
+        result = future.result()
+    except Exception as e:
+        logger.error('缩略图任务失败 (%s): %s', content_hash, e)
+        result = None
+
+    _MEDIA_TASKS.inc('ok' if result else 'error')
+    for stage, seconds in (result or {}).get('timings', {}).items():
+        _MEDIA_STAGE_SECONDS.observe(seconds, stage)
+
+    if result and result['media']:
+        media_probe.get_cache().put(content_hash, result['media'])
+
+    # 与登记重复内容互斥：否则在下面查询之后登记的重复素材会复制到 pending 状态，且再无回调更新它
+    with _ingest_lock:
+        assets = store.find_by_hash(content_hash)
+        if not assets:
+            # 生成期间素材已被删除，清理残留的缩略图
+            if result:
+                thumb_path = os.path.join(config.THUMBNAILS_DIR, result['thumbnail_path'])
+                if os.path.exists(thumb_path):
+                    os.remove(thumb_path)
+            return
+
+        if result:
+            fields = {'thumbnail_path': result['thumbnail_path'], 'thumbnail_status': Asset.THUMB_READY}
+            if result['media'] is not None:
+                fields['media'] = result['media']
+            if result['waveform']:
+                fields['waveform'] = result['waveform']
+            if result['phash']:
+                fields['phash'] = result['phash']
+        else:
+            fields = {'thumbnail_status': Asset.THUMB_FAILED}
+        # 只写入处理结果相关的字段，不会覆盖同时发生的标签修改
+        for asset in assets:
+            store.update_fields(asset.id, **fields)
+
+
+def get_thumbnail_status(asset_ids: list[str]) -> dict:
+    """批量查询缩略图状态，供前端轮询"""
+    store = get_store()
+    result = {}
+    for asset_id in asset_ids:
+        asset = store.get(asset_id)
+        if asset:
+            result[asset_id] = {
+                'thumbnail_status': asset.thumbnail_status,
+                'thumbnail_path': asset.thumbnail_path,
+            }
+    return result
+
+
+def thumbnail_filename_for(key: str) -> str:
+    """缩略图文件名"""
+    return f'{key}_thumb.jpg'
 
 
-def generate_thumbnail(source_path: str, asset_id: str, asset_type: str) -> str:
+def generate_thumbnail(source_path: str, asset_id: str, asset_type: str,
+                       peaks: dict | None = None) -> str:
     """生成缩略图
 
     Args:
         source_path: 源文件路径
-        asset_id: 素材 ID
+        asset_id: 缩略图文件名键（内容哈希，旧数据为素材 ID）
         asset_type: 素材类型
+        peaks: 音频波形包络，有则绘制波形图
 
     Returns:
         缩略图文件名
     """
     os.makedirs(config.THUMBNAILS_DIR, exist_ok=True)
-    thumbnail_filename = f'{asset_id}_thumb.jpg'
+    thumbnail_filename = thumbnail_filename_for(asset_id)
     thumbnail_path = os.path.join(config.THUMBNAILS_DIR, thumbnail_filename)
 
     try:
@@ -82,9 +317,9 @@ def generate_thumbnail(source_path: str, asset_id: str, asset_type: str) -> str:
         elif asset_type == Asset.TYPE_VIDEO:
             _thumbnail_video(source_path, thumbnail_path)
         elif asset_type == Asset.TYPE_AUDIO:
-            _thumbnail_audio(thumbnail_path)
+            _thumbnail_audio(thumbnail_path, peaks)
     except Exception as e:
-        logger.error(f'缩略图生成失败 ({asset_id}): {e}')
+        logger.error('缩略图生成失败 (%s): %s', asset_id, e)
         _thumbnail_placeholder(thumbnail_path, asset_type)
 
     return thumbnail_filename
@@ -113,9 +348,12 @@ def _thumbnail_video(source: str, dest: str):
         _thumbnail_placeholder(dest, Asset.TYPE_VIDEO)
 
 
-def _thumbnail_audio(dest: str):
-    """音频占位缩略图"""
-    _thumbnail_placeholder(dest, Asset.TYPE_AUDIO)
+def _thumbnail_audio(dest: str, peaks: dict | None = None):
+    """音频缩略图 — 有波形包络时绘制波形，否则使用占位图"""
+    if peaks and peaks['columns']:
+        waveform.render(peaks, dest)
+    else:
+        _thumbnail_placeholder(dest, Asset.TYPE_AUDIO)
 
 
 def _thumbnail_placeholder(dest: str, asset_type: str):
@@ -149,10 +387,28 @@ def _thumbnail_placeholder(dest: str, asset_type: str):
     img.save(dest, 'JPEG', quality=85)
 
 
-def list_assets(query: str = '', tag: str = '', asset_type: str = '') -> list[dict]:
-    """列出/搜索素材"""
+def list_assets(query: str = '', tag: str = '', asset_type: str = '',
+                limit: int | None = None, cursor: str | None = None,
+                fields: list[str] | None = None,
+                media: dict | None = None) -> tuple[list[dict], str | None]:
+    """列出/搜索素材
+
+    Returns:
+        (当前页素材列表, 下一页游标)；limit 为 None 时返回全部
+    """
+    store = get_store()
+    return store.search_page(query=query, tag=tag, asset_type=asset_type,
+                             limit=limit, cursor=cursor, fields=fields, media=media)
+
+
+def list_assets_json(query: str = '', tag: str = '', asset_type: str = '',
+                     limit: int | None = None, cursor: str | None = None,
+                     fields: list[str] | None = None,
+                     media: dict | None = None) -> tuple[list[bytes], str | None]:
+    """同 list_assets，返回每条素材预先序列化的 JSON 片段，供列表接口直接拼接"""
     store = get_store()
-    return store.search(query=query, tag=tag, asset_type=asset_type)
+    return store.search_page_json(query=query, tag=tag, asset_type=asset_type,
+                                  limit=limit, cursor=cursor, fields=fields, media=media)
 
 
 def get_asset(asset_id: str) -> dict | None:
@@ -162,23 +418,51 @@ def get_asset(asset_id: str) -> dict | None:
     return asset.to_dict() if asset else None
 
 
-def delete_asset(asset_id: str) -> bool:
-    """删除素材及其文件"""
-    store = get_store()
-    asset = store.get(asset_id)
-    if not asset:
-        return False
+def find_similar(asset_id: str, max_distance: int | None = None,
+                 limit: int | None = None) -> list[dict] | None:
+    """查找与指定素材近似重复的素材（感知哈希汉明距离）
 
-    # 删除文件
-    asset_path = os.path.join(config.ASSETS_DIR, asset.path)
-    if os.path.exists(asset_path):
-        os.remove(asset_path)
+    Args:
+        asset_id: 素材 ID
+        max_distance: 最大汉明距离（0~64），默认 config.SIMILAR_MAX_DISTANCE
+        limit: 最多返回条数
+
+    Returns:
+        素材字典列表（附 distance 字段），素材不存在时返回 None
+    """
+    if max_distance is None:
+        max_distance = config.SIMILAR_MAX_DISTANCE
+    matches = get_store().similar(asset_id, max_distance, limit)
+    if matches is None:
+        return None
+    return [{**asset.to_dict(), 'distance': distance} for asset, distance in matches]
 
-    thumb_path = os.path.join(config.THUMBNAILS_DIR, asset.thumbnail_path)
-    if os.path.exists(thumb_path):
-        os.remove(thumb_path)
 
-    return store.remove(asset_id)
+def delete_asset(asset_id: str) -> bool:
+    """删除素材；文件与缩略图仅在最后一个引用被删除时移除"""
+    store = get_store()
+    with _ingest_lock:
+        asset = store.get(asset_id)
+        if not asset or not store.remove(asset_id):
+            return False
+
+        if asset.content_hash and store.find_by_hash(asset.content_hash):
+            return True  # 仍有其他素材引用同一内容
+
+        asset_path = os.path.join(config.ASSETS_DIR, asset.path)
+        if os.path.exists(asset_path):
+            os.remove(asset_path)
+
+        thumb_path = os.path.join(config.THUMBNAILS_DIR, asset.thumbnail_path)
+        if asset.thumbnail_path and os.path.exists(thumb_path):
+            os.remove(thumb_path)
+
+    if asset.thumbnail_path:
+        from services import derivative_service
+        derivative_service.get_cache().discard_prefix(
+            os.path.splitext(asset.thumbnail_path)[0] + '_w'
+        )
+    return True
 
 
 def update_asset_tags(asset_id: str, tags: list[str]) -> bool:
@@ -190,7 +474,4 @@ def update_asset_tags(asset_id: str, tags: list[str]) -> bool:
 def get_all_tags() -> list[str]:
     """获取所有已使用的标签"""
     store = get_store()
-    tags = set()
-    for asset in store.assets:
-        tags.update(asset.tags)
-    return sorted(tags)
+    return store.all_tags()
@@ -0,0 +1,133 @@
+"""批量 AI 生成 — 有界线程池并发调用 Gemini，限流 + 429 指数退避，结果逐条返回"""
+
+import atexit
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from google.genai import errors
+
+import config
+from services import gemini_service, prompt_service
+from utils.logger import logger
+from utils.rate_limit import RateLimiter
+
+_executor: ThreadPoolExecutor | None = None
+_limiter: RateLimiter | None = None
+_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """进程内共享的线程池，所有批量请求合计不超过 AI_BATCH_CONCURRENCY 个并发"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=config.AI_BATCH_CONCURRENCY, thread_name_prefix='ai-batch'
+            )
+        return _executor
+
+
+def get_limiter() -> RateLimiter:
+    """Gemini 请求限流器（GEMINI_RATE_LIMIT 次 / 分钟，≤ 0 时不限速）"""
+    global _limiter
+    with _lock:
+        if _limiter is None:
+            _limiter = RateLimiter(config.GEMINI_RATE_LIMIT / 60, burst=config.AI_BATCH_CONCURRENCY)
+        return _limiter
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    return isinstance(error, errors.APIError) and error.code == 429
+
+
+def call_with_backoff(fn, *args, **kwargs):
+    """在限流器下调用 Gemini；遇到 429 时指数退避后重试"""
+    limiter = get_limiter()
+    for attempt in range(config.AI_BATCH_MAX_RETRIES + 1):
+        limiter.acquire()
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if not _is_rate_limited(e) or attempt == config.AI_BATCH_MAX_RETRIES:
+                raise
+            # 指数退避 + 随机抖动，暂停期间其他线程同样不再发请求
+            delay = min(config.AI_BATCH_BACKOFF_MAX, config.AI_BATCH_BACKOFF_BASE * 2 ** attempt)
+            delay *= 0.5 + random.random() / 2
+            logger.warning('Gemini 限流 (429)，%.1f 秒后重试 (%d/%d)',
+                           delay, attempt + 1, config.AI_BATCH_MAX_RETRIES)
+            limiter.backoff(delay)
+            time.sleep(delay)
+
+
+def _generate_with_retry(idea: str, fresh: bool) -> dict:
+    """生成单条 Prompt；缓存命中不占用限流令牌"""
+    if not fresh:
+        cached = gemini_service.get_cached_prompt(idea)
+        if cached is not None:
+            return cached
+    return call_with_backoff(gemini_service.generate_prompt, idea, fresh=fresh)
+
+
+def _process(index: int, idea: str, fresh: bool, save: bool, project: dict) -> dict:
+    result = {'index': index, 'idea': idea}
+    try:
+        prompt = _generate_with_retry(idea, fresh)
+    except Exception as e:
+        logger.error('批量生成失败 (#%d): %s', index, e)
+        return {**result, 'ok': False, 'error': str(e)}
+
+    result.update(ok=True, prompt=prompt)
+    if save:
+        data = {**project, **prompt, 'name': idea[:30]}
+        data.pop('id', None)
+        try:
+            result['project_id'] = prompt_service.save_project(data)
+        except Exception as e:
+            logger.error('批量生成结果保存失败 (#%d): %s', index, e)
+            result['save_error'] = str(e)
+    return result
+
+
+def generate_prompts(ideas: list[str], fresh: bool = False, save: bool = False,
+                     project: dict | None = None):
+    """并发生成多条五要素 Prompt，按完成顺序逐条产出结果
+
+    Args:
+        ideas: 创意描述列表
+        fresh: 跳过缓存重新生成
+        save: 是否将每条结果保存为 Prompt 项目
+        project: 保存项目时使用的默认参数（如 model / ratio / duration）
+
+    Yields:
+        {index, idea, ok, prompt | error[, project_id | save_error]}，最后一条为
+        {done: True, total, succeeded}
+    """
+    executor = _get_executor()
+    project = dict(project or {})
+    pending = {executor.submit(_process, i, idea, fresh, save, project)
+               for i, idea in enumerate(ideas)}
+    succeeded = 0
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = future.result()
+                succeeded += item['ok']
+                yield item
+    finally:
+        # 客户端中途断开时取消尚未开始的任务
+        for future in pending:
+            future.cancel()
+    logger.info('批量生成完成: %d/%d', succeeded, len(ideas))
+    yield {'done': True, 'total': len(ideas), 'succeeded': succeeded}
+
+
+@atexit.register
+def shutdown():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
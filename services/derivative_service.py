@@ -0,0 +1,223 @@
+"""缩略图衍生图服务 — 按需渲染多尺寸 / WebP / AVIF，并以 LRU 磁盘缓存"""
+
+import os
+import threading
+import time
+import uuid
+
+import config
+from models.asset import Asset
+from services import asset_service
+from utils.logger import logger
+from utils.storage import FileLock
+
+# 输出格式: 名称 → (MIME, Pillow 格式, 保存参数)
+FORMATS = {
+    'avif': ('image/avif', 'AVIF', {'quality': 55}),
+    'webp': ('image/webp', 'WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('image/jpeg', 'JPEG', {'quality': 82, 'progressive': True, 'optimize': True}),
+}
+
+
+_SUPPORTED: set[str] | None = None
+
+
+def _supported_formats() -> set[str]:
+    from PIL import features
+    supported = {'jpeg'}
+    for name in ('avif', 'webp'):
+        try:
+            if features.check(name):
+                supported.add(name)
+        except Exception:
+            pass
+    return supported
+
+
+def negotiate_format(accept: str) -> str:
+    """根据 Accept 头选择输出格式：AVIF > WebP > JPEG"""
+    global _SUPPORTED
+    if _SUPPORTED is None:
+        _SUPPORTED = _supported_formats()
+    accept = accept or ''
+    for name in ('avif', 'webp'):
+        if name in _SUPPORTED and FORMATS[name][0] in accept:
+            return name
+    return 'jpeg'
+
+
+def snap_width(width: int) -> int:
+    """将请求宽度向上取整到预设档位，限制缓存条目数量"""
+    for w in config.THUMBNAIL_DERIVATIVE_WIDTHS:
+        if width <= w:
+            return w
+    return config.THUMBNAIL_DERIVATIVE_WIDTHS[-1]
+
+
+class DerivativeCache:
+    """衍生图磁盘缓存 — 总大小超出预算时按最近最少使用淘汰
+
+    缓存目录由所有 worker 共享，目录本身即索引：命中时更新文件 mtime，
+    淘汰时扫描目录、按 mtime 从旧到新删除，直到用量降至预算的 LOW_WATERMARK。
+    各进程只估算用量（上次扫描的结果 + 此后本进程写入的字节数），估算超出预算
+    或距上次扫描超过 SCAN_INTERVAL 秒时才重新扫描，其他进程写入的文件最迟在下次扫描时计入。
+    """
+
+    LOW_WATERMARK = 0.9
+    SCAN_INTERVAL = 60.0  # 秒
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._estimate = 0
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        # 同一时刻只有一个进程执行淘汰扫描
+        self._evict_lock = FileLock(os.path.join(cache_dir, '.evict.lock'))
+        self._evict()
+
+    def _files(self) -> list[tuple[float, str, int]]:
+        """缓存文件 (mtime, 文件名, 字节数)，不含渲染中的临时文件与锁文件"""
+        files = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.startswith('.') or entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # 刚被其他进程淘汰
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+        return files
+
+    def _evict(self, keep: str = ''):
+        """扫描目录得到实际用量，超出预算时淘汰最久未访问的文件（keep 除外）"""
+        with self._evict_lock:
+            files = self._files()
+            total = sum(size for _, _, size in files)
+            if total > self.max_bytes:
+                target = self.max_bytes * self.LOW_WATERMARK
+                for _, name, size in sorted(files):
+                    if total <= target:
+                        break
+                    if name == keep:
+                        continue
+                    try:
+                        os.remove(self.path(name))
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+        with self._lock:
+            self._estimate = total
+            self._scanned_at = time.monotonic()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name)
+
+    def get(self, name: str) -> str | None:
+        """命中时返回文件路径并刷新其 mtime（淘汰顺序依据）"""
+        path = self.path(name)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, name: str, temp_path: str) -> str:
+        """将已渲染的临时文件放入缓存，估算用量超出预算时淘汰旧条目"""
+        path = self.path(name)
+        os.replace(temp_path, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self._estimate += size
+            due = (self._estimate > self.max_bytes
+                   or time.monotonic() - self._scanned_at > self.SCAN_INTERVAL)
+            if due:
+                self._scanned_at = time.monotonic()  # 避免并发的请求重复扫描
+        if due:
+            self._evict(keep=name)
+        return path
+
+    def discard_prefix(self, prefix: str):
+        """删除某个缩略图的全部衍生图"""
+        with os.scandir(self.cache_dir) as it:
+            names = [e.name for e in it if e.name.startswith(prefix) and not e.name.endswith('.tmp')]
+        for name in names:
+            try:
+                os.remove(self.path(name))
+            except FileNotFoundError:
+                pass
+
+
+_cache: DerivativeCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> DerivativeCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DerivativeCache(config.THUMBNAIL_CACHE_DIR, config.THUMBNAIL_CACHE_MAX_BYTES)
+        return _cache
+
+
+def _find_source(thumbnail_filename: str) -> str | None:
+    """定位衍生图的源文件：图片素材用原图，其余类型用基础缩略图"""
+    thumb_path = os.path.join(config.THUMBNAILS_DIR, thumbnail_filename)
+    suffix = asset_service.thumbnail_filename_for('')
+    if not thumbnail_filename.endswith(suffix):
+        return thumb_path if os.path.exists(thumb_path) else None
+
+    key = thumbnail_filename[:-len(suffix)]
+    store = asset_service.get_store()
+    matches = store.find_by_hash(key)
+    asset = matches[0] if matches else store.get(key)
+    if asset and asset.type == Asset.TYPE_IMAGE:
+        source = os.path.join(config.ASSETS_DIR, asset.path)
+        if os.path.exists(source):
+            return source
+    return thumb_path if os.path.exists(thumb_path) else None
+
+
+def get_derivative(thumbnail_filename: str, width: int, accept: str = '') -> tuple[str, str] | None:
+    """获取（必要时渲染）指定宽度与格式的衍生图
+
+    Args:
+        thumbnail_filename: 基础缩略图文件名（如 {hash}_thumb.jpg）
+        width: 期望宽度（像素），会被取整到预设档位
+        accept: 请求的 Accept 头，用于选择 AVIF / WebP / JPEG
+
+    Returns:
+        (文件路径, MIME)，源文件不存在时返回 None
+    """
+    width = snap_width(width)
+    fmt = negotiate_format(accept)
+    mimetype, pil_format, save_args = FORMATS[fmt]
+    stem = os.path.splitext(thumbnail_filename)[0]
+    name = f'{stem}_w{width}.{fmt}'
+
+    cache = get_cache()
+    path = cache.get(name)
+    if path:
+        return path, mimetype
+
+    source = _find_source(thumbnail_filename)
+    if not source:
+        return None
+
+    from PIL import Image
+    temp_path = cache.path(f'{name}.{uuid.uuid4().hex[:8]}.tmp')
+    try:
+        with Image.open(source) as img:
+            img.draft('RGB', (width, width))  # JPEG 源可在解码阶段直接降采样
+            img.thumbnail((width, width), Image.Resampling.LANCZOS)
+            if img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            img.save(temp_path, pil_format, **save_args)
+    except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        logger.error('衍生图生成失败 (%s): %s', name, e)
+        return None
+    return cache.put(name, temp_path), mimetype
@@ -0,0 +1,85 @@
+"""Gemini 客户端管理 — 进程内共享一个连接池化的 genai.Client"""
+
+import atexit
+import threading
+
+import httpx
+from google import genai
+from google.genai import types
+
+import config
+from utils.logger import logger
+
+_client: genai.Client | None = None
+_client_key: str | None = None
+_transport: httpx.BaseTransport | None = None
+_lock = threading.Lock()
+
+
+def _build_client(api_key: str) -> genai.Client:
+    """创建带连接池与超时设置的客户端
+
+    genai.Client 内部持有一个 httpx.Client，后者线程安全，
+    多线程 WSGI 下所有请求共用其连接池，TLS 连接在 keep-alive 期内复用。
+    """
+    client_args = {
+        'limits': httpx.Limits(
+            max_connections=config.GEMINI_MAX_CONNECTIONS,
+            max_keepalive_connections=config.GEMINI_MAX_CONNECTIONS,
+            keepalive_expiry=config.GEMINI_KEEPALIVE_EXPIRY,
+        ),
+    }
+    if _transport is not None:
+        client_args['transport'] = _transport
+    return genai.Client(
+        api_key=api_key,
+        http_options=types.HttpOptions(
+            timeout=int(config.GEMINI_TIMEOUT * 1000),  # 毫秒
+            client_args=client_args,
+        ),
+    )
+
+
+def get_client() -> genai.Client:
+    """获取共享的 Gemini 客户端（首次调用时创建；API Key 变更后自动重建）"""
+    global _client, _client_key
+    api_key = config.GEMINI_API_KEY
+    if not api_key:
+        raise RuntimeError('未配置 GEMINI_API_KEY，请在 .env 文件中设置')
+    with _lock:
+        if _client is None or _client_key != api_key:
+            _client, _client_key = _build_client(api_key), api_key
+            logger.info('Gemini 客户端已创建')
+        return _client
+
+
+def set_transport(transport: httpx.BaseTransport | None):
+    """替换底层 HTTP 传输（离线测试 / 基准测试使用），下次 get_client() 时重建客户端"""
+    global _transport
+    with _lock:
+        _transport = transport
+    reset()
+
+
+def reset():
+    """丢弃当前客户端，下次 get_client() 时重新创建
+
+    其他线程可能仍在用旧客户端发请求（调用期间持有局部引用），因此不主动关闭；
+    最后一个引用释放后由 genai 在垃圾回收时关闭其连接池。
+    """
+    global _client, _client_key
+    with _lock:
+        _client, _client_key = None, None
+
+
+@atexit.register
+def shutdown():
+    """进程退出时关闭连接池"""
+    global _client, _client_key
+    with _lock:
+        old, _client, _client_key = _client, None, None
+    if old is not None:
+        try:
+            old.close()
+        except Exception as e:
+            logger.warning('关闭 Gemini 客户端失败: %s', e)
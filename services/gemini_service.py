@@ -1,24 +1,40 @@
 """Gemini AI 服务 — Prompt 结构化生成 + 素材图片生成"""
 
 import base64
-import os
+import hashlib
 import sys
 import time
 import uuid
 
-from google import genai
 from google.genai import types
 
 import config
-from services import asset_service
+from services import asset_service, prompt_cache
+from services.gemini_client import get_client
+from utils import metrics
 from utils.logger import logger
 
+_GEMINI_SECONDS = metrics.histogram(
+    'gemini_request_duration_seconds', 'Gemini 调用耗时（含重试）', ['operation'])
+_GEMINI_REQUESTS = metrics.counter(
+    'gemini_requests_total', 'Gemini 调用次数（按结果）', ['operation', 'outcome'])
+_PROMPT_CACHE_LOOKUPS = metrics.counter(
+    'prompt_cache_lookups_total', '五要素 Prompt 缓存查询次数', ['result'])
 
-def _get_client():
-    """获取 Gemini 客户端"""
-    if not config.GEMINI_API_KEY:
-        raise RuntimeError('未配置 GEMINI_API_KEY，请在 .env 文件中设置')
-    return genai.Client(api_key=config.GEMINI_API_KEY)
+
+def _generate_content(operation: str, **kwargs):
+    """调用 Gemini generate_content，并记录耗时与成功 / 失败次数"""
+    # 持有客户端引用直到调用结束，否则临时客户端可能在请求途中被回收并关闭
+    client = get_client()
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        response = client.models.generate_content(**kwargs)
+        outcome = 'ok'
+        return response
+    finally:
+        _GEMINI_SECONDS.observe(time.perf_counter() - start, operation)
+        _GEMINI_REQUESTS.inc(operation, outcome)
 
 
 # ── AI 生成五要素 Prompt ──────────────────────────────────────
@@ -38,21 +54,49 @@ PROMPT_SYSTEM = """你是一位顶级视频创意导演，精通 Seedance 2.0 
 - 描述应具体、有画面感、可直接用于 AI 视频生成
 - 风格偏电影级质感"""
 
+PROMPT_TEMPERATURE = 0.9
+_PROMPT_SYSTEM_HASH = hashlib.sha256(PROMPT_SYSTEM.encode('utf-8')).hexdigest()
+
+
+def _prompt_cache_key(idea: str) -> str:
+    """缓存键：归一化创意 + 模型 + 系统提示词哈希 + 温度"""
+    return prompt_cache.make_key(
+        prompt_cache.normalize_text(idea), config.GEMINI_PROMPT_MODEL,
+        _PROMPT_SYSTEM_HASH, PROMPT_TEMPERATURE,
+    )
+
+
+def get_cached_prompt(idea: str) -> dict | None:
+    """仅查询缓存，不调用 Gemini"""
+    return prompt_cache.get_cache().get(_prompt_cache_key(idea))
+
 
-def generate_prompt(idea: str) -> dict:
+def generate_prompt(idea: str, fresh: bool = False) -> dict:
     """
     根据用户创意描述，生成五要素结构化 Prompt。
 
+    相同创意（归一化后）在缓存有效期内直接返回上次结果，不消耗配额。
+
     Args:
         idea: 用户的简短创意描述
+        fresh: 为 True 时跳过缓存重新生成（结果仍会写入缓存）
 
     Returns:
         dict: {subject, scene, action, camera, atmosphere}
     """
-    logger.info(f"正在使用 Gemini 生成五要素 Prompt: {idea[:50]}...")
-    client = _get_client()
-
-    response = client.models.generate_content(
+    cache = prompt_cache.get_cache()
+    key = _prompt_cache_key(idea)
+    if not fresh:
+        cached = cache.get(key)
+        _PROMPT_CACHE_LOOKUPS.inc('miss' if cached is None else 'hit')
+        if cached is not None:
+            logger.info('五要素 Prompt 命中缓存: %.50s', idea)
+            return cached
+
+    logger.info('正在使用 Gemini 生成五要素 Prompt: %.50s...', idea)
+
+    response = _generate_content(
+        'prompt',
         model=config.GEMINI_PROMPT_MODEL,
         contents=f'请根据以下创意描述，生成五要素结构化 Prompt：\n\n{idea}',
         config=types.GenerateContentConfig(
@@ -69,16 +113,18 @@ def generate_prompt(idea: str) -> dict:
                 },
                 'required': ['subject', 'scene', 'action', 'camera', 'atmosphere'],
             },
-            temperature=0.9,
+            temperature=PROMPT_TEMPERATURE,
         ),
     )
 
     import json
     try:
-        return json.loads(response.text)
+        result = json.loads(response.text)
     except (json.JSONDecodeError, TypeError) as e:
-        logger.error(f'AI Prompt 解析失败: {e}')
+        logger.error('AI Prompt 解析失败: %s', e)
         raise RuntimeError(f'AI 返回格式异常: {e}')
+    cache.put(key, result)
+    return result
 
 
 # ── AI 生成素材图片 ───────────────────────────────────────────
@@ -94,10 +140,10 @@ def generate_image(prompt: str, aspect_ratio: str = '16:9') -> dict:
     Returns:
         dict: 已保存的素材元数据
     """
-    logger.info(f"正在使用 Gemini 生成图片素材: {prompt[:50]}...")
-    client = _get_client()
+    logger.info('正在使用 Gemini 生成图片素材: %.50s...', prompt)
 
-    response = client.models.generate_content(
+    response = _generate_content(
+        'image',
         model=config.GEMINI_IMAGE_MODEL,
         contents=f'请根据以下描述生成一张高质量图片：\n\n{prompt}',
         config=types.GenerateContentConfig(
@@ -126,39 +172,16 @@ def generate_image(prompt: str, aspect_ratio: str = '16:9') -> dict:
     }
     ext = ext_map.get(mime_type, '.png')
 
-    # 保存文件
-    asset_id = str(uuid.uuid4())[:8]
-    filename = f'ai_gen_{asset_id}{ext}'
-    filepath = os.path.join(config.ASSETS_DIR, filename)
-
     # image_data 已经是 bytes
     if isinstance(image_data, str):
         raw_bytes = base64.b64decode(image_data)
     else:
         raw_bytes = image_data
 
-    with open(filepath, 'wb') as f:
-        f.write(raw_bytes)
-
-    # 注册到素材库并生成缩略图
-    from models.asset import Asset
-    asset = Asset(
-        asset_id=asset_id,
+    # 走常规素材导入流程：内容去重、入库并在后台生成缩略图
+    filename = f'ai_gen_{uuid.uuid4().hex[:8]}{ext}'
+    return asset_service.import_bytes(
+        raw_bytes, filename,
         name=f'AI 生成 - {prompt[:20]}',
-        original_name=filename,
-        file_path=filename,
-        file_size=len(raw_bytes),
-        asset_type=Asset.TYPE_IMAGE,
         tags=['AI生成'],
     )
-
-    # 生成缩略图
-    thumbnail_filename = asset_service.generate_thumbnail(filepath, asset_id, Asset.TYPE_IMAGE)
-    asset.thumbnail_path = thumbnail_filename
-
-    # 保存元数据
-    from models.asset import AssetStore
-    store = AssetStore()
-    store.add(asset)
-
-    return asset.to_dict()
@@ -0,0 +1,197 @@
+"""后台任务 — AI 图片生成等耗时操作在线程池中执行，通过轮询或 SSE 获取进度"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from services import batch_service, gemini_service
+from utils.logger import logger
+
+
+class Job:
+    """一个后台任务，由若干可并行的子任务组成（如同一描述的多个变体）"""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    PARTIAL = 'partial'  # 部分子任务失败
+    FAILED = 'failed'
+    FINISHED = {SUCCEEDED, PARTIAL, FAILED}
+
+    def __init__(self, kind: str, params: dict, total: int):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params
+        self.status = self.QUEUED
+        self.total = total
+        self.results = []  # 成功子任务的结果（如素材字典）
+        self.errors = []
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.version = 0  # 每次状态变化递增，SSE 据此判断是否推送
+
+    @property
+    def finished(self) -> bool:
+        return self.status in self.FINISHED
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'params': self.params,
+            'status': self.status,
+            'total': self.total,
+            'completed': len(self.results),
+            'failed': len(self.errors),
+            'results': list(self.results),
+            'errors': list(self.errors),
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'version': self.version,
+        }
+
+
+class JobManager:
+    """任务管理器
+
+    任务由提交它的进程执行，状态每次变化都写入 SQLite（生成结果本身已作为素材持久化），
+    多 worker 部署时任意进程都能查询；更新时间早于 JOB_TTL 的任务在提交新任务时清理
+    （包括所在进程已退出、不会再结束的任务）。
+    本进程执行的任务状态变化通过 Condition 立即通知等待中的 SSE 连接，
+    其他进程的任务则每隔 sync_interval 从库中重新读取。
+    """
+
+    def __init__(self, db_path: str, max_workers: int, ttl: float, sync_interval: float):
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self._jobs: dict[str, Job] = {}  # 本进程正在执行的任务
+        self._changed = threading.Condition()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' id TEXT PRIMARY KEY,'
+            ' updated_at REAL NOT NULL,'
+            ' data TEXT NOT NULL)'
+        )
+        self._conn.commit()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+
+    def submit(self, kind: str, params: dict, tasks: list) -> dict:
+        """提交任务，tasks 为无参可调用对象列表，各自独立并行执行"""
+        job = Job(kind, params, len(tasks))
+        with self._changed:
+            self._cleanup()
+            self._jobs[job.id] = job
+            self._save(job)
+        for task in tasks:
+            self._executor.submit(self._run, job, task)
+        logger.info('后台任务已提交: %s ×%d (ID: %s)', kind, len(tasks), job.id)
+        return job.to_dict()
+
+    def _run(self, job: Job, task):
+        with self._changed:
+            if job.status == Job.QUEUED:
+                self._touch(job, Job.RUNNING)
+        try:
+            result, error = task(), None
+        except Exception as e:
+            logger.error('后台任务失败 (%s, ID: %s): %s', job.kind, job.id, e)
+            result, error = None, str(e)
+
+        with self._changed:
+            if error is None:
+                job.results.append(result)
+            else:
+                job.errors.append(error)
+            status = job.status
+            if len(job.results) + len(job.errors) == job.total:
+                status = (Job.FAILED if not job.results
+                          else Job.PARTIAL if job.errors else Job.SUCCEEDED)
+            self._touch(job, status)
+
+    def _touch(self, job: Job, status: str):
+        """更新状态、落盘并唤醒等待者（调用方需持有 _changed）"""
+        job.status = status
+        job.updated_at = time.time()
+        job.version += 1
+        self._save(job)
+        if job.finished:
+            del self._jobs[job.id]
+        self._changed.notify_all()
+
+    def _save(self, job: Job):
+        with self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO jobs (id, updated_at, data) VALUES (?, ?, ?)',
+                (job.id, job.updated_at, json.dumps(job.to_dict(), ensure_ascii=False))
+            )
+
+    def _cleanup(self):
+        with self._conn:
+            self._conn.execute('DELETE FROM jobs WHERE updated_at < ?', (time.time() - self.ttl,))
+
+    def _read(self, job_id: str) -> dict | None:
+        """本进程执行中的任务直接取内存，其余从库中读取（调用方需持有 _changed）"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        row = self._conn.execute('SELECT data FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get(self, job_id: str) -> dict | None:
+        with self._changed:
+            return self._read(job_id)
+
+    def wait(self, job_id: str, version: int, timeout: float) -> dict | None:
+        """阻塞直到任务版本号大于 version 或超时，返回最新状态（任务不存在时为 None）"""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                job = self._read(job_id)
+                remaining = deadline - time.monotonic()
+                if job is None or job['version'] > version or remaining <= 0:
+                    return job
+                if job_id not in self._jobs:
+                    remaining = min(remaining, self.sync_interval)
+                self._changed.wait(remaining)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_manager: JobManager | None = None
+_manager_lock = threading.Lock()
+
+
+def get_manager() -> JobManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager(config.JOB_DB_FILE, config.JOB_WORKERS, config.JOB_TTL,
+                                  config.JOB_SYNC_INTERVAL)
+        return _manager
+
+
+def submit_image_job(prompt: str, aspect_ratio: str = '16:9', variants: int = 1) -> dict:
+    """提交 AI 图片生成任务，variants 个变体并行生成，各自走常规素材导入流程"""
+    def generate():
+        return batch_service.call_with_backoff(gemini_service.generate_image, prompt, aspect_ratio)
+
+    params = {'prompt': prompt, 'aspect_ratio': aspect_ratio, 'variants': variants}
+    return get_manager().submit('generate_image', params, [generate] * variants)
+
+
+@atexit.register
+def shutdown():
+    with _manager_lock:
+        if _manager is not None:
+            _manager.shutdown()
@@ -0,0 +1,142 @@
+"""媒体信息探测 — ffprobe 提取时长 / 分辨率 / 帧率 / 编码，结果按内容哈希缓存"""
+
+import json
+import os
+import sqlite3
+import subprocess
+import threading
+from fractions import Fraction
+
+import config
+from utils.logger import logger
+
+
+def probe(source_path: str, asset_type: str) -> dict:
+    """探测媒体信息
+
+    图片只读取文件头得到宽高；视频 / 音频调用一次 ffprobe。
+
+    Returns:
+        dict: duration, width, height, ratio, fps, video_codec,
+              audio_codec, audio_channels, sample_rate, bit_rate（缺失的键不返回）
+    """
+    if asset_type == 'image':
+        from PIL import Image
+        with Image.open(source_path) as img:
+            width, height = img.size
+        return _with_ratio({'width': width, 'height': height})
+
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-print_format', 'json',
+         '-show_format', '-show_streams', source_path],
+        check=True, capture_output=True, timeout=config.FFPROBE_TIMEOUT
+    )
+    return parse_ffprobe(json.loads(result.stdout or b'{}'))
+
+
+def parse_ffprobe(data: dict) -> dict:
+    """从 ffprobe JSON 输出中提取关心的字段"""
+    info = {}
+    fmt = data.get('format', {})
+    if fmt.get('duration'):
+        info['duration'] = round(float(fmt['duration']), 3)
+    if fmt.get('bit_rate'):
+        info['bit_rate'] = int(fmt['bit_rate'])
+
+    for stream in data.get('streams', []):
+        kind = stream.get('codec_type')
+        if kind == 'video' and 'width' not in info:
+            # 封面图（attached_pic）不算视频流
+            if stream.get('disposition', {}).get('attached_pic'):
+                continue
+            info['width'] = int(stream.get('width') or 0)
+            info['height'] = int(stream.get('height') or 0)
+            info['video_codec'] = stream.get('codec_name', '')
+            fps = _parse_rate(stream.get('avg_frame_rate')) or _parse_rate(stream.get('r_frame_rate'))
+            if fps:
+                info['fps'] = fps
+            if 'duration' not in info and stream.get('duration'):
+                info['duration'] = round(float(stream['duration']), 3)
+        elif kind == 'audio' and 'audio_codec' not in info:
+            info['audio_codec'] = stream.get('codec_name', '')
+            info['audio_channels'] = int(stream.get('channels') or 0)
+            if stream.get('sample_rate'):
+                info['sample_rate'] = int(stream['sample_rate'])
+            if 'duration' not in info and stream.get('duration'):
+                info['duration'] = round(float(stream['duration']), 3)
+    return _with_ratio(info)
+
+
+def _parse_rate(value: str | None) -> float | None:
+    try:
+        rate = Fraction(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return round(float(rate), 3) if rate > 0 else None
+
+
+def _with_ratio(info: dict) -> dict:
+    """根据宽高匹配最接近的预设比例（误差 3% 以内）"""
+    width, height = info.get('width'), info.get('height')
+    if width and height:
+        actual = width / height
+        best = min(config.RATIOS, key=lambda r: abs(_ratio_value(r) - actual))
+        if abs(_ratio_value(best) - actual) / actual <= 0.03:
+            info['ratio'] = best
+    return info
+
+
+def _ratio_value(ratio: str) -> float:
+    w, h = ratio.split(':')
+    return int(w) / int(h)
+
+
+class ProbeCache:
+    """探测结果缓存 — 以内容哈希为键，同一内容只探测一次（删除后再上传也不重复）"""
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS probes (content_hash TEXT PRIMARY KEY, data TEXT NOT NULL)'
+        )
+        self._conn.commit()
+
+    def get(self, content_hash: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data FROM probes WHERE content_hash = ?', (content_hash,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, content_hash: str, info: dict):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO probes (content_hash, data) VALUES (?, ?)',
+                (content_hash, json.dumps(info))
+            )
+
+
+_cache: ProbeCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ProbeCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ProbeCache(config.PROBE_CACHE_FILE)
+        return _cache
+
+
+def safe_probe(source_path: str, asset_type: str) -> dict:
+    """探测失败（如未安装 ffprobe、文件损坏）时返回空字典"""
+    try:
+        return probe(source_path, asset_type)
+    except FileNotFoundError:
+        logger.warning('未找到 ffprobe，跳过媒体信息探测')
+    except Exception as e:
+        logger.error('媒体信息探测失败 (%s): %s', os.path.basename(source_path), e)
+    return {}
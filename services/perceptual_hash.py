@@ -0,0 +1,69 @@
+"""感知哈希 — 图片 / 视频关键帧的 64 位 dHash，用于近似重复检测"""
+
+import subprocess
+
+import config
+
+# dHash 采样尺寸：9×8 灰度图，相邻像素比较得到 8×8 = 64 位
+_WIDTH, _HEIGHT = 9, 8
+# 相邻像素灰度差都不超过该值时视为没有横向细节（纯色、纵向渐变等），
+# 这类画面的哈希全为 0 或由噪声决定，彼此误判为相似，不计算哈希
+_FLAT_THRESHOLD = 2
+
+
+def _dhash(pixels) -> str | None:
+    """由 9×8 灰度像素计算 dHash，返回 16 位十六进制字符串；画面过于平坦时返回 None"""
+    import numpy as np
+    grid = np.asarray(pixels, dtype=np.int16).reshape(_HEIGHT, _WIDTH)
+    diff = grid[:, 1:] - grid[:, :-1]
+    if np.abs(diff).max() <= _FLAT_THRESHOLD:
+        return None
+    return np.packbits((diff > 0).ravel()).tobytes().hex()
+
+
+def hash_image(source_path: str) -> str | None:
+    """图片 dHash，画面过于平坦时返回 None"""
+    from PIL import Image
+    with Image.open(source_path) as img:
+        img.draft('L', (_WIDTH * 8, _HEIGHT * 8))  # JPEG 在解码阶段直接降采样
+        small = img.convert('L').resize((_WIDTH, _HEIGHT), Image.Resampling.BOX)
+        return _dhash(small)
+
+
+def _frame_hash(source_path: str, timestamp: float) -> str | None:
+    """用 ffmpeg 抽取 timestamp 处的一帧，直接缩放为 9×8 灰度原始像素"""
+    result = subprocess.run(
+        ['ffmpeg', '-v', 'error', '-ss', f'{timestamp:.3f}', '-i', source_path,
+         '-frames:v', '1', '-vf', f'scale={_WIDTH}:{_HEIGHT}:flags=area',
+         '-pix_fmt', 'gray', '-f', 'rawvideo', 'pipe:1'],
+        check=True, capture_output=True, timeout=config.FFPROBE_TIMEOUT
+    )
+    if len(result.stdout) < _WIDTH * _HEIGHT:
+        return None
+    return _dhash(bytearray(result.stdout[:_WIDTH * _HEIGHT]))
+
+
+def hash_video(source_path: str, duration: float | None = None) -> list[str]:
+    """视频按时长均匀取 PHASH_VIDEO_SAMPLES 帧，返回去重后的 dHash 列表
+
+    输入端 -ss 会跳到最近的关键帧，每帧只解码一小段。
+    时长未知时只取首帧。
+    """
+    samples = config.PHASH_VIDEO_SAMPLES if duration else 1
+    timestamps = [duration * (i + 0.5) / samples for i in range(samples)] if duration else [0.0]
+    hashes = []
+    for ts in timestamps:
+        value = _frame_hash(source_path, ts)
+        if value and value not in hashes:
+            hashes.append(value)
+    return hashes
+
+
+def compute(source_path: str, asset_type: str, duration: float | None = None) -> list[str]:
+    """计算素材的感知哈希；音频及其他类型、平坦的图片返回空列表"""
+    if asset_type == 'image':
+        value = hash_image(source_path)
+        return [value] if value else []
+    if asset_type == 'video':
+        return hash_video(source_path, duration)
+    return []
@@ -0,0 +1,110 @@
+"""AI 响应缓存 — 按内容键缓存生成结果，内存 LRU + SQLite 持久化"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import config
+
+
+def normalize_text(text: str) -> str:
+    """归一化输入文本：全半角统一、合并空白、忽略大小写"""
+    text = unicodedata.normalize('NFKC', text)
+    return ' '.join(text.split()).casefold()
+
+
+def make_key(*parts) -> str:
+    """由任意可 JSON 序列化的部分生成缓存键"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """带 TTL 的 LRU 缓存
+
+    命中只查内存中的 OrderedDict；写入同时落盘，启动时按写入时间恢复最近的条目。
+    """
+
+    def __init__(self, db_path: str, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY,'
+            ' created_at REAL NOT NULL,'
+            ' data TEXT NOT NULL)'
+        )
+        self._conn.commit()
+        self._load()
+
+    def _load(self):
+        deadline = time.time() - self.ttl
+        with self._conn:
+            self._conn.execute('DELETE FROM responses WHERE created_at < ?', (deadline,))
+        rows = self._conn.execute(
+            'SELECT key, created_at, data FROM responses ORDER BY created_at DESC LIMIT ?',
+            (self.max_entries,)
+        ).fetchall()
+        for key, created_at, data in reversed(rows):
+            self._entries[key] = (created_at, json.loads(data))
+
+    def get(self, key: str) -> dict | None:
+        """命中且未过期时返回缓存值的副本"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, value = entry
+            if time.time() - created_at <= self.ttl:
+                self._entries.move_to_end(key)
+                return dict(value)
+            del self._entries[key]
+        self._delete([key])
+        return None
+
+    def put(self, key: str, value: dict):
+        now = time.time()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (now, dict(value))
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO responses (key, created_at, data) VALUES (?, ?, ?)',
+                    (key, now, json.dumps(value, ensure_ascii=False))
+                )
+        if evicted:
+            self._delete(evicted)
+
+    def _delete(self, keys: list[str]):
+        with self._lock, self._conn:
+            self._conn.executemany('DELETE FROM responses WHERE key = ?', [(k,) for k in keys])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_cache: ResponseCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                config.PROMPT_CACHE_FILE, config.PROMPT_CACHE_MAX_ENTRIES, config.PROMPT_CACHE_TTL
+            )
+        return _cache
@@ -1,12 +1,34 @@
 """Prompt 构建服务 — 模板管理、构建、导出"""
 
+import hashlib
+import itertools
 import json
+import math
 import os
+import threading
 import time
+from collections.abc import Iterator
 
+from models.project_index import ProjectIndex
 from models.prompt import SeedancePrompt
 import config
+from services import asset_service
 from utils.logger import logger
+from utils.pagination import paginate, project
+
+
+# 项目摘要索引单例
+_index: ProjectIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> ProjectIndex:
+    """获取项目摘要索引实例"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ProjectIndex(config.PROJECT_INDEX_FILE, config.PROJECTS_DIR)
+        return _index
 
 
 # ── 预置模板库 ──────────────────────────────────────────────────
@@ -110,6 +132,91 @@ def export_prompt(data: dict) -> dict:
     return prompt.to_api_payload()
 
 
+# ── 参数扫描 ──────────────────────────────────────────────────
+
+# 可作为扫描维度的字段：视频参数与五要素
+SWEEP_AXES = ('model', 'resolution', 'ratio', 'duration', 'task_type',
+              'subject', 'scene', 'action', 'camera', 'atmosphere')
+
+
+def sweep_payloads(data: dict, axes: dict) -> Iterator[dict]:
+    """以 data 为基础，按各维度取值的笛卡尔积逐个生成 API payload
+
+    参数校验在调用时立即完成（不合法时抛出 ValueError），
+    组合则在迭代时按需生成，内存中只保留已产出 payload 的摘要用于去重。
+
+    Args:
+        data: 基础项目数据
+        axes: {字段: [取值, ...]}，字段须属于 SWEEP_AXES
+
+    Yields:
+        {index, params, payload}，最后一条为 {done, total, unique, duplicates}
+    """
+    if not isinstance(axes, dict) or not axes:
+        raise ValueError('axes 不能为空')
+    for key, values in axes.items():
+        if key not in SWEEP_AXES:
+            raise ValueError(f'不支持的扫描维度: {key}')
+        if not isinstance(values, list) or not values:
+            raise ValueError(f'维度 {key} 的取值须为非空数组')
+        expected = int if key == 'duration' else str
+        if any(type(v) is not expected for v in values):
+            raise ValueError(f'维度 {key} 的取值类型须为 {expected.__name__}')
+
+    total = math.prod(len(v) for v in axes.values())
+    if total > config.SWEEP_MAX_VARIANTS:
+        raise ValueError(f'组合数 {total} 超过上限 {config.SWEEP_MAX_VARIANTS}')
+    return _iter_sweep(SeedancePrompt.from_dict(data), dict(axes), total)
+
+
+def _iter_sweep(prompt: SeedancePrompt, axes: dict, total: int) -> Iterator[dict]:
+    keys = list(axes)
+    seen = set()
+    index = duplicates = 0
+    for combo in itertools.product(*axes.values()):
+        # 复用同一个 prompt 对象，payload 每次新建，互不影响
+        for key, value in zip(keys, combo):
+            setattr(prompt, key, value)
+        payload = prompt.to_api_payload()
+        canonical = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        digest = hashlib.blake2b(canonical.encode(), digest_size=16).digest()
+        if digest in seen:
+            duplicates += 1
+            continue
+        seen.add(digest)
+        yield {'index': index, 'params': dict(zip(keys, combo)), 'payload': payload}
+        index += 1
+    yield {'done': True, 'total': total, 'unique': index, 'duplicates': duplicates}
+
+
+def check_references(data: dict) -> list[str]:
+    """根据引用素材的媒体信息检查时长 / 比例是否与视频参数一致
+
+    媒体信息来自入库时的 ffprobe 探测结果，不重新读取文件。
+
+    Returns:
+        警告文本列表，无问题时为空
+    """
+    prompt = SeedancePrompt.from_dict(data)
+    store = asset_service.get_store()
+    warnings = []
+    for ref in prompt.ref_assets:
+        asset = store.get(ref.get('id', ''))
+        if not asset or not asset.media:
+            continue
+        media = asset.media
+        label = asset.name or asset.original_name
+        if media.get('ratio') and media['ratio'] != prompt.ratio:
+            warnings.append(f'素材「{label}」比例为 {media["ratio"]}，与设定比例 {prompt.ratio} 不一致')
+        duration = media.get('duration')
+        if asset.type == 'video' and duration:
+            if prompt.task_type == 'video_edit' and abs(duration - prompt.duration) > 0.5:
+                warnings.append(f'参考视频「{label}」时长 {duration:.1f} 秒，与设定时长 {prompt.duration} 秒不一致')
+            elif duration < prompt.duration and prompt.task_type != 'video_extend':
+                warnings.append(f'参考视频「{label}」时长 {duration:.1f} 秒，短于设定时长 {prompt.duration} 秒')
+    return warnings
+
+
 def save_project(data: dict) -> str:
     """保存 Prompt 项目到本地"""
     prompt = SeedancePrompt.from_dict(data)
@@ -117,9 +224,11 @@ def save_project(data: dict) -> str:
         prompt.name = f'项目_{prompt.id}'
     prompt.updated_at = time.time()
 
-    filepath = os.path.join(config.PROJECTS_DIR, f'{prompt.id}.json')
+    filename = f'{prompt.id}.json'
+    filepath = os.path.join(config.PROJECTS_DIR, filename)
     prompt.save(filepath)
-    logger.info(f"项目已保存: {prompt.name} (ID: {prompt.id})")
+    get_index().update(filename)
+    logger.info('项目已保存: %s (ID: %s)', prompt.name, prompt.id)
     return prompt.id
 
 
@@ -132,36 +241,26 @@ def load_project(project_id: str) -> dict | None:
     return None
 
 
-def list_projects() -> list[dict]:
-    """列出所有已保存的项目"""
-    projects = []
-    if not os.path.exists(config.PROJECTS_DIR):
-        return projects
+def list_projects(limit: int | None = None, cursor: str | None = None,
+                  fields: list[str] | None = None) -> tuple[list[dict], str | None]:
+    """列出已保存的项目，按更新时间倒序
 
-    for filename in os.listdir(config.PROJECTS_DIR):
-        if filename.endswith('.json'):
-            filepath = os.path.join(config.PROJECTS_DIR, filename)
-            try:
-                prompt = SeedancePrompt.load(filepath)
-                projects.append({
-                    'id': prompt.id,
-                    'name': prompt.name,
-                    'task_type': prompt.task_type,
-                    'created_at': prompt.created_at,
-                    'updated_at': prompt.updated_at,
-                })
-            except Exception:
-                pass
-
-    projects.sort(key=lambda x: x['updated_at'], reverse=True)
-    return projects
+    Returns:
+        (当前页项目摘要列表, 下一页游标)；limit 为 None 时返回全部
+    """
+    projects = get_index().summaries()
+    keyed = (((-p['updated_at'], p['id']), p) for p in projects)
+    page, next_cursor = paginate(keyed, limit=limit, cursor=cursor, key_types=(float, str))
+    return [project(p, fields) for p in page], next_cursor
 
 
 def delete_project(project_id: str) -> bool:
     """删除项目"""
-    filepath = os.path.join(config.PROJECTS_DIR, f'{project_id}.json')
+    filename = f'{project_id}.json'
+    filepath = os.path.join(config.PROJECTS_DIR, filename)
     if os.path.exists(filepath):
         os.remove(filepath)
-        logger.info(f"项目已删除: {project_id}")
+        get_index().remove(filename)
+        logger.info('项目已删除: %s', project_id)
         return True
     return False
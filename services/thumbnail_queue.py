@@ -0,0 +1,72 @@
+"""缩略图后台任务队列 — 进程池执行 CPU / 子进程密集型任务"""
+
+import atexit
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import config
+from utils.logger import logger
+
+_executor: ProcessPoolExecutor | None = None
+_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor | None:
+    """懒加载进程池；THUMBNAIL_WORKERS 为 0 时返回 None（同步执行）"""
+    global _executor
+    if config.THUMBNAIL_WORKERS <= 0:
+        return None
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=config.THUMBNAIL_WORKERS)
+            logger.info('缩略图进程池已启动: %d 个 worker', config.THUMBNAIL_WORKERS)
+        return _executor
+
+
+def _run_inline(fn, *args) -> Future:
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def submit(fn, *args, callback=None) -> Future:
+    """提交后台任务
+
+    Args:
+        fn: 模块级函数（需可被 pickle 传入子进程）
+        *args: 位置参数
+        callback: 完成回调，参数为 Future，在主进程的线程中执行
+
+    Returns:
+        Future
+    """
+    global _executor
+    executor = _get_executor()
+    if executor is None:
+        future = _run_inline(fn, *args)
+    else:
+        try:
+            future = executor.submit(fn, *args)
+        except (BrokenProcessPool, RuntimeError) as e:
+            # 进程池异常（如 worker 崩溃）时重建，并先以同步方式完成本次任务
+            logger.error('缩略图进程池不可用，重建中: %s', e)
+            with _lock:
+                _executor = None
+            future = _run_inline(fn, *args)
+    if callback:
+        future.add_done_callback(callback)
+    return future
+
+
+@atexit.register
+def shutdown():
+    """进程退出时关闭进程池，取消尚未开始的任务"""
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,207 @@
+"""分片上传服务 — 初始化 / 追加分片 / 断点续传 / 完成"""
+
+import json
+import os
+import threading
+import time
+import uuid
+
+import config
+from services import asset_service
+from utils.logger import logger
+from utils.storage import FileLock, atomic_write
+
+
+class UploadError(Exception):
+    """分片上传协议错误"""
+
+    def __init__(self, message: str, status_code: int = 400, offset: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
+
+
+# 进程内的增量哈希状态: upload_id → (hasher, 已哈希字节数)
+# 服务重启或分片落到其他进程时状态不再同步，此后不再增量哈希，完成时对整个文件计算一次
+_hashers: dict[str, tuple] = {}
+_locks: dict[str, FileLock] = {}
+_locks_guard = threading.Lock()
+
+
+def _session_lock(upload_id: str) -> FileLock:
+    """会话锁（文件锁），同一会话的分片落到不同 worker 时也能串行追加"""
+    with _locks_guard:
+        lock = _locks.get(upload_id)
+        if lock is None:
+            lock = _locks[upload_id] = FileLock(_lock_path(upload_id))
+        return lock
+
+
+def _meta_path(upload_id: str) -> str:
+    return os.path.join(config.UPLOADS_DIR, f'{upload_id}.json')
+
+
+def _part_path(upload_id: str) -> str:
+    return os.path.join(config.UPLOADS_DIR, f'{upload_id}.part')
+
+
+def _lock_path(upload_id: str) -> str:
+    return os.path.join(config.UPLOADS_DIR, f'{upload_id}.lock')
+
+
+def _load_meta(upload_id: str) -> dict:
+    # upload_id 由服务端生成，只允许十六进制字符，防止路径穿越
+    if not upload_id or not all(c in '0123456789abcdef' for c in upload_id):
+        raise UploadError('上传会话不存在', 404)
+    try:
+        with open(_meta_path(upload_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise UploadError('上传会话不存在', 404)
+
+
+def _status(meta: dict) -> dict:
+    part = _part_path(meta['id'])
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    return {
+        'upload_id': meta['id'],
+        'filename': meta['filename'],
+        'size': meta['size'],
+        'offset': offset,
+        'chunk_size': config.UPLOAD_CHUNK_SIZE,
+    }
+
+
+def init_upload(filename: str, size: int) -> dict:
+    """创建上传会话
+
+    Args:
+        filename: 原始文件名
+        size: 文件总字节数
+
+    Returns:
+        会话状态 {upload_id, filename, size, offset, chunk_size}
+    """
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if ext not in config.ALLOWED_EXTENSIONS:
+        raise UploadError(f'不支持的文件类型: .{ext}')
+    if size < 0:
+        raise UploadError('文件大小无效')
+
+    os.makedirs(config.UPLOADS_DIR, exist_ok=True)
+    cleanup_expired()
+
+    meta = {'id': uuid.uuid4().hex, 'filename': filename, 'size': size, 'created_at': time.time()}
+    open(_part_path(meta['id']), 'wb').close()
+    atomic_write(_meta_path(meta['id']), json.dumps(meta, ensure_ascii=False))
+    _hashers[meta['id']] = (asset_service.new_content_hasher(), 0)
+    logger.info('分片上传已创建: %s (%d bytes, ID: %s)', filename, size, meta['id'])
+    return _status(meta)
+
+
+def get_upload(upload_id: str) -> dict:
+    """查询会话状态，客户端据此从 offset 处续传"""
+    return _status(_load_meta(upload_id))
+
+
+def _synced_hasher(upload_id: str, offset: int):
+    """返回与已接收数据同步的哈希对象；不同步时丢弃并返回 None
+
+    分片交替落到多个 worker 时，每次补算整个文件会使总开销随分片数平方增长，
+    因此只在完成时补算一次。
+    """
+    hasher, hashed = _hashers.get(upload_id, (None, -1))
+    if hasher is not None and hashed == offset:
+        return hasher
+    _hashers.pop(upload_id, None)
+    return None
+
+
+def append_chunk(upload_id: str, offset: int, stream) -> dict:
+    """从 offset 处追加一个分片
+
+    分片数据直接从请求流写入最终目录下的 .part 文件，同时增量更新哈希（本进程的哈希状态同步时）。
+    offset 与已接收字节数不一致时返回 409 及当前 offset，客户端据此续传。
+    """
+    meta = _load_meta(upload_id)
+    with _session_lock(upload_id):
+        part = _part_path(upload_id)
+        if not os.path.exists(part):
+            raise UploadError('上传会话不存在', 404)  # 等锁期间已被其他 worker 完成或取消
+        current = os.path.getsize(part)
+        if offset != current:
+            raise UploadError('分片偏移不匹配', 409, offset=current)
+
+        hasher = _synced_hasher(upload_id, current)
+        written = 0
+        with open(part, 'ab') as f:
+            for block in iter(lambda: stream.read(asset_service.HASH_CHUNK_SIZE), b''):
+                if current + written + len(block) > meta['size']:
+                    _hashers.pop(upload_id, None)  # 已写入部分数据，哈希状态不再可靠
+                    raise UploadError('数据超出声明的文件大小', 413, offset=current + written)
+                f.write(block)
+                if hasher is not None:
+                    hasher.update(block)
+                written += len(block)
+        if hasher is not None:
+            _hashers[upload_id] = (hasher, current + written)
+
+    return _status(meta)
+
+
+def complete_upload(upload_id: str) -> dict:
+    """全部分片到齐后创建素材记录（.part 文件直接改名为素材文件）"""
+    meta = _load_meta(upload_id)
+    with _session_lock(upload_id):
+        part = _part_path(upload_id)
+        if not os.path.exists(part):
+            raise UploadError('上传会话不存在', 404)
+        offset = os.path.getsize(part)
+        if offset != meta['size']:
+            raise UploadError('文件尚未上传完整', 409, offset=offset)
+
+        hasher = _synced_hasher(upload_id, offset)
+        if hasher is None:
+            hasher = asset_service.new_content_hasher()
+            with open(part, 'rb') as f:
+                for block in iter(lambda: f.read(asset_service.HASH_CHUNK_SIZE), b''):
+                    hasher.update(block)
+        asset = asset_service.register_blob(part, hasher.hexdigest(), offset, meta['filename'])
+        _discard(upload_id)
+    logger.info('分片上传完成: %s (ID: %s)', meta['filename'], upload_id)
+    return asset
+
+
+def abort_upload(upload_id: str):
+    """取消上传并删除已接收的数据"""
+    _load_meta(upload_id)
+    with _session_lock(upload_id):
+        _discard(upload_id)
+
+
+def _discard(upload_id: str):
+    for path in (_part_path(upload_id), _meta_path(upload_id)):
+        if os.path.exists(path):
+            os.remove(path)
+    try:
+        os.remove(_lock_path(upload_id))
+    except OSError:
+        pass  # Windows 上锁文件仍被持有时无法删除，留待下次清理
+    _hashers.pop(upload_id, None)
+    with _locks_guard:
+        _locks.pop(upload_id, None)
+
+
+def cleanup_expired():
+    """清理超过 UPLOAD_SESSION_TTL 没有新分片的会话"""
+    if not os.path.isdir(config.UPLOADS_DIR):
+        return
+    deadline = time.time() - config.UPLOAD_SESSION_TTL
+    with os.scandir(config.UPLOADS_DIR) as it:
+        expired = [
+            entry.name[:-len('.part')] for entry in it
+            if entry.name.endswith('.part') and entry.stat().st_mtime < deadline
+        ]
+    for upload_id in expired:
+        logger.info('清理过期上传会话: %s', upload_id)
+        _discard(upload_id)
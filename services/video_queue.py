@@ -0,0 +1,441 @@
+"""Seedance 视频生成队列 — 持久化排队、按模型限制并发、自适应轮询、重试与流式下载入库"""
+
+import atexit
+import os
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+import config
+from models.prompt import SeedancePrompt
+from models.video_task import VideoTask, VideoTaskStore
+from services import asset_service, prompt_service
+from utils.logger import logger
+from utils.pagination import paginate, project
+from utils.storage import FileLock
+
+
+class SeedanceError(Exception):
+    """Seedance 接口错误；retryable 表示网络异常 / 429 / 5xx 等可重试的错误"""
+
+    def __init__(self, message: str, retryable: bool = False, status_code: int | None = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.status_code = status_code
+
+
+# ── Seedance API 客户端 ───────────────────────────────────────
+
+class SeedanceClient:
+    """Seedance (火山方舟) 视频生成接口
+
+    API 请求与视频下载分别使用两个连接池：下载地址为外部存储，不携带 API Key。
+    """
+
+    TASKS_PATH = '/contents/generations/tasks'
+
+    def __init__(self, base_url: str, api_key: str, timeout: float):
+        self._api = httpx.Client(
+            base_url=base_url.rstrip('/'),
+            headers={'Authorization': f'Bearer {api_key}'},
+            timeout=timeout,
+        )
+        self._download = httpx.Client(timeout=timeout, follow_redirects=True)
+
+    def _request(self, method: str, path: str, **kwargs) -> dict:
+        try:
+            response = self._api.request(method, path, **kwargs)
+        except httpx.HTTPError as e:
+            raise SeedanceError(f'请求 Seedance 失败: {e}', retryable=True) from e
+        if response.status_code >= 400:
+            try:
+                message = response.json().get('error', {}).get('message', '')
+            except ValueError:
+                message = ''
+            retryable = response.status_code == 429 or response.status_code >= 500
+            raise SeedanceError(
+                f'Seedance 返回 {response.status_code}: {message or response.reason_phrase}',
+                retryable=retryable, status_code=response.status_code,
+            )
+        return response.json() if response.content else {}
+
+    def create_task(self, payload: dict) -> str:
+        """创建生成任务，返回远端任务 ID"""
+        return self._request('POST', self.TASKS_PATH, json=payload)['id']
+
+    def get_task(self, remote_id: str) -> dict:
+        return self._request('GET', f'{self.TASKS_PATH}/{remote_id}')
+
+    def cancel_task(self, remote_id: str):
+        self._request('DELETE', f'{self.TASKS_PATH}/{remote_id}')
+
+    def download(self, url: str):
+        """流式下载视频，逐块产出 bytes，不在内存中缓存整个文件"""
+        try:
+            with self._download.stream('GET', url) as response:
+                if response.status_code >= 400:
+                    raise SeedanceError(
+                        f'视频下载失败: HTTP {response.status_code}',
+                        retryable=response.status_code == 429 or response.status_code >= 500,
+                        status_code=response.status_code,
+                    )
+                yield from response.iter_bytes(asset_service.HASH_CHUNK_SIZE)
+        except httpx.HTTPError as e:
+            raise SeedanceError(f'视频下载中断: {e}', retryable=True) from e
+
+    def close(self):
+        self._api.close()
+        self._download.close()
+
+
+# ── 任务队列 ──────────────────────────────────────────────────
+
+class VideoQueue:
+    """视频生成任务调度器
+
+    单个调度线程周期性扫描未完成的任务，把到期的提交 / 轮询 / 下载
+    交给线程池执行；同一任务同一时刻只有一个操作在执行。
+    - 并发：每个模型同时占用名额（提交中 / 生成中 / 下载中）的任务数不超过限制；
+    - 轮询：远端状态不变时间隔按 1.5 倍增长至上限，状态变化时重置；
+    - 重试：网络错误、429、5xx 按指数退避重试，超过次数标记失败；
+    - 状态转换均为条件更新：操作执行期间任务被取消时，操作结束后的保存被放弃，不会覆盖 cancelled。
+    - 多进程：只有持有调度锁文件的进程执行调度，其余进程只写入 / 读取任务库；
+      调度进程退出后由其他进程接管。
+    """
+
+    def __init__(self, store: VideoTaskStore, client: SeedanceClient):
+        self.store = store
+        self.client = client
+        self._executor = ThreadPoolExecutor(
+            max_workers=config.SEEDANCE_WORKERS, thread_name_prefix='seedance'
+        )
+        self._inflight: set[str] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._leader_lock = FileLock(config.VIDEO_QUEUE_LOCK_FILE)
+        self.leader = False
+
+    def _recover(self):
+        """进程重启后恢复任务：提交中的任务无法确认远端是否已创建，重新排队"""
+        for task in self.store.by_status(VideoTask.SUBMITTING):
+            logger.warning('视频任务 %s 在提交过程中中断，重新排队', task.id)
+            task = task.copy()
+            task.status = VideoTask.QUEUED
+            self.store.save(task, expect=VideoTask.SUBMITTING)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name='seedance-dispatcher',
+                                                daemon=True)
+                self._thread.start()
+                logger.info('Seedance 任务调度已启动')
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.client.close()
+
+    # ── 调度 ──
+
+    def _loop(self):
+        while not self._stop.is_set():
+            if not self.leader:
+                if not self._leader_lock.try_acquire():
+                    self._stop.wait(config.SEEDANCE_LEADER_RETRY)
+                    continue
+                self.leader = True
+                logger.info('本进程成为 Seedance 调度进程')
+                self._recover()
+            try:
+                self._tick()
+            except Exception as e:
+                logger.error('Seedance 任务调度异常: %s', e, exc_info=True)
+            self._wake.wait(timeout=config.SEEDANCE_TICK)
+            self._wake.clear()
+        if self.leader:
+            # 锁由调度线程持有，须在本线程释放（进程退出时操作系统也会释放）
+            self.leader = False
+            self._leader_lock.release()
+
+    def _tick(self):
+        now = time.time()
+        pending = self.store.by_status(VideoTask.QUEUED, *VideoTask.ACTIVE)
+        active = Counter(t.model for t in pending if t.status in VideoTask.ACTIVE)
+        for task in pending:
+            with self._lock:
+                if task.id in self._inflight:
+                    continue
+            if task.next_check_at > now:
+                continue
+            if task.status == VideoTask.QUEUED:
+                if active[task.model] >= _concurrency(task.model):
+                    continue
+                task = task.copy()
+                task.status = VideoTask.SUBMITTING
+                if not self.store.save(task, expect=VideoTask.QUEUED):
+                    continue  # 刚被取消
+                active[task.model] += 1
+                self._dispatch(self._submit, task)
+            elif task.status == VideoTask.RUNNING:
+                self._dispatch(self._poll, task)
+            elif task.status == VideoTask.DOWNLOADING:
+                self._dispatch(self._download, task)
+
+    def _dispatch(self, fn, task: VideoTask):
+        with self._lock:
+            self._inflight.add(task.id)
+        self._executor.submit(self._run, fn, task.copy())
+
+    def _run(self, fn, task: VideoTask):
+        expect = task.status
+        try:
+            fn(task)
+        except Exception as e:
+            logger.error('视频任务 %s 处理异常: %s', task.id, e, exc_info=True)
+            self._finish(task, expect, VideoTask.FAILED, str(e))
+        finally:
+            with self._lock:
+                self._inflight.discard(task.id)
+            self._wake.set()  # 名额释放后立即调度下一个
+
+    def _finish(self, task: VideoTask, expect: str, status: str, error: str = '') -> bool:
+        """结束任务；任务已不处于 expect 状态（如已被取消）时放弃写入并返回 False"""
+        task.status = status
+        task.error = error
+        task.next_check_at = 0
+        return self.store.save(task, expect=expect)
+
+    def _retry_later(self, task: VideoTask, error: SeedanceError, expect: str, status: str):
+        """可重试错误按指数退避重新调度，超过次数或不可重试时标记失败"""
+        task.attempts += 1
+        if not error.retryable or task.attempts > config.SEEDANCE_MAX_RETRIES:
+            logger.error('视频任务 %s 失败: %s', task.id, error)
+            self._finish(task, expect, VideoTask.FAILED, str(error))
+            return
+        delay = min(config.SEEDANCE_BACKOFF_MAX, config.SEEDANCE_BACKOFF_BASE * 2 ** (task.attempts - 1))
+        delay *= 0.5 + random.random() / 2
+        logger.warning('视频任务 %s 出错，%.1f 秒后重试 (%d/%d): %s', task.id, delay,
+                       task.attempts, config.SEEDANCE_MAX_RETRIES, error)
+        task.status = status
+        task.error = str(error)
+        task.next_check_at = time.time() + delay
+        self.store.save(task, expect=expect)
+
+    def _cancel_remote(self, remote_id: str):
+        try:
+            self.client.cancel_task(remote_id)
+        except SeedanceError as e:
+            logger.warning('取消远端任务失败 (%s): %s', remote_id, e)
+
+    # ── 各阶段操作 ──
+
+    def _submit(self, task: VideoTask):
+        try:
+            remote_id = self.client.create_task(task.payload)
+        except SeedanceError as e:
+            self._retry_later(task, e, VideoTask.SUBMITTING, VideoTask.QUEUED)
+            return
+        task.remote_id = remote_id
+        task.status = VideoTask.RUNNING
+        task.error = ''
+        task.poll_interval = config.SEEDANCE_POLL_MIN
+        task.next_check_at = time.time() + task.poll_interval
+        if not self.store.save(task, expect=VideoTask.SUBMITTING):
+            # 提交期间任务已被取消，刚创建的远端任务也尽力取消
+            self._cancel_remote(remote_id)
+            return
+        logger.info('视频任务已提交: %s (ID: %s, 远端: %s)', task.name, task.id, remote_id)
+
+    def _poll(self, task: VideoTask):
+        try:
+            data = self.client.get_task(task.remote_id)
+        except SeedanceError as e:
+            if not e.retryable:
+                self._finish(task, VideoTask.RUNNING, VideoTask.FAILED, str(e))
+                return
+            # 轮询出错不计入重试次数（远端任务仍在运行），只拉长间隔
+            task.poll_interval = min(config.SEEDANCE_POLL_MAX, task.poll_interval * 2)
+            task.next_check_at = time.time() + task.poll_interval
+            self.store.save(task, expect=VideoTask.RUNNING)
+            return
+
+        status = data.get('status', '')
+        if status == 'succeeded':
+            task.remote_status = status
+            task.video_url = (data.get('content') or {}).get('video_url', '')
+            if not task.video_url:
+                self._finish(task, VideoTask.RUNNING, VideoTask.FAILED, '远端任务成功但未返回视频地址')
+                return
+            task.status = VideoTask.DOWNLOADING
+            task.attempts = 0
+            task.next_check_at = 0
+            self.store.save(task, expect=VideoTask.RUNNING)
+        elif status in ('failed', 'cancelled', 'expired'):
+            task.remote_status = status
+            message = (data.get('error') or {}).get('message', '') or f'远端任务 {status}'
+            self._finish(task, VideoTask.RUNNING, VideoTask.FAILED, message)
+        else:
+            if status != task.remote_status:
+                task.remote_status = status
+                task.poll_interval = config.SEEDANCE_POLL_MIN
+            else:
+                task.poll_interval = min(config.SEEDANCE_POLL_MAX, task.poll_interval * 1.5)
+            task.next_check_at = time.time() + task.poll_interval
+            self.store.save(task, expect=VideoTask.RUNNING)
+
+    def _download(self, task: VideoTask):
+        text = next((c.get('text', '') for c in task.payload.get('content', [])
+                     if c.get('type') == 'text'), '')
+        try:
+            temp_path, content_hash, size = asset_service.write_temp_blob(
+                self.client.download(task.video_url))
+        except SeedanceError as e:
+            self._retry_later(task, e, VideoTask.DOWNLOADING, VideoTask.DOWNLOADING)
+            return
+        # 下载期间任务可能已被取消（本进程或其他进程），入库前再确认一次
+        current = self.store.get(task.id)
+        if current is None or current.status != VideoTask.DOWNLOADING:
+            os.remove(temp_path)
+            logger.info('视频任务 %s 已取消，放弃入库', task.id)
+            return
+        asset = asset_service.register_blob(
+            temp_path, content_hash, size, f'seedance_{task.id}.mp4',
+            name=task.name or f'Seedance - {task.id}',
+            tags=['Seedance'],
+            description=text,
+        )
+        task.asset_id = asset['id']
+        if self._finish(task, VideoTask.DOWNLOADING, VideoTask.SUCCEEDED):
+            logger.info('视频已入库: %s (任务 %s, 素材 %s)', task.name, task.id, asset['id'])
+
+    # ── 对外接口 ──
+
+    def enqueue(self, items: list[tuple[str, str, dict]]) -> list[dict]:
+        """批量加入队列，items 为 (名称, 项目 ID, API 载荷)"""
+        tasks = []
+        for name, project_id, payload in items:
+            task = VideoTask()
+            task.name = name
+            task.project_id = project_id
+            task.model = payload.get('model', '')
+            task.payload = payload
+            tasks.append(task)
+        self.store.add_many(tasks)
+        self._wake.set()
+        logger.info('已加入 %d 个视频生成任务', len(tasks))
+        return [t.to_dict() for t in tasks]
+
+    def cancel(self, task_id: str) -> dict | None:
+        """取消未完成的任务（远端任务尽力取消）
+
+        与调度线程的保存冲突时按最新状态重试；执行中的操作随后保存时发现状态已变化，放弃写入。
+        """
+        while True:
+            task = self.store.get(task_id)
+            if task is None:
+                return None
+            if task.status in VideoTask.FINISHED:
+                return task.to_dict()
+            expect = task.status
+            task = task.copy()
+            if self._finish(task, expect, VideoTask.CANCELLED):
+                break
+        if task.remote_id and expect == VideoTask.RUNNING:
+            self._cancel_remote(task.remote_id)
+        return task.to_dict()
+
+    def retry(self, task_id: str) -> dict | None:
+        """将失败 / 已取消的任务重新排队"""
+        task = self.store.get(task_id)
+        if task is None:
+            return None
+        if task.status in (VideoTask.FAILED, VideoTask.CANCELLED):
+            expect = task.status
+            task = task.copy()
+            task.status = VideoTask.QUEUED
+            task.remote_id = task.remote_status = task.video_url = task.error = ''
+            task.attempts = 0
+            task.next_check_at = 0
+            if self.store.save(task, expect=expect):
+                self._wake.set()
+            else:
+                task = self.store.get(task_id)
+        return task.to_dict()
+
+
+def _concurrency(model: str) -> int:
+    return config.SEEDANCE_MODEL_CONCURRENCY.get(model, config.SEEDANCE_CONCURRENCY)
+
+
+_queue: VideoQueue | None = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> VideoQueue:
+    """获取任务队列（首次调用时恢复未完成任务并启动调度线程）"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            client = SeedanceClient(config.SEEDANCE_API_BASE, config.SEEDANCE_API_KEY,
+                                    config.SEEDANCE_REQUEST_TIMEOUT)
+            _queue = VideoQueue(VideoTaskStore(config.VIDEO_TASK_DB_FILE), client)
+            _queue.start()
+        return _queue
+
+
+def enqueue_projects(project_ids: list[str], count: int = 1) -> list[dict] | None:
+    """将已保存的项目加入生成队列，每个项目生成 count 次
+
+    Returns:
+        新建的任务列表；任一项目不存在时返回 None（不创建任何任务）
+    """
+    items = []
+    for project_id in project_ids:
+        data = prompt_service.load_project(project_id)
+        if data is None:
+            return None
+        prompt = SeedancePrompt.from_dict(data)
+        payload = prompt.to_api_payload()
+        for i in range(count):
+            name = prompt.name if count == 1 else f'{prompt.name} #{i + 1}'
+            items.append((name, project_id, payload))
+    return get_queue().enqueue(items)
+
+
+def list_tasks(status: str = '', limit: int | None = None, cursor: str | None = None,
+               fields: list[str] | None = None) -> tuple[list[dict], str | None, dict]:
+    """列出任务，按创建时间倒序
+
+    Returns:
+        (当前页, 下一页游标, 各状态任务数)
+    """
+    tasks = get_queue().store.all()
+    counts = dict(Counter(t.status for t in tasks))
+    if status:
+        tasks = [t for t in tasks if t.status == status]
+    keyed = (((-t.created_at, t.id), t) for t in tasks)
+    page, next_cursor = paginate(keyed, limit=limit, cursor=cursor, key_types=(float, str))
+    return [project(t.to_dict(), fields) for t in page], next_cursor, counts
+
+
+def get_task(task_id: str) -> dict | None:
+    task = get_queue().store.get(task_id)
+    return task.to_dict() if task else None
+
+
+@atexit.register
+def shutdown():
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            _queue.stop()
+            _queue = None
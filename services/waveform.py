@@ -0,0 +1,155 @@
+"""音频波形 — 流式解码 PCM，NumPy 分块计算 min/max/RMS 包络"""
+
+import subprocess
+import time
+
+import config
+
+# 解码参数：单声道 16bit，8kHz 足以描绘波形包络
+SAMPLE_RATE = 8000
+READ_BYTES = 256 * 1024
+
+
+class _Envelope:
+    """固定内存的波形包络累加器
+
+    每 bin_size 个采样归并为一个 bin（min / max / 平方和 / 计数）；
+    bin 数超过 2 × columns 时相邻两两合并并将 bin_size 翻倍，
+    因此无论音频多长，内存占用都只与 columns 成正比。
+    """
+
+    def __init__(self, columns: int, bin_size: int):
+        import numpy as np
+        self.np = np
+        self.columns = columns
+        self.bin_size = max(1, bin_size)
+        self.mins = np.empty(0, dtype=np.int16)
+        self.maxs = np.empty(0, dtype=np.int16)
+        self.sumsq = np.empty(0, dtype=np.float64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self._pending = np.empty(0, dtype=np.int16)
+
+    def feed(self, samples):
+        np = self.np
+        if self._pending.size:
+            samples = np.concatenate((self._pending, samples))
+        full = samples.size // self.bin_size * self.bin_size
+        self._pending = samples[full:].copy()
+        if full:
+            self._append(samples[:full].reshape(-1, self.bin_size))
+
+    def _append(self, blocks):
+        np = self.np
+        wide = blocks.astype(np.float64)
+        self.mins = np.concatenate((self.mins, blocks.min(axis=1)))
+        self.maxs = np.concatenate((self.maxs, blocks.max(axis=1)))
+        self.sumsq = np.concatenate((self.sumsq, np.einsum('ij,ij->i', wide, wide)))
+        self.counts = np.concatenate((self.counts, np.full(len(blocks), blocks.shape[1])))
+        while len(self.mins) > 2 * self.columns:
+            self._halve()
+
+    def _halve(self):
+        """相邻 bin 两两合并"""
+        n = len(self.mins) // 2 * 2
+        rest = slice(n, None)
+        self.mins = _join(self.np, self.mins[:n].reshape(-1, 2).min(axis=1), self.mins[rest])
+        self.maxs = _join(self.np, self.maxs[:n].reshape(-1, 2).max(axis=1), self.maxs[rest])
+        self.sumsq = _join(self.np, self.sumsq[:n].reshape(-1, 2).sum(axis=1), self.sumsq[rest])
+        self.counts = _join(self.np, self.counts[:n].reshape(-1, 2).sum(axis=1), self.counts[rest])
+        self.bin_size *= 2
+
+    def finish(self) -> dict:
+        """输出恰好 columns 列的包络，数值归一化到 0~127 / -127~127"""
+        np = self.np
+        if self._pending.size:
+            self._append(self._pending.reshape(1, -1))
+            self._pending = self._pending[:0]
+        if not len(self.mins):
+            return {'columns': 0, 'min': [], 'max': [], 'rms': []}
+
+        groups = np.array_split(np.arange(len(self.mins)), min(self.columns, len(self.mins)))
+        starts = np.array([g[0] for g in groups])
+        mins = np.minimum.reduceat(self.mins, starts)
+        maxs = np.maximum.reduceat(self.maxs, starts)
+        rms = np.sqrt(np.add.reduceat(self.sumsq, starts) / np.add.reduceat(self.counts, starts))
+
+        scale = 127 / 32768
+        return {
+            'columns': len(starts),
+            'min': np.round(mins * scale).astype(int).tolist(),
+            'max': np.round(maxs * scale).astype(int).tolist(),
+            'rms': np.round(rms * scale).astype(int).tolist(),
+        }
+
+
+def _join(np, head, tail):
+    return np.concatenate((head, tail)) if tail.size else head
+
+
+def extract(source_path: str, duration: float | None = None,
+            columns: int | None = None) -> dict:
+    """解码音频并计算波形包络
+
+    通过管道从 ffmpeg 读取 s16le PCM，边读边归并，内存占用与音频时长无关。
+
+    Args:
+        source_path: 音频文件路径
+        duration: 已知时长（秒），用于预估 bin 大小以减少合并次数
+        columns: 输出列数，默认 config.WAVEFORM_COLUMNS
+
+    Returns:
+        {'columns': N, 'min': [...], 'max': [...], 'rms': [...]}
+    """
+    import numpy as np
+
+    columns = columns or config.WAVEFORM_COLUMNS
+    bin_size = int(duration * SAMPLE_RATE / columns) if duration else SAMPLE_RATE // 100
+    envelope = _Envelope(columns, bin_size)
+
+    proc = subprocess.Popen(
+        ['ffmpeg', '-v', 'error', '-i', source_path, '-vn', '-ac', '1',
+         '-ar', str(SAMPLE_RATE), '-f', 's16le', 'pipe:1'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + config.WAVEFORM_TIMEOUT
+    leftover = b''
+    try:
+        while True:
+            data = proc.stdout.read(READ_BYTES)
+            if not data:
+                break
+            if time.monotonic() > deadline:
+                raise TimeoutError('音频解码超时')
+            data = leftover + data
+            even = len(data) // 2 * 2
+            leftover = data[even:]
+            envelope.feed(np.frombuffer(data[:even], dtype='<i2'))
+        if proc.wait(timeout=5) != 0:
+            raise RuntimeError(f'ffmpeg 解码失败 (exit {proc.returncode})')
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.stdout.close()
+    return envelope.finish()
+
+
+def render(waveform: dict, dest: str):
+    """将波形包络渲染为缩略图（峰值为浅色，RMS 为亮色）"""
+    from PIL import Image, ImageDraw
+
+    width, height = config.THUMBNAIL_SIZE
+    img = Image.new('RGB', (width, height), color='#1a1a2e')
+    draw = ImageDraw.Draw(img)
+    mid = height / 2
+    amp = height * 0.42 / 127
+
+    n = waveform['columns']
+    for i in range(n):
+        x0 = int(i * width / n)
+        x1 = max(x0, int((i + 1) * width / n) - 1)
+        top, bottom = mid - waveform['max'][i] * amp, mid - waveform['min'][i] * amp
+        draw.rectangle((x0, top, x1, max(top + 1, bottom)), fill='#5b4b9a')
+        r = waveform['rms'][i] * amp
+        draw.rectangle((x0, mid - r, x1, mid + max(r, 0.5)), fill='#a78bfa')
+
+    img.save(dest, 'JPEG', quality=85)
@@ -90,6 +90,51 @@ const api = {
             xhr.send(formData);
         });
     },
+
+    /**
+     * 分片上传（断点续传）
+     * 会话 ID 按文件名/大小/修改时间记录在 localStorage，
+     * 中断后再次上传同一文件时从服务端已接收的 offset 继续。
+     */
+    async uploadChunked(file, onProgress) {
+        const resumeKey = `upload:${file.name}:${file.size}:${file.lastModified}`;
+        let session = null;
+
+        const savedId = localStorage.getItem(resumeKey);
+        if (savedId) {
+            const res = await fetch(`/api/assets/uploads/${savedId}`);
+            if (res.ok) session = await res.json();
+        }
+        if (!session) {
+            session = await this.post('/api/assets/uploads', { filename: file.name, size: file.size });
+            localStorage.setItem(resumeKey, session.upload_id);
+        }
+
+        let offset = session.offset;
+        while (offset < file.size) {
+            const chunk = file.slice(offset, offset + session.chunk_size);
+            const res = await fetch(`/api/assets/uploads/${session.upload_id}`, {
+                method: 'PATCH',
+                headers: {
+                    'Content-Type': 'application/offset+octet-stream',
+                    'Upload-Offset': String(offset),
+                },
+                body: chunk,
+            });
+            const data = await res.json().catch(() => ({}));
+            if (res.status === 409 && typeof data.offset === 'number') {
+                offset = data.offset;  // 服务端进度不同，按其 offset 重新对齐
+                continue;
+            }
+            if (!res.ok) throw new Error(data.error || `上传失败: ${res.status}`);
+            offset = data.offset;
+            if (onProgress) onProgress(offset / file.size);
+        }
+
+        const result = await this.post(`/api/assets/uploads/${session.upload_id}/complete`, {});
+        localStorage.removeItem(resumeKey);
+        return result;
+    },
 };
 
 /**
@@ -25,6 +25,21 @@ document.addEventListener('DOMContentLoaded', () => {
     let currentTag = '';
     let selectedAssetId = null;
 
+    // 超过此大小的文件使用分片上传
+    const CHUNKED_UPLOAD_THRESHOLD = 16 * 1024 * 1024;
+
+    // 分页状态：按需加载，滚动到底部时拉取下一页
+    const PAGE_SIZE = 60;
+    const GRID_FIELDS = 'id,name,original_name,type,thumbnail_path,thumbnail_status';
+    let nextCursor = null;
+    let loadingPage = false;
+    let loadToken = 0;
+    const sentinel = document.createElement('div');
+    sentinel.className = 'assets-sentinel';
+    const pageObserver = new IntersectionObserver((entries) => {
+        if (entries.some(e => e.isIntersecting)) loadMoreAssets();
+    }, { rootMargin: '400px' });
+
     // ── 初始加载 ─────────────────────────────────────
     loadAssets();
     loadTags();
@@ -66,10 +81,16 @@ document.addEventListener('DOMContentLoaded', () => {
         for (const file of files) {
             try {
                 progressText.textContent = `上传中: ${file.name} (${uploaded + 1}/${files.length})`;
-                await api.upload('/api/assets/upload', file, (progress) => {
+                const onProgress = (progress) => {
                     const total = ((uploaded + progress) / files.length) * 100;
                     progressFill.style.width = `${total}%`;
-                });
+                };
+                // 大文件走分片上传，支持断点续传
+                if (file.size > CHUNKED_UPLOAD_THRESHOLD) {
+                    await api.uploadChunked(file, onProgress);
+                } else {
+                    await api.upload('/api/assets/upload', file, onProgress);
+                }
                 uploaded++;
             } catch (err) {
                 Toast.error(`上传失败: ${file.name} - ${err.message}`);
@@ -88,22 +109,53 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     // ── 素材列表加载 ─────────────────────────────────
+    async function fetchAssetsPage(cursor) {
+        const params = new URLSearchParams();
+        if (currentSearch) params.set('q', currentSearch);
+        if (currentFilter) params.set('type', currentFilter);
+        if (currentTag) params.set('tag', currentTag);
+        params.set('limit', PAGE_SIZE);
+        params.set('fields', GRID_FIELDS);
+        if (cursor) params.set('cursor', cursor);
+        return api.get(`/api/assets?${params.toString()}`);
+    }
+
+    // 重新加载第一页（搜索/过滤条件变化时）
     async function loadAssets() {
+        const token = ++loadToken;
+        pageObserver.unobserve(sentinel);
+        loadingPage = true;
         try {
-            const params = new URLSearchParams();
-            if (currentSearch) params.set('q', currentSearch);
-            if (currentFilter) params.set('type', currentFilter);
-            if (currentTag) params.set('tag', currentTag);
+            const data = await fetchAssetsPage(null);
+            if (token !== loadToken) return;
+            nextCursor = data.next_cursor;
+            renderAssets(data.assets, false);
+        } catch (err) {
+            Toast.error(`加载素材失败: ${err.message}`);
+        } finally {
+            if (token === loadToken) loadingPage = false;
+        }
+    }
 
-            const data = await api.get(`/api/assets?${params.toString()}`);
-            renderAssets(data.assets);
+    // 追加下一页
+    async function loadMoreAssets() {
+        if (loadingPage || !nextCursor) return;
+        const token = loadToken;
+        loadingPage = true;
+        try {
+            const data = await fetchAssetsPage(nextCursor);
+            if (token !== loadToken) return;
+            nextCursor = data.next_cursor;
+            renderAssets(data.assets, true);
         } catch (err) {
             Toast.error(`加载素材失败: ${err.message}`);
+        } finally {
+            if (token === loadToken) loadingPage = false;
         }
     }
 
-    function renderAssets(assets) {
-        if (assets.length === 0) {
+    function renderAssets(assets, append) {
+        if (!append && assets.length === 0) {
             assetsGrid.innerHTML = '';
             assetsGrid.appendChild(assetsEmpty);
             assetsEmpty.style.display = 'block';
@@ -115,10 +167,9 @@ document.addEventListener('DOMContentLoaded', () => {
         const typeIcons = { image: '🖼️', video: '🎬', audio: '🎵' };
         const typeLabels = { image: '图片', video: '视频', audio: '音频' };
 
-        assetsGrid.innerHTML = assets.map(a => `
+        const html = assets.map(a => `
             <div class="asset-card" data-id="${a.id}">
-                <img class="asset-thumb" src="/data/thumbnails/${a.thumbnail_path}" alt="${a.name}"
-                     onerror="this.style.display='none'">
+                ${thumbHtml(a)}
                 <div class="asset-info">
                     <div class="asset-name" title="${a.original_name}">${a.name}</div>
                     <span class="asset-type-badge">${typeIcons[a.type] || ''} ${typeLabels[a.type] || a.type}</span>
@@ -126,14 +177,68 @@ document.addEventListener('DOMContentLoaded', () => {
             </div>
         `).join('');
 
-        // 点击打开侧边栏
-        assetsGrid.querySelectorAll('.asset-card').forEach(card => {
-            card.addEventListener('click', () => {
-                openSidebar(card.dataset.id);
+        if (append) {
+            sentinel.insertAdjacentHTML('beforebegin', html);
+        } else {
+            assetsGrid.innerHTML = html;
+            assetsGrid.appendChild(sentinel);
+        }
+
+        watchPendingThumbnails();
+
+        // 哨兵元素进入视口时加载下一页（重新 observe 以便仍在视口内时立即触发）
+        pageObserver.unobserve(sentinel);
+        if (nextCursor) pageObserver.observe(sentinel);
+    }
+
+    // ── 缩略图后台生成状态轮询 ─────────────────────
+    function thumbHtml(a) {
+        if (a.thumbnail_status === 'pending') {
+            return `<div class="asset-thumb thumb-pending" data-thumb="${a.thumbnail_path}">⏳</div>`;
+        }
+        // 按需衍生图：1x / 2x 两档宽度，格式由服务端按 Accept 选择 AVIF / WebP
+        const src = `/data/thumbnails/${a.thumbnail_path}`;
+        return `<img class="asset-thumb" src="${src}?w=256" srcset="${src}?w=256 1x, ${src}?w=512 2x"
+                     alt="${a.name}" loading="lazy" onerror="this.style.display='none'">`;
+    }
+
+    let thumbPollTimer = null;
+
+    function watchPendingThumbnails() {
+        if (thumbPollTimer) return;
+        if (!assetsGrid.querySelector('.thumb-pending')) return;
+        thumbPollTimer = setTimeout(pollThumbnails, 1500);
+    }
+
+    async function pollThumbnails() {
+        thumbPollTimer = null;
+        const pending = Array.from(assetsGrid.querySelectorAll('.thumb-pending'));
+        if (pending.length === 0) return;
+
+        const ids = pending.map(el => el.closest('.asset-card').dataset.id);
+        try {
+            const data = await api.get(`/api/assets/thumbnail-status?ids=${ids.join(',')}`);
+            pending.forEach(el => {
+                const card = el.closest('.asset-card');
+                const info = data.thumbnails[card.dataset.id];
+                if (!info || info.thumbnail_status === 'pending') return;
+                el.outerHTML = thumbHtml({
+                    ...info,
+                    name: card.querySelector('.asset-name').textContent,
+                });
             });
-        });
+        } catch (err) {
+            // 静默失败，下次继续轮询
+        }
+        watchPendingThumbnails();
     }
 
+    // 点击打开侧边栏（事件委托，分页追加的卡片同样生效）
+    assetsGrid.addEventListener('click', (e) => {
+        const card = e.target.closest('.asset-card');
+        if (card) openSidebar(card.dataset.id);
+    });
+
     // ── 搜索 ─────────────────────────────────────────
     let searchTimeout;
     searchInput.addEventListener('input', () => {
@@ -192,6 +297,23 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     // ── 侧边栏 ──────────────────────────────────────
+    // 音频波形（入库时计算的 min/max/rms 包络，数值范围 -127~127）
+    function waveformSvg(wave) {
+        if (!wave || !wave.columns) return '';
+        const n = wave.columns;
+        let peaks = '';
+        let rms = '';
+        for (let i = 0; i < n; i++) {
+            const top = 128 - wave.max[i];
+            const bottom = 128 - wave.min[i];
+            peaks += `<rect x="${i}" y="${top}" width="0.8" height="${Math.max(1, bottom - top)}"/>`;
+            const r = wave.rms[i];
+            rms += `<rect x="${i}" y="${128 - r}" width="0.8" height="${Math.max(1, 2 * r)}"/>`;
+        }
+        return `<svg class="waveform" viewBox="0 0 ${n} 256" preserveAspectRatio="none">
+            <g fill="#5b4b9a">${peaks}</g><g fill="#a78bfa">${rms}</g></svg>`;
+    }
+
     async function openSidebar(assetId) {
         try {
             const asset = await api.get(`/api/assets/${assetId}`);
@@ -202,13 +324,18 @@ document.addEventListener('DOMContentLoaded', () => {
             // 预览
             const previewEl = document.getElementById('sidebar-preview');
             if (asset.type === 'image') {
-                previewEl.innerHTML = `<img src="/data/assets/${asset.path}" alt="${asset.name}">`;
+                // 预览区使用 768 宽衍生图，避免加载原图
+                const src = asset.thumbnail_status === 'ready'
+                    ? `/data/thumbnails/${asset.thumbnail_path}?w=768`
+                    : `/data/assets/${asset.path}`;
+                previewEl.innerHTML = `<img src="${src}" alt="${asset.name}">`;
             } else if (asset.type === 'video') {
                 previewEl.innerHTML = `<video src="/data/assets/${asset.path}" controls></video>`;
             } else if (asset.type === 'audio') {
+                const wave = waveformSvg(asset.waveform);
                 previewEl.innerHTML = `
                     <div style="padding:30px;text-align:center;">
-                        <div style="font-size:3rem;margin-bottom:10px;">🎵</div>
+                        ${wave || '<div style="font-size:3rem;margin-bottom:10px;">🎵</div>'}
                         <audio src="/data/assets/${asset.path}" controls style="width:100%;"></audio>
                     </div>
                 `;
@@ -221,8 +348,20 @@ document.addEventListener('DOMContentLoaded', () => {
             document.getElementById('info-size').textContent = utils.formatBytes(asset.file_size);
             document.getElementById('info-date').textContent = utils.formatDate(asset.created_at);
 
+            // 媒体信息（入库时 ffprobe 探测）
+            const media = asset.media || {};
+            const mediaParts = [];
+            if (media.width && media.height) mediaParts.push(`${media.width}×${media.height}`);
+            if (media.duration) mediaParts.push(`${media.duration.toFixed(1)}秒`);
+            if (media.fps) mediaParts.push(`${media.fps}fps`);
+            if (media.video_codec) mediaParts.push(media.video_codec);
+            if (media.audio_codec) mediaParts.push(`${media.audio_codec} ${media.audio_channels || ''}ch`);
+            document.getElementById('info-media').textContent = mediaParts.join(' · ');
+            document.getElementById('info-media-row').style.display = mediaParts.length ? '' : 'none';
+
             // 标签
             renderSidebarTags(asset.tags || []);
+            loadSimilar(asset);
 
             sidebar.style.display = 'block';
         } catch (err) {
@@ -230,6 +369,29 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // 近似重复素材（感知哈希）
+    async function loadSimilar(asset) {
+        const section = document.getElementById('sidebar-similar-section');
+        section.style.display = 'none';
+        if (!asset.phash || !asset.phash.length) return;
+        try {
+            const data = await api.get(`/api/assets/${asset.id}/similar?limit=12`);
+            if (selectedAssetId !== asset.id || !data.assets.length) return;
+            const list = document.getElementById('sidebar-similar');
+            list.innerHTML = data.assets.map(a => `
+                <div class="similar-item" data-id="${a.id}" title="${a.name}（距离 ${a.distance}）">
+                    <img src="/data/thumbnails/${a.thumbnail_path}?w=256" alt="${a.name}" loading="lazy">
+                </div>
+            `).join('');
+            list.querySelectorAll('.similar-item').forEach(item => {
+                item.addEventListener('click', () => openSidebar(item.dataset.id));
+            });
+            section.style.display = '';
+        } catch (err) {
+            // 相似素材仅作参考，失败时不提示
+        }
+    }
+
     function renderSidebarTags(tags) {
         const tagsList = document.getElementById('sidebar-tags');
         tagsList.innerHTML = tags.map(t =>
@@ -327,6 +489,48 @@ document.addEventListener('DOMContentLoaded', () => {
         aiImageRatio = chip.dataset.value;
     });
 
+    // 生成数量
+    let aiImageVariants = 1;
+    document.getElementById('ai-image-variants').addEventListener('click', (e) => {
+        const chip = e.target.closest('.chip');
+        if (!chip) return;
+        document.querySelectorAll('#ai-image-variants .chip').forEach(c => c.classList.remove('active'));
+        chip.classList.add('active');
+        aiImageVariants = parseInt(chip.dataset.value, 10);
+    });
+
+    // 等待后台任务结束：优先使用 SSE，不支持时退回轮询
+    function waitForJob(job, onProgress) {
+        return new Promise((resolve) => {
+            if (window.EventSource) {
+                const source = new EventSource(`/api/jobs/${job.id}/events`);
+                source.addEventListener('progress', (e) => {
+                    const data = JSON.parse(e.data);
+                    onProgress(data);
+                    if (['succeeded', 'partial', 'failed'].includes(data.status)) {
+                        source.close();
+                        resolve(data);
+                    }
+                });
+                source.onerror = () => {
+                    source.close();
+                    pollJob(job.id, onProgress).then(resolve);
+                };
+            } else {
+                pollJob(job.id, onProgress).then(resolve);
+            }
+        });
+    }
+
+    async function pollJob(jobId, onProgress) {
+        while (true) {
+            const data = await api.get(`/api/jobs/${jobId}`);
+            onProgress(data);
+            if (['succeeded', 'partial', 'failed'].includes(data.status)) return data;
+            await new Promise(r => setTimeout(r, 1500));
+        }
+    }
+
     document.getElementById('btn-confirm-ai-image').addEventListener('click', async () => {
         const prompt = aiImagePrompt.value.trim();
         if (!prompt) {
@@ -334,22 +538,34 @@ document.addEventListener('DOMContentLoaded', () => {
             return;
         }
 
-        aiImageBtnText.textContent = '⏳ AI 生成中...';
+        aiImageBtnText.textContent = '⏳ 提交中...';
         document.getElementById('btn-confirm-ai-image').disabled = true;
 
         try {
-            const result = await api.post('/api/ai/generate-image', {
+            const { job } = await api.post('/api/ai/generate-image', {
                 prompt,
                 aspect_ratio: aiImageRatio,
+                variants: aiImageVariants,
             });
 
+            // 任务在后台执行，关闭对话框后继续浏览，完成时刷新列表
             aiImageModal.style.display = 'none';
-            Toast.success('🎨 AI 素材图片生成成功');
+            aiImageBtnText.textContent = '🎨 生成';
+            document.getElementById('btn-confirm-ai-image').disabled = false;
+            Toast.info(`🎨 已开始生成 ${job.total} 张图片`);
+            const result = await waitForJob(job, (data) => {
+                if (data.completed && data.completed < data.total) loadAssets();
+            });
+
+            if (result.status === 'failed') {
+                Toast.error(`AI 图片生成失败: ${result.errors[0] || '未知错误'}`);
+            } else {
+                Toast.success(`🎨 AI 素材图片生成成功 (${result.completed}/${result.total})`);
+            }
             loadAssets();
             loadTags();
         } catch (err) {
             Toast.error(`AI 图片生成失败: ${err.message}`);
-        } finally {
             aiImageBtnText.textContent = '🎨 生成';
             document.getElementById('btn-confirm-ai-image').disabled = false;
         }
@@ -197,6 +197,29 @@ document.addEventListener('DOMContentLoaded', () => {
         });
 
         preview.json.textContent = JSON.stringify(apiPayload, null, 2);
+
+        scheduleRefCheck();
+    }
+
+    // ── 引用素材校验（时长 / 比例） ──────────────────
+    const refWarnings = document.getElementById('ref-warnings');
+    let refCheckTimeout;
+
+    function scheduleRefCheck() {
+        clearTimeout(refCheckTimeout);
+        if (state.ref_assets.length === 0) {
+            refWarnings.style.display = 'none';
+            return;
+        }
+        refCheckTimeout = setTimeout(async () => {
+            try {
+                const data = await api.post('/api/prompts/validate', state);
+                refWarnings.innerHTML = data.warnings.map(w => `<div>⚠️ ${w}</div>`).join('');
+                refWarnings.style.display = data.warnings.length ? 'block' : 'none';
+            } catch (err) {
+                // 静默失败
+            }
+        }, 400);
     }
 
     // ── 保存项目 ─────────────────────────────────────
@@ -258,7 +281,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     async function loadProjectsList() {
         try {
-            const data = await api.get('/api/prompts');
+            const data = await api.get('/api/prompts?fields=id,name,task_type,updated_at');
             if (data.projects.length === 0) {
                 projectsList.innerHTML = '<div style="color:var(--text-muted);font-size:0.85rem;padding:8px;">暂无保存的项目</div>';
                 return;
@@ -367,6 +390,20 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
+    // 提交到 Seedance 生成队列（需先保存项目，队列按已保存的内容生成）
+    document.getElementById('btn-submit-video').addEventListener('click', async () => {
+        if (!state.currentProjectId) {
+            Toast.error('请先保存项目');
+            return;
+        }
+        try {
+            await api.post('/api/video-tasks', { project_ids: [state.currentProjectId] });
+            Toast.success('已加入视频生成队列，完成后自动导入素材库');
+        } catch (err) {
+            Toast.error(`提交失败: ${err.message}`);
+        }
+    });
+
     // ── 初始化预览 ───────────────────────────────────
     updatePreview();
 
@@ -374,6 +411,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const aiModal = document.getElementById('ai-prompt-modal');
     const aiInput = document.getElementById('ai-idea-input');
     const aiBtnText = document.getElementById('ai-prompt-btn-text');
+    let lastAiIdea = '';
 
     document.getElementById('btn-ai-prompt').addEventListener('click', () => {
         aiModal.style.display = 'flex';
@@ -400,7 +438,10 @@ document.addEventListener('DOMContentLoaded', () => {
         document.getElementById('btn-confirm-ai-prompt').disabled = true;
 
         try {
-            const result = await api.post('/api/ai/generate-prompt', { idea });
+            // 对同一创意再次点击生成时跳过服务端缓存，得到新的结果
+            const fresh = idea === lastAiIdea;
+            const result = await api.post('/api/ai/generate-prompt', { idea, fresh });
+            lastAiIdea = idea;
 
             // 填充五要素
             ['subject', 'scene', 'action', 'camera', 'atmosphere'].forEach(key => {
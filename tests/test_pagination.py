@@ -0,0 +1,35 @@
+"""游标分页 — 格式正确但与排序键不匹配的游标应报 CursorError（接口返回 400）"""
+
+import pytest
+
+from utils.pagination import CursorError, decode_cursor, encode_cursor, paginate
+
+ITEMS = [((-float(i), f'id{i}'), i) for i in range(5)]
+KEY_TYPES = (float, str)
+
+
+def test_round_trip():
+    page, cursor = paginate(ITEMS, limit=2, key_types=KEY_TYPES)
+    assert page == [4, 3]
+    page, cursor = paginate(ITEMS, limit=2, cursor=cursor, key_types=KEY_TYPES)
+    assert page == [2, 1]
+
+
+def test_integer_accepted_for_float():
+    assert decode_cursor(encode_cursor([3, 'id3']), KEY_TYPES) == [3, 'id3']
+
+
+@pytest.mark.parametrize('key', [['a'], ['a', 'b'], [1.0, 2], [True, 'x'], [1.0, 'x', 'y'], []])
+def test_wrong_shape_or_type(key):
+    cursor = encode_cursor(key)
+    with pytest.raises(CursorError):
+        decode_cursor(cursor, KEY_TYPES)
+    with pytest.raises(CursorError):
+        paginate(ITEMS, limit=2, cursor=cursor, key_types=KEY_TYPES)
+
+
+def test_type_error_without_key_types():
+    """未声明 key_types 时，比较失败同样转换为 CursorError"""
+    assert encode_cursor(['a']) == 'WyJhIl0'
+    with pytest.raises(CursorError):
+        paginate(ITEMS, limit=2, cursor='WyJhIl0')
@@ -0,0 +1,63 @@
+"""视频任务调度 — 不经 __main__ 创建应用（gunicorn / waitress 等）时也应恢复未完成的任务"""
+
+import subprocess
+import sys
+import textwrap
+
+from conftest import ROOT
+
+SCRIPT = textwrap.dedent('''
+    import sys, time
+    from benchmarks.common import use_temp_data_dir
+    import config
+
+    use_temp_data_dir(sys.argv[1])
+    config.THUMBNAIL_WORKERS = 0
+    config.SEEDANCE_TICK = 0.1
+    config.SEEDANCE_POLL_MIN = 0.1
+    config.SEEDANCE_POLL_MAX = 0.5
+
+    from benchmarks.stub_seedance import serve
+    from models.video_task import VideoTask, VideoTaskStore
+
+    server = serve(gen_time=0.2, queue_time=0.1, video_size=1024)
+    config.SEEDANCE_API_BASE = f'http://127.0.0.1:{server.server_port}/api/v3'
+    config.SEEDANCE_API_KEY = 'stub'
+
+    # 上次进程退出时留下的任务：一个仍在排队，一个提交到一半
+    store = VideoTaskStore(config.VIDEO_TASK_DB_FILE)
+    tasks = []
+    for status in (VideoTask.QUEUED, VideoTask.SUBMITTING):
+        task = VideoTask()
+        task.name = status
+        task.model = 'stub-model'
+        task.payload = {'model': 'stub-model', 'content': [{'type': 'text', 'text': status}]}
+        task.status = status
+        tasks.append(task)
+    store.add_many(tasks)
+
+    from app import app
+    from services import video_queue
+
+    assert video_queue._queue is None
+    assert app.test_client().get('/metrics').status_code == 200
+
+    # 经独立的 store 读取状态，不调用 get_queue()，调度只能由应用自身启动
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        statuses = {t.status for t in store.all()}
+        if statuses == {VideoTask.SUCCEEDED}:
+            break
+        time.sleep(0.1)
+    print(sorted(statuses))
+    assert statuses == {VideoTask.SUCCEEDED}
+    store.close()
+    video_queue.shutdown()
+    server.shutdown()
+''')
+
+
+def test_pending_tasks_resume_without_main(tmp_path):
+    result = subprocess.run([sys.executable, '-c', SCRIPT, str(tmp_path)], cwd=ROOT,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stdout + result.stderr
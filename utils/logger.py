@@ -1,43 +1,134 @@
-"""Seedance Studio — 日志管理核心"""
+"""Seedance Studio — 日志管理核心
 
+日志记录经 QueueHandler 放入队列，由后台 QueueListener 线程写入控制台与文件；
+请求线程只承担消息格式化与一次入队，不再等待 stdout 刷新与日志切割。
+进程退出时（atexit）停止监听线程并写完队列中剩余的记录。
+"""
+
+import atexit
+import itertools
+import json
 import logging
+import multiprocessing
 import os
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 import config
+from utils import metrics
 
-def setup_logger(name: str = 'SeedanceStudio'):
+
+class JsonFormatter(logging.Formatter):
+    """结构化日志：每条记录一行 JSON，便于日志系统采集检索"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).astimezone().isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        if record.stack_info:
+            entry['stack_info'] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """按模块抽样输出高频日志：{模块名: N} 表示该模块 INFO 及以下每 N 条只保留 1 条
+
+    WARNING 及以上级别不抽样。
     """
-    配置并返回一个日志器实例。
-    支持：控制台彩色输出、文件持久化、分级记录。
+
+    def __init__(self, every: dict[str, int]):
+        super().__init__()
+        self._counters = {module: (n, itertools.count()) for module, n in every.items() if n > 1}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        sampler = self._counters.get(record.module)
+        if sampler is None or record.levelno >= logging.WARNING:
+            return True
+        n, counter = sampler
+        return next(counter) % n == 0  # itertools.count 的 next() 在 GIL 下是原子的
+
+
+class _AsyncHandler(QueueHandler):
+    """入队处理器
+
+    队列满时丢弃 INFO 及以下的记录（计入 log_records_dropped_total），WARNING 及以上阻塞等待，保证不丢失。
+    fork 出的子进程（如缩略图进程池）中没有监听线程，监听已停止（退出阶段）时同样如此，
+    此时改为在调用线程直接写出。
     """
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
 
-    # 如果已经有 handler，不再添加（防止重复输出）
-    if logger.handlers:
-        return logger
+    def __init__(self, listener: QueueListener):
+        super().__init__(listener.queue)
+        self._listener = listener
+        self._pid = os.getpid()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 在调用线程中合并参数并渲染异常堆栈（参数对象可能随后被修改），
+        # 但保留 exc_text 而非像默认实现那样并入消息正文，JSON 格式仍可单独输出
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if _listener is None or os.getpid() != self._pid:
+            self._listener.handle(record)
+        elif record.levelno >= logging.WARNING:
+            self.queue.put(record)
+        else:
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                _DROPPED.inc()
+
+
+_exc_formatter = logging.Formatter()
+_DROPPED = metrics.counter('log_records_dropped_total', '日志队列已满而丢弃的记录数')
+_listener: QueueListener | None = None
+_listener_lock = threading.Lock()
 
+
+def _build_handlers() -> list[logging.Handler]:
+    """创建实际写出日志的控制台与文件 Handler"""
     # 1. 确保日志目录存在
     os.makedirs(config.LOGS_DIR, exist_ok=True)
 
     # 2. 格式化定义
-    # 控制台格式 (简短、清晰)
-    console_formatter = logging.Formatter(
-        '%(asctime)s [%(levelname)s] %(name)s: %(message)s',
-        datefmt='%H:%M:%S'
-    )
-    # 文件格式 (详细、包含完整日期)
-    file_formatter = logging.Formatter(
-        '[%(asctime)s] [%(levelname)s] [%(name)s] [%(filename)s:%(lineno)d]: %(message)s'
-    )
+    if config.LOG_FORMAT == 'json':
+        console_formatter = file_formatter = JsonFormatter()
+    else:
+        # 控制台格式 (简短、清晰)
+        console_formatter = logging.Formatter(
+            '%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+            datefmt='%H:%M:%S'
+        )
+        # 文件格式 (详细、包含完整日期)
+        file_formatter = logging.Formatter(
+            '[%(asctime)s] [%(levelname)s] [%(name)s] [%(filename)s:%(lineno)d]: %(message)s'
+        )
 
     # 3. 控制台 Handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(console_formatter)
-    console_handler.setLevel(logging.INFO)
-    logger.addHandler(console_handler)
+    console_handler.setLevel(config.LOG_LEVEL)
 
     # 4. 文件 Handler (支持按大小切割，保留 5 个历史版本)
     file_handler = RotatingFileHandler(
@@ -47,10 +138,56 @@ def setup_logger(name: str = 'SeedanceStudio'):
         encoding='utf-8'
     )
     file_handler.setFormatter(file_formatter)
-    file_handler.setLevel(logging.INFO)
-    logger.addHandler(file_handler)
+    file_handler.setLevel(config.LOG_LEVEL)
+    return [console_handler, file_handler]
+
+
+def setup_logger(name: str = 'SeedanceStudio'):
+    """
+    配置并返回一个日志器实例。
+    支持：控制台彩色输出、文件持久化、分级记录、JSON 格式、按模块抽样、后台线程写出。
+    """
+    global _listener
+    logger = logging.getLogger(name)
+    logger.setLevel(config.LOG_LEVEL)
 
+    # 如果已经有 handler，不再添加（防止重复输出）
+    if logger.handlers:
+        return logger
+
+    if multiprocessing.parent_process() is not None:
+        # spawn 方式启动的子进程退出时不执行 atexit，队列中的记录会丢失，直接同步写出
+        handlers = _build_handlers()
+    else:
+        with _listener_lock:
+            if _listener is None:
+                _listener = QueueListener(queue.Queue(maxsize=config.LOG_QUEUE_SIZE),
+                                          *_build_handlers(), respect_handler_level=True)
+                _listener.start()
+                atexit.register(shutdown)
+            handlers = [_AsyncHandler(_listener)]
+
+    for handler in handlers:
+        if config.LOG_SAMPLE_EVERY:
+            handler.addFilter(SamplingFilter(config.LOG_SAMPLE_EVERY))
+        logger.addHandler(handler)
     return logger
 
+
+def shutdown():
+    """停止后台写出线程，写完队列中剩余的日志（进程退出时自动调用）
+
+    此后的日志在调用线程直接写出；Handler 由 logging 模块自身的退出钩子关闭。
+    """
+    global _listener
+    with _listener_lock:
+        listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()  # 投递哨兵并等待线程处理完此前的全部记录
+    for handler in listener.handlers:
+        handler.flush()
+
+
 # 预创建默认日志器
 logger = setup_logger()
@@ -0,0 +1,96 @@
+"""列表接口通用工具 — 游标分页与字段投影"""
+
+import base64
+import heapq
+import json
+
+
+class CursorError(ValueError):
+    """游标无法解析"""
+
+
+def encode_cursor(key) -> str:
+    """将排序键编码为不透明游标字符串"""
+    raw = json.dumps(key, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _matches(value, expected: type) -> bool:
+    """JSON 不区分整数与浮点数：float 位置也接受 int（bool 除外）"""
+    if isinstance(value, bool):
+        return False
+    if expected is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, expected)
+
+
+def decode_cursor(cursor: str, key_types: tuple[type, ...] | None = None) -> list:
+    """解析游标为排序键（列表形式）
+
+    指定 key_types 时校验长度与每个元素的类型，与接口的排序键不一致时抛出 CursorError，
+    避免比较时因类型不同抛出 TypeError。
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise CursorError(f'无效的游标: {cursor}') from e
+    if not isinstance(key, list):
+        raise CursorError(f'无效的游标: {cursor}')
+    if key_types is not None and (
+            len(key) != len(key_types) or not all(map(_matches, key, key_types))):
+        raise CursorError(f'无效的游标: {cursor}')
+    return key
+
+
+def paginate(keyed_items, limit: int | None = None, cursor: str | None = None,
+             key_types: tuple[type, ...] | None = None):
+    """按排序键升序分页
+
+    Args:
+        keyed_items: 可迭代的 (排序键, 元素)，排序键必须全局唯一
+        limit: 每页条数，None 表示不分页
+        cursor: 上一页返回的 next_cursor
+        key_types: 排序键各元素的类型（数字统一写 float），用于校验游标
+
+    Returns:
+        (当前页元素列表, 下一页游标或 None)
+    """
+    if cursor:
+        after = decode_cursor(cursor, key_types)
+
+        def after_cursor(items):
+            try:
+                for k, item in items:
+                    if list(k) > after:
+                        yield k, item
+            except TypeError as e:
+                raise CursorError(f'无效的游标: {cursor}') from e
+        keyed_items = after_cursor(keyed_items)
+
+    if limit is None:
+        page = sorted(keyed_items, key=lambda x: x[0])
+        return [item for _, item in page], None
+
+    # 多取一条用于判断是否还有下一页；nsmallest 避免对全集排序
+    page = heapq.nsmallest(limit + 1, keyed_items, key=lambda x: x[0])
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor(list(page[-1][0]))
+    return [item for _, item in page], next_cursor
+
+
+def parse_fields(value: str | None) -> list[str] | None:
+    """解析 fields=a,b,c 查询参数，空值表示返回全部字段"""
+    if not value:
+        return None
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    return fields or None
+
+
+def project(data: dict, fields: list[str] | None) -> dict:
+    """字段投影"""
+    if not fields:
+        return data
+    return {f: data[f] for f in fields if f in data}
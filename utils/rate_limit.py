@@ -0,0 +1,44 @@
+"""客户端限流 — 线程安全的令牌桶，支持收到 429 后全局退避"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """令牌桶限流器
+
+    以 rate 个/秒的速度补充令牌，最多积攒 burst 个；acquire() 在没有令牌时阻塞。
+    rate ≤ 0 表示不限速，acquire() 只受 backoff() 约束。
+    backoff() 让所有调用方在指定时间内暂停，用于服务端返回 429 时整体降速。
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取得一个令牌（必要时等待）"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self.rate <= 0:
+                    if now >= self._blocked_until:
+                        return
+                    wait = self._blocked_until - now
+                else:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if now >= self._blocked_until and self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def backoff(self, seconds: float):
+        """从现在起 seconds 秒内暂停发放令牌"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
@@ -0,0 +1,115 @@
+"""跨进程安全的文件操作 — 原子写入与咨询锁（gunicorn 多 worker 共享 data/ 目录）"""
+
+import os
+import sys
+import tempfile
+import threading
+
+if sys.platform == 'win32':
+    import msvcrt
+else:
+    import fcntl
+
+
+def atomic_write(path: str, data: str | bytes, encoding: str = 'utf-8'):
+    """写入同目录临时文件并 fsync 后 rename 覆盖目标
+
+    读者要么看到旧内容、要么看到完整的新内容，进程中途崩溃也不会留下半截文件。
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data.encode(encoding) if isinstance(data, str) else data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class FileLock:
+    """基于锁文件的进程间互斥锁（POSIX flock / Windows msvcrt.locking）
+
+    同一进程内的线程先经过 threading.RLock，因此可同时用作线程锁，且支持重入。
+    进程退出时操作系统自动释放，不会因崩溃留下死锁。
+
+    用法:
+        with FileLock(path):
+            ...
+        lock.try_acquire()  # 非阻塞，成功后一直持有直到 release()
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd: int | None = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if not self._thread_lock.acquire(blocking):
+            return False
+        if self._depth == 0:
+            try:
+                if not self._lock_file(blocking):
+                    self._thread_lock.release()
+                    return False
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return True
+
+    def try_acquire(self) -> bool:
+        return self.acquire(blocking=False)
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            self._unlock_file()
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def _lock_file(self, blocking: bool) -> bool:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if sys.platform == 'win32':
+                # msvcrt.LK_LOCK 最多重试 10 秒，阻塞模式下循环直到成功
+                mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+                while True:
+                    try:
+                        msvcrt.locking(fd, mode, 1)
+                        break
+                    except OSError:
+                        if not blocking:
+                            raise BlockingIOError
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return True
+
+    def _unlock_file(self):
+        fd, self._fd = self._fd, None
+        try:
+            if sys.platform == 'win32':
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)